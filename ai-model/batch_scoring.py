@@ -0,0 +1,193 @@
+"""
+Batch scoring of statement files for the dashboard.
+
+BatchScorer runs score_file() for each statement in a bounded process pool,
+so parsing and scoring never hold the Tk process's GIL. The workers run at
+a raised nice level, so the UI stays responsive while they use every core.
+
+Workers report progress (parsing page 3/12, features, scoring) through a
+Manager queue. Finished jobs are reported by future callbacks into a local
+queue. The UI thread calls poll() from root.after and gets both streams as
+one list of (job_id, kind, info) events. It never blocks.
+
+cancel() drops a job that hasn't started. For a running job it sets a
+shared flag, which the worker checks after every PDF page and between
+stages.
+
+    python batch_scoring.py statements/*.pdf     # same pipeline, no UI
+"""
+import functools
+import itertools
+import multiprocessing
+import os
+import queue
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from credit_utils import model_features, parse_mpesa_pdf, score_credit
+
+# Workers yield the CPU to the UI process
+WORKER_NICE = 10
+STATEMENT_TYPES = [("Statements", "*.pdf *.csv"), ("PDF files", "*.pdf"), ("CSV files", "*.csv")]
+
+
+class JobCancelled(Exception):
+    """Raised inside a worker once its job has been cancelled"""
+
+
+def _init_worker(nice):
+    try:
+        os.nice(nice)
+    except (AttributeError, OSError):
+        pass
+
+
+def load_statement(path, on_page=None):
+    """Transactions DataFrame from a PDF or CSV statement"""
+    if path.lower().endswith('.csv'):
+        return pd.read_csv(path)
+    return parse_mpesa_pdf(path, on_page=on_page)
+
+
+def score_file(job_id, path, events, cancelled):
+    """Worker: parse, extract and score one statement, reporting progress to events"""
+    started = time.perf_counter()
+
+    def progress(stage, done=None, total=None):
+        if cancelled.get(job_id):
+            raise JobCancelled(job_id)
+        events.put((job_id, 'progress', {'stage': stage, 'done': done, 'total': total}))
+
+    progress('parsing')
+    df = load_statement(path, on_page=lambda page, pages: progress('parsing', page, pages))
+    if df.empty:
+        raise ValueError("No valid transactions found")
+    progress('features')
+    features = model_features(df)
+    progress('scoring')
+    score, eligible = score_credit(features)
+    # A cancel that lands during scoring still wins over the result
+    if cancelled.get(job_id):
+        raise JobCancelled(job_id)
+    return {'rows': len(df), 'score': score, 'eligible': eligible, 'seconds': time.perf_counter() - started}
+
+
+class BatchScorer:
+    """Process pool with cancellable jobs and a non-blocking event stream for the UI"""
+
+    def __init__(self, max_workers=None, nice=WORKER_NICE):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._manager = multiprocessing.Manager()
+        self._progress = self._manager.Queue()
+        self._cancelled = self._manager.dict()
+        self._finished = queue.Queue()
+        self._pool = ProcessPoolExecutor(self.max_workers, initializer=_init_worker, initargs=(nice,))
+        self._futures = {}
+        self._ids = itertools.count(1)
+        self.started = None
+        self.counts = {'submitted': 0, 'done': 0, 'failed': 0, 'cancelled': 0, 'rows': 0}
+
+    def submit(self, path):
+        """Queue one statement file; returns its job id"""
+        job_id = next(self._ids)
+        if self.started is None:
+            self.started = time.perf_counter()
+        future = self._pool.submit(score_file, job_id, path, self._progress, self._cancelled)
+        self._futures[job_id] = future
+        self.counts['submitted'] += 1
+        future.add_done_callback(functools.partial(self._on_done, job_id))
+        return job_id
+
+    def _on_done(self, job_id, future):
+        # Runs on an executor thread; the local queue hands the outcome to the UI thread
+        try:
+            self._cancelled.pop(job_id, None)
+        except (OSError, EOFError):
+            pass  # Manager already shut down by close()
+        if future.cancelled():
+            self._finished.put((job_id, 'cancelled', {}))
+            return
+        error = future.exception()
+        if isinstance(error, JobCancelled):
+            self._finished.put((job_id, 'cancelled', {}))
+        elif error is not None:
+            self._finished.put((job_id, 'failed', {'error': str(error) or type(error).__name__}))
+        else:
+            self._finished.put((job_id, 'done', future.result()))
+
+    def cancel(self, job_id):
+        """Cancel a pending or running job; False when it has already finished"""
+        future = self._futures.get(job_id)
+        if future is None or future.done():
+            return False
+        if not future.cancel():
+            # Already handed to a worker: it stops at its next progress check
+            self._cancelled[job_id] = True
+            if future.done():
+                # Finished meanwhile; _on_done may already have cleared the flag
+                self._cancelled.pop(job_id, None)
+        return True
+
+    def cancel_all(self):
+        return sum(self.cancel(job_id) for job_id in list(self._futures))
+
+    def poll(self, limit=1000):
+        """Events since the last poll, progress before outcomes; never blocks"""
+        events = []
+        for source in (self._progress, self._finished):
+            while len(events) < limit:
+                try:
+                    events.append(source.get_nowait())
+                except queue.Empty:
+                    break
+        for job_id, kind, info in events:
+            if kind in ('done', 'failed', 'cancelled'):
+                self._futures.pop(job_id, None)
+                self.counts[kind] += 1
+                self.counts['rows'] += info.get('rows', 0)
+        return events
+
+    def stats(self):
+        """Counters plus throughput since the first submission"""
+        elapsed = time.perf_counter() - self.started if self.started else 0
+        finished = self.counts['done'] + self.counts['failed'] + self.counts['cancelled']
+        return {
+            **self.counts,
+            'pending': self.counts['submitted'] - finished,
+            'workers': self.max_workers,
+            'elapsed_seconds': elapsed,
+            'files_per_minute': self.counts['done'] * 60 / elapsed if elapsed else 0.0,
+            'rows_per_second': self.counts['rows'] / elapsed if elapsed else 0.0,
+        }
+
+    def close(self):
+        """Cancel everything and release the pool and manager without waiting for running parses"""
+        self.cancel_all()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self._manager.shutdown()
+
+
+def main(paths):
+    scorer = BatchScorer()
+    jobs = {scorer.submit(path): path for path in paths}
+    try:
+        while scorer.stats()['pending']:
+            for job_id, kind, info in scorer.poll():
+                if kind == 'done':
+                    print(f"✅ {jobs[job_id]}: score {info['score'] * 100:.1f}%, eligible {info['eligible']}, "
+                          f"{info['rows']} rows in {info['seconds']:.1f}s")
+                elif kind == 'failed':
+                    print(f"❌ {jobs[job_id]}: {info['error']}")
+            time.sleep(0.1)
+    finally:
+        stats = scorer.stats()
+        scorer.close()
+    print(f"📊 {stats['done']} scored, {stats['failed']} failed in {stats['elapsed_seconds']:.1f}s "
+          f"({stats['files_per_minute']:.1f} files/min, {stats['rows_per_second']:.0f} rows/s, {stats['workers']} workers)")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
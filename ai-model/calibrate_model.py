@@ -0,0 +1,161 @@
+"""
+Calibrate a trained credit model's approval probabilities.
+
+Forest probabilities are votes, not frequencies: a 0.7 from
+predict_proba is not a 70% approval rate. This script scores a held-out
+synthetic set drawn with the model's label rule. It fits isotonic regression
+and a Platt sigmoid (on the log-odds) to half of it and compares Brier score,
+log loss and calibration error on the other half. The chosen curve is
+written next to the model:
+
+    python calibrate_model.py                                  # credit_model.joblib, best of both
+    python calibrate_model.py --model credit_model_compact.joblib --method platt
+
+The sidecar (<model>.calibration.json) stores the curve as knots of a
+monotone piecewise-linear map: the isotonic thresholds, or the sigmoid
+sampled on a 1025-point grid. backend/decisions.py serves it with a
+single np.interp, and checks model_sha256 so a retrained model never
+picks up a stale curve. The curve changes the reported probability only:
+the decision bands, limits and rates stay on the raw score.
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+import warnings
+
+import numpy as np
+from joblib import load
+from sklearn.isotonic import IsotonicRegression
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import brier_score_loss, log_loss
+
+from feature_engineering import feature_columns, spec_version_for_model
+from generate_training_data import generate_training_frame
+
+# The API scores numpy rows against models fitted on named columns
+warnings.filterwarnings('ignore', message='X does not have valid feature names')
+
+CALIBRATION_SUFFIX = '.calibration.json'
+PLATT_GRID_POINTS = 1025
+EPSILON = 1e-6
+ECE_BINS = 10
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def calibration_path(model_path):
+    """Sidecar path of a model's calibration curve (same rule as backend/decisions.py)"""
+    return os.path.splitext(model_path)[0] + CALIBRATION_SUFFIX
+
+
+def _logit(p):
+    p = np.clip(p, EPSILON, 1 - EPSILON)
+    return np.log(p / (1 - p))
+
+
+def fit_isotonic(raw, labels):
+    """Knots of the isotonic fit; interpolating between them reproduces IsotonicRegression.predict"""
+    iso = IsotonicRegression(y_min=0.0, y_max=1.0, out_of_bounds='clip').fit(raw, labels)
+    return iso.X_thresholds_.astype(float), iso.y_thresholds_.astype(float)
+
+
+def fit_platt(raw, labels):
+    """Sigmoid on the log-odds, sampled on a fixed grid over [0, 1]"""
+    lr = LogisticRegression(C=1e6).fit(_logit(raw).reshape(-1, 1), labels)
+    x = np.linspace(0.0, 1.0, PLATT_GRID_POINTS)
+    y = lr.predict_proba(_logit(x).reshape(-1, 1))[:, 1]
+    # Keep the curve monotone even if the fitted slope came out negative
+    return x, np.maximum.accumulate(y)
+
+
+CALIBRATORS = {'isotonic': fit_isotonic, 'platt': fit_platt}
+
+
+def expected_calibration_error(probabilities, labels, bins=ECE_BINS):
+    """Row-weighted gap between mean prediction and outcome rate over equal-width bins"""
+    index = np.minimum((probabilities * bins).astype(int), bins - 1)
+    counts = np.bincount(index, minlength=bins)
+    predicted = np.bincount(index, weights=probabilities, minlength=bins)
+    observed = np.bincount(index, weights=labels, minlength=bins)
+    filled = counts > 0
+    return float(np.abs(predicted[filled] - observed[filled]).sum() / len(probabilities))
+
+
+def calibration_metrics(probabilities, labels):
+    return {
+        'brier': round(float(brier_score_loss(labels, probabilities)), 5),
+        'log_loss': round(float(log_loss(labels, np.clip(probabilities, EPSILON, 1 - EPSILON), labels=[0, 1])), 5),
+        'ece': round(expected_calibration_error(probabilities, labels), 5),
+        'mean_probability': round(float(probabilities.mean()), 4),
+        'positive_rate': round(float(labels.mean()), 4),
+    }
+
+
+def calibrate(model_path='credit_model.joblib', method='auto', rows=40_000, label_rule='repayment',
+              label_column='creditworthy', seed=7):
+    """Fit, compare and write the calibration sidecar for model_path; returns the sidecar dict"""
+    model = load(model_path)
+    spec_version = spec_version_for_model(model)
+    columns = feature_columns(spec_version)
+    print(f"📐 Calibrating {type(model).__name__} from {model_path} (spec {spec_version}) on {rows:,} rows")
+
+    frame = generate_training_frame(rows, seed=seed, spec_version=spec_version,
+                                    label_rule=label_rule, label_column=label_column)
+    raw = model.predict_proba(frame[columns].to_numpy())[:, 1]
+    labels = frame[label_column].to_numpy()
+    fit_raw, eval_raw = raw[:rows // 2], raw[rows // 2:]
+    fit_labels, eval_labels = labels[:rows // 2], labels[rows // 2:]
+
+    report = {'raw': calibration_metrics(eval_raw, eval_labels)}
+    curves = {}
+    for name, fit in CALIBRATORS.items():
+        x, y = fit(fit_raw, fit_labels)
+        curves[name] = (x, y)
+        report[name] = calibration_metrics(np.interp(eval_raw, x, y), eval_labels)
+    for name, metrics in report.items():
+        print(f"   {name:<9} Brier {metrics['brier']:.5f}  log loss {metrics['log_loss']:.5f}  ECE {metrics['ece']:.5f}")
+
+    chosen = min(CALIBRATORS, key=lambda name: report[name]['brier']) if method == 'auto' else method
+    x, y = curves[chosen]
+    calibration = {
+        'method': chosen,
+        'x': x.tolist(),
+        'y': y.tolist(),
+        'model_path': model_path,
+        'model_sha256': file_sha256(model_path),
+        'feature_spec': spec_version,
+        'label_rule': label_rule,
+        'rows': rows,
+        'report': report,
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+    out_path = calibration_path(model_path)
+    with open(out_path, 'w') as f:
+        json.dump(calibration, f, indent=2)
+    print(f"💾 {chosen} calibration ({len(x)} knots) saved as '{out_path}'")
+    return calibration
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrate a credit model's probabilities")
+    parser.add_argument('--model', default='credit_model.joblib')
+    parser.add_argument('--method', choices=['auto', *CALIBRATORS], default='auto',
+                        help='auto picks the lower held-out Brier score')
+    parser.add_argument('--rows', type=int, default=40_000)
+    parser.add_argument('--label-rule', default='repayment', help='rule the model was trained on')
+    parser.add_argument('--label-column', default='creditworthy')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+    calibrate(args.model, args.method, args.rows, args.label_rule, args.label_column, args.seed)
+
+
+if __name__ == '__main__':
+    main()
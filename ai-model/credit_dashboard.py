@@ -1,14 +1,150 @@
+import os
+import sys
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 import threading
 import pandas as pd
 
 # === Import your logic functions ===
-from credit_utils import parse_mpesa_pdf, extract_features, score_credit
+from credit_utils import parse_mpesa_pdf, model_features, score_credit
+from batch_scoring import STATEMENT_TYPES, BatchScorer
+
+# How often the batch window drains worker events
+POLL_MS = 100
+BATCH_COLUMNS = [
+    ('file', "File", 220), ('status', "Status", 90), ('progress', "Progress", 110),
+    ('rows', "Rows", 60), ('score', "Score", 70), ('eligible', "Eligible", 70), ('seconds', "Time", 60),
+]
+
+
+# === Batch mode ===
+def open_batch_window(root):
+    """Score many statements in a worker pool; results stream into a table"""
+    window = tk.Toplevel(root)
+    window.title("Demulla: Batch Scoring")
+    window.geometry("760x440")
+
+    scorer = None
+    poll_job = None
+    rows = {}  # job id -> Treeview item
+    items = {}  # Treeview item -> job id
+
+    def add_files():
+        nonlocal scorer
+        paths = filedialog.askopenfilenames(parent=window, filetypes=STATEMENT_TYPES)
+        if not paths:
+            return
+        if scorer is None:
+            scorer = BatchScorer()
+        for path in paths:
+            job_id = scorer.submit(path)
+            item = table.insert('', 'end', values=(os.path.basename(path), "queued", "", "", "", "", ""))
+            rows[job_id], items[item] = item, job_id
+        refresh_summary()
+
+    def cancel_selected():
+        if scorer is None:
+            return
+        for item in table.selection():
+            if item in items and scorer.cancel(items[item]):
+                table.set(item, 'status', "cancelling")
+
+    def cancel_all():
+        if scorer is None:
+            return
+        scorer.cancel_all()
+        for job_id, item in rows.items():
+            if table.set(item, 'status') in ("queued", "running"):
+                table.set(item, 'status', "cancelling")
+
+    def apply_event(job_id, kind, info):
+        item = rows.get(job_id)
+        if item is None or table.set(item, 'status') in ("done", "failed", "cancelled"):
+            return
+        if kind == 'progress':
+            if table.set(item, 'status') != "cancelling":
+                table.set(item, 'status', "running")
+            stage = info['stage']
+            table.set(item, 'progress', f"{stage} {info['done']}/{info['total']}" if info['total'] else stage)
+        elif kind == 'done':
+            table.set(item, 'status', "done")
+            table.set(item, 'progress', "")
+            table.set(item, 'rows', info['rows'])
+            table.set(item, 'score', f"{info['score'] * 100:.1f}%")
+            table.set(item, 'eligible', "✅ Yes" if info['eligible'] else "❌ No")
+            table.set(item, 'seconds', f"{info['seconds']:.1f}s")
+            table.item(item, tags=('eligible' if info['eligible'] else 'declined',))
+        elif kind == 'failed':
+            table.set(item, 'status', "failed")
+            table.set(item, 'progress', info['error'])
+            table.item(item, tags=('failed',))
+        else:
+            table.set(item, 'status', "cancelled")
+            table.set(item, 'progress', "")
+
+    def refresh_summary():
+        if scorer is None:
+            return
+        stats = scorer.stats()
+        finished = stats['done'] + stats['failed'] + stats['cancelled']
+        overall['maximum'] = max(1, stats['submitted'])
+        overall['value'] = finished
+        summary_text.set(
+            f"{finished}/{stats['submitted']} finished · {stats['done']} scored · {stats['failed']} failed · "
+            f"{stats['cancelled']} cancelled   |   {stats['files_per_minute']:.1f} files/min · "
+            f"{stats['rows_per_second']:.0f} rows/s · {stats['workers']} workers"
+        )
+
+    def poll():
+        # Runs on the Tk thread; never blocks on the workers
+        nonlocal poll_job
+        if scorer is not None:
+            for event in scorer.poll():
+                apply_event(*event)
+            refresh_summary()
+        poll_job = window.after(POLL_MS, poll)
+
+    def close():
+        if scorer is not None and scorer.stats()['pending']:
+            if not messagebox.askyesno("Batch Scoring", "Cancel the remaining statements and close?", parent=window):
+                return
+        window.after_cancel(poll_job)
+        if scorer is not None:
+            scorer.close()
+        window.destroy()
+
+    buttons = tk.Frame(window)
+    buttons.pack(fill='x', padx=10, pady=8)
+    tk.Button(buttons, text="Add statements…", command=add_files).pack(side='left')
+    tk.Button(buttons, text="Cancel selected", command=cancel_selected).pack(side='left', padx=5)
+    tk.Button(buttons, text="Cancel all", command=cancel_all).pack(side='left')
+
+    frame = tk.Frame(window)
+    frame.pack(fill='both', expand=True, padx=10)
+    table = ttk.Treeview(frame, columns=[key for key, _, _ in BATCH_COLUMNS], show='headings', selectmode='extended')
+    for key, heading, width in BATCH_COLUMNS:
+        table.heading(key, text=heading)
+        table.column(key, width=width, anchor='w' if key in ('file', 'progress') else 'center')
+    table.tag_configure('eligible', foreground='green')
+    table.tag_configure('declined', foreground='red')
+    table.tag_configure('failed', foreground='gray')
+    scrollbar = ttk.Scrollbar(frame, orient='vertical', command=table.yview)
+    table.configure(yscrollcommand=scrollbar.set)
+    table.pack(side='left', fill='both', expand=True)
+    scrollbar.pack(side='right', fill='y')
+
+    overall = ttk.Progressbar(window, mode='determinate')
+    overall.pack(fill='x', padx=10, pady=(8, 2))
+    summary_text = tk.StringVar(value="Add PDF or CSV statements to start")
+    tk.Label(window, textvariable=summary_text, anchor='w').pack(fill='x', padx=10, pady=(0, 8))
+
+    window.protocol("WM_DELETE_WINDOW", close)
+    poll()
+    return window
 
 
 # === Dashboard logic ===
-def launch_dashboard():
+def launch_dashboard(batch=False):
     def update_result(result, eligible):
         result_text.set(result)
         result_label.config(fg="green" if eligible else "red")
@@ -20,7 +156,7 @@ def launch_dashboard():
                 root.after(0, lambda: messagebox.showwarning("Warning", "No valid transactions found in PDF."))
                 return
 
-            features = extract_features(df)
+            features = model_features(df)
             score, eligible = score_credit(features)
 
             result = f"Loan Score: {score*100:.1f}%\nEligible: {'✅ Yes' if eligible else '❌ No'}"
@@ -42,10 +178,11 @@ def launch_dashboard():
     # === GUI Setup ===
     root = tk.Tk()
     root.title("Demulla: M-Pesa AI Loan Scoring")
-    root.geometry("420x320")
+    root.geometry("420x360")
 
     tk.Label(root, text="Upload Your M-Pesa PDF Statement", font=("Helvetica", 14)).pack(pady=10)
     tk.Button(root, text="Upload PDF", command=upload_pdf_and_score, font=("Arial", 12)).pack(pady=5)
+    tk.Button(root, text="Batch score statements…", command=lambda: open_batch_window(root), font=("Arial", 12)).pack(pady=5)
 
     progress_bar = ttk.Progressbar(root, mode='indeterminate')
 
@@ -54,8 +191,11 @@ def launch_dashboard():
     result_label = tk.Label(root, textvariable=result_text, font=("Arial", 14))
     result_label.pack(pady=20)
 
+    if batch:
+        open_batch_window(root)
     root.mainloop()
 
 
 if __name__ == "__main__":
-    launch_dashboard()
+    # python credit_dashboard.py --batch opens the batch window straight away
+    launch_dashboard(batch='--batch' in sys.argv[1:])
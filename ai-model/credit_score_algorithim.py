@@ -1,27 +1,21 @@
-def extract_features(df):
-    inflow = df[df['paid_in'] > 0]['paid_in'].sum()
-    outflow = df[df['withdrawn'] > 0]['withdrawn'].sum()
-    net_flow = inflow - outflow
+import pandas as pd
 
-    repayments = df['details'].str.contains("repay|tingg|eclof|loan|m-kopa", case=False, na=False).sum()
-    repayment_ratio = repayments / inflow if inflow > 0 else 0
+from feature_engineering import (
+    extract_features,
+    feature_columns,
+    feature_vector,
+    needs_counterparty_features,
+    spec_version_for_model,
+)
+# backend/ is on sys.path once feature_engineering is imported
+from decisions import APPROVED_DECISIONS, MODEL_DECISIONS  # noqa: E402
 
-    balance_volatility = df['balance'].std() if 'balance' in df.columns else 0
-    avg_transaction = df[df['paid_in'] > 0]['paid_in'].mean() or 0
-    transaction_count = len(df)
 
-    return {
-        'monthly_inflow': inflow,
-        'monthly_outflow': outflow,
-        'net_cash_flow': net_flow,
-        'repayments': repayments,
-        'repayment_ratio': repayment_ratio,
-        'balance_volatility': balance_volatility,
-        'avg_transaction_amount': avg_transaction,
-        'transaction_count': transaction_count
-    }
-
-# Credit prediction
-X = pd.DataFrame([extract_features(mpesa_data)])
-score = model.predict_proba(X)[0][1]
-eligible = score < 0.7
\ No newline at end of file
+def score_statement(mpesa_data, model, decision_table=MODEL_DECISIONS):
+    """Credit prediction for one parsed statement, using the shared features and decision table"""
+    columns = feature_columns(spec_version_for_model(model))
+    features = extract_features(mpesa_data, counterparty=needs_counterparty_features(columns))
+    X = pd.DataFrame([feature_vector(features, columns)], columns=columns)
+    decision = decision_table.decide(float(model.predict_proba(X)[0][1]))
+    eligible = decision['decision_status'] in APPROVED_DECISIONS
+    return decision['approval_probability'], eligible
@@ -0,0 +1,67 @@
+"""Dashboard helpers: PDF parsing, shared feature extraction and model scoring"""
+import os
+
+import pandas as pd
+from joblib import load
+
+from feature_engineering import (  # noqa: F401
+    extract_features,
+    feature_columns,
+    feature_vector,
+    needs_counterparty_features,
+    spec_version_for_model,
+)
+from parse_mpesa import parse_mpesa_tables
+
+# backend/ is on sys.path once feature_engineering is imported
+from decisions import APPROVED_DECISIONS, MODEL_DECISIONS, DecisionTable  # noqa: E402
+
+MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'credit_model.joblib')
+
+_model = None
+_decision_table = None
+
+
+def get_model():
+    """Load the model once per process"""
+    global _model
+    if _model is None:
+        _model = load(MODEL_PATH)
+    return _model
+
+
+def get_decision_table():
+    """The model's calibration sidecar and decision rules, as /api/predict loads them"""
+    global _decision_table
+    if _decision_table is None:
+        try:
+            _decision_table = DecisionTable.for_model(MODEL_PATH)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️ Ignoring calibration for {MODEL_PATH}, using raw probabilities: {e}")
+            _decision_table = MODEL_DECISIONS
+    return _decision_table
+
+
+def parse_mpesa_pdf(file_path, on_page=None):
+    """Parse an M-Pesa PDF statement into a transactions DataFrame (on_page: see parse_mpesa_tables)"""
+    return parse_mpesa_tables(file_path, on_page=on_page)
+
+
+def model_features(df):
+    """Features of one statement, including the counterparty ones when the model's spec uses them"""
+    columns = feature_columns(spec_version_for_model(get_model()))
+    return extract_features(df, counterparty=needs_counterparty_features(columns))
+
+
+def credit_decision(features):
+    """Decision fields (probability, status, limit, rate) for one feature dict, through the model's DecisionTable"""
+    model = get_model()
+    columns = feature_columns(spec_version_for_model(model))
+    X = pd.DataFrame([feature_vector(features, columns)], columns=columns)
+    return get_decision_table().decide(float(model.predict_proba(X)[0][1]))
+
+
+def score_credit(features):
+    """Approval probability (calibrated when the model has a sidecar) and eligibility for one feature dict"""
+    decision = credit_decision(features)
+    return decision['approval_probability'], decision['decision_status'] in APPROVED_DECISIONS
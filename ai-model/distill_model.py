@@ -0,0 +1,190 @@
+"""
+Distil the deployed forest into a compact, low-latency scorer.
+
+Fits small student models to the teacher's predict_proba outputs on a
+synthetic transfer set, measures single-row latency and fidelity for each,
+and exports the fastest one that stays inside the accuracy budget:
+
+    python distill_model.py                          # teacher: credit_model.joblib
+    python distill_model.py --max-auc-drop 0.005 --min-band-agreement 0.98
+
+Students are trained on soft labels by duplicating every row as a positive
+(weight p) and a negative (weight 1 - p). They stay plain sklearn
+estimators, so backend/app.py can load the result without custom code. The
+winner is written to credit_model_compact.joblib together with a manifest of
+its feature spec and metrics. When the teacher ships a calibration sidecar,
+the student gets its own curve (same method and label rule) so USSD and web
+report probabilities on the same scale. The API refuses to serve a
+calibrated primary next to an uncalibrated compact model.
+"""
+import argparse
+import json
+import os
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+from joblib import dump, load
+from sklearn.ensemble import HistGradientBoostingClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import roc_auc_score
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+from sklearn.tree import DecisionTreeClassifier
+
+from calibrate_model import calibrate, calibration_path
+from feature_engineering import feature_columns, spec_version_for_model
+from generate_training_data import generate_training_frame
+
+# The API scores numpy rows against models fitted on named columns
+warnings.filterwarnings('ignore', message='X does not have valid feature names')
+
+# Same decision thresholds /api/predict applies to approval_probability
+DECISION_THRESHOLDS = [0.3, 0.5, 0.7]
+
+STUDENTS = {
+    'gbdt_depth3_60': lambda: HistGradientBoostingClassifier(max_depth=3, max_iter=60, random_state=0),
+    'forest_10x6': lambda: RandomForestClassifier(n_estimators=10, max_depth=6, random_state=0),
+    'tree_depth6': lambda: DecisionTreeClassifier(max_depth=6, random_state=0),
+    'tree_depth8': lambda: DecisionTreeClassifier(max_depth=8, min_samples_leaf=20, random_state=0),
+    'logistic_scorecard': lambda: make_pipeline(StandardScaler(), LogisticRegression(max_iter=1000)),
+}
+
+
+def soft_label_fit(estimator, X, teacher_proba):
+    """Fit a classifier to probabilities via weighted positive/negative copies of each row"""
+    X2 = pd.concat([X, X], ignore_index=True)
+    y2 = np.r_[np.ones(len(X)), np.zeros(len(X))]
+    weights = np.r_[teacher_proba, 1 - teacher_proba]
+    if hasattr(estimator, 'steps'):
+        estimator.fit(X2, y2, **{f"{estimator.steps[-1][0]}__sample_weight": weights})
+    else:
+        estimator.fit(X2, y2, sample_weight=weights)
+    return estimator
+
+
+def single_row_latency_ms(model, X, calls=300):
+    """Median and p99 latency of one-row predict_proba, the /api/predict access pattern"""
+    rows = X.to_numpy()
+    model.predict_proba(rows[:1])
+    timings = []
+    for i in range(calls):
+        started = time.perf_counter()
+        model.predict_proba(rows[i % len(rows):i % len(rows) + 1])
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return round(timings[len(timings) // 2], 3), round(timings[int(len(timings) * 0.99) - 1], 3)
+
+
+def decision_bands(proba):
+    return np.searchsorted(DECISION_THRESHOLDS, proba, side='right')
+
+
+def fidelity(student_proba, teacher_proba, labels):
+    """How closely the student reproduces the teacher, plus both models' AUC on the rule labels"""
+    teacher_decisions = (teacher_proba >= 0.5).astype(int)
+    has_both = len(np.unique(teacher_decisions)) > 1 and len(np.unique(labels)) > 1
+    return {
+        'auc_vs_teacher_decisions': float(roc_auc_score(teacher_decisions, student_proba)) if has_both else None,
+        'auc_on_labels': float(roc_auc_score(labels, student_proba)) if has_both else None,
+        'mean_abs_error': float(np.abs(student_proba - teacher_proba).mean()),
+        'max_abs_error': float(np.abs(student_proba - teacher_proba).max()),
+        'band_agreement': float((decision_bands(student_proba) == decision_bands(teacher_proba)).mean()),
+    }
+
+
+def distill(teacher_path='credit_model.joblib', out_path='credit_model_compact.joblib', transfer_rows=50_000,
+            eval_rows=20_000, max_auc_drop=0.01, min_band_agreement=0.97, seed=42):
+    teacher = load(teacher_path)
+    spec_version = spec_version_for_model(teacher)
+    columns = feature_columns(spec_version)
+    print(f"🎓 Teacher: {type(teacher).__name__} from {teacher_path} (spec {spec_version})")
+
+    transfer = generate_training_frame(transfer_rows, seed=seed, spec_version=spec_version, correlation=0.3)
+    holdout = generate_training_frame(eval_rows, seed=seed + 1, spec_version=spec_version, correlation=0.3)
+    X_transfer, X_eval = transfer[columns], holdout[columns]
+    labels = holdout['creditworthy'].to_numpy()
+
+    teacher_transfer = teacher.predict_proba(X_transfer)[:, 1]
+    teacher_eval = teacher.predict_proba(X_eval)[:, 1]
+    teacher_latency, teacher_p99 = single_row_latency_ms(teacher, X_eval)
+    teacher_auc = roc_auc_score(labels, teacher_eval) if len(np.unique(labels)) > 1 else None
+
+    report = {'teacher': {'latency_ms': teacher_latency, 'latency_p99_ms': teacher_p99, 'auc_on_labels': teacher_auc}}
+    print(f"   teacher: {teacher_latency:.3f} ms/row (p99 {teacher_p99:.3f}), AUC {teacher_auc}")
+
+    for name, build in STUDENTS.items():
+        started = time.perf_counter()
+        student = soft_label_fit(build(), X_transfer, teacher_transfer)
+        fit_seconds = time.perf_counter() - started
+        metrics = fidelity(student.predict_proba(X_eval)[:, 1], teacher_eval, labels)
+        metrics['latency_ms'], metrics['latency_p99_ms'] = single_row_latency_ms(student, X_eval)
+        metrics['fit_seconds'] = round(fit_seconds, 2)
+        auc_drop = (teacher_auc - metrics['auc_on_labels']) if teacher_auc and metrics['auc_on_labels'] else None
+        metrics['auc_drop'] = auc_drop
+        metrics['within_budget'] = (
+            auc_drop is not None and auc_drop <= max_auc_drop and metrics['band_agreement'] >= min_band_agreement
+        )
+        report[name] = metrics
+        report[name]['_model'] = student
+        print(f"   {name:<20} {metrics['latency_ms']:>7.3f} ms/row  AUC drop {auc_drop if auc_drop is None else round(auc_drop, 4)}"
+              f"  band agreement {metrics['band_agreement']:.3f}  {'✅' if metrics['within_budget'] else '❌'}")
+
+    candidates = [name for name in STUDENTS if report[name]['within_budget']]
+    if not candidates:
+        print(f"❌ No student within budget (AUC drop <= {max_auc_drop}, band agreement >= {min_band_agreement})")
+        return None
+
+    winner = min(candidates, key=lambda name: report[name]['latency_ms'])
+    model = report[winner].pop('_model')
+    dump(model, out_path)
+
+    manifest = {
+        'model': winner,
+        'model_type': type(model).__name__,
+        'teacher_path': teacher_path,
+        'feature_spec': spec_version,
+        'feature_columns': columns,
+        'decision_thresholds': DECISION_THRESHOLDS,
+        'accuracy_budget': {'max_auc_drop': max_auc_drop, 'min_band_agreement': min_band_agreement},
+        'speedup_vs_teacher': round(teacher_latency / report[winner]['latency_ms'], 1),
+        'report': {name: {k: v for k, v in metrics.items() if k != '_model'} for name, metrics in report.items()},
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+    teacher_calibration = calibration_path(teacher_path)
+    if os.path.exists(teacher_calibration):
+        with open(teacher_calibration) as f:
+            teacher_curve = json.load(f)
+        student_curve = calibrate(out_path, method=teacher_curve.get('method', 'auto'),
+                                  label_rule=teacher_curve.get('label_rule', 'repayment'))
+        manifest['calibration'] = student_curve['method']
+    elif os.path.exists(calibration_path(out_path)):
+        # A curve from an earlier student would not match this one
+        os.remove(calibration_path(out_path))
+    with open(out_path.replace('.joblib', '.manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    print(f"🏆 {winner}: {report[winner]['latency_ms']:.3f} ms/row "
+          f"({manifest['speedup_vs_teacher']}x faster), saved as '{out_path}'")
+    return model
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Distil the credit forest into a compact scorer")
+    parser.add_argument('--teacher', default='credit_model.joblib')
+    parser.add_argument('--out', default='credit_model_compact.joblib')
+    parser.add_argument('--transfer-rows', type=int, default=50_000)
+    parser.add_argument('--eval-rows', type=int, default=20_000)
+    parser.add_argument('--max-auc-drop', type=float, default=0.01)
+    parser.add_argument('--min-band-agreement', type=float, default=0.97)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    model = distill(args.teacher, args.out, args.transfer_rows, args.eval_rows,
+                    args.max_auc_drop, args.min_band_agreement, args.seed)
+    raise SystemExit(0 if model is not None else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,194 @@
+"""
+Vectorized synthetic training-data generator.
+
+Draws every column at once with NumPy's Generator instead of building one
+dict per sample, so millions of rows take seconds:
+
+    python generate_training_data.py --rows 10000000 --out training_shards
+    python generate_training_data.py --rows 200000 --label-rule temporal --ranges train_model --format csv
+
+Features follow the shared specs in backend/mpesa_features (repayment_ratio
+uses the serving definition: repayments per transaction). Labels are pandas
+eval expressions over the generated columns. Pass a LABEL_RULES name or any
+expression, e.g. --label-rule "net_cash_flow > 0 and repayments >= 3".
+Value ranges come from a RANGE_PRESETS entry, one per original script.
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from scipy.special import ndtr
+
+from feature_engineering import feature_columns, needs_counterparty_features
+
+# Creditworthiness rules used by the original training scripts
+LABEL_RULES = {
+    # train_and_save_model.py
+    'repayment': (
+        'monthly_inflow > 20000 and net_cash_flow > 0 '
+        'and repayments > 2 and balance_volatility < 2000'
+    ),
+    # train_model.py
+    'temporal': 'inflow_trend > 0.1 and transaction_consistency < 5 and days_covered > 60',
+}
+
+# Value ranges drawn by the original training loops; integer ranges are [low, high)
+RANGE_PRESETS = {
+    'train_and_save_model': {
+        'inflow': (5000, 80001),
+        'outflow_low': 4000,
+        'outflow_share': 0.9,  # outflow is at most this share of inflow
+        'transaction_count': (20, 201),
+        'repayments': (0, 9),
+        'balance_volatility': (100, 5000),
+        'transactions_per_inflow': (15, 61),  # inflow / avg_transaction_amount
+    },
+    'train_model': {
+        'inflow': (1000, 20001),
+        'outflow_low': 500,
+        'outflow_share': 1.0,
+        'transaction_count': (10, 151),
+        'repayments': (0, 6),
+        'balance_volatility': (0, 1000),
+        'transactions_per_inflow': (10, 51),
+    },
+}
+
+
+def _uniform_from_normal(z, low, high):
+    """Map standard normals onto U(low, high) through the normal CDF (Gaussian copula)"""
+    return low + ndtr(z) * (high - low)
+
+
+def generate_training_frame(n_rows, seed=42, spec_version='v2', label_rule='repayment',
+                            label_column='creditworthy', correlation=0.0, label_noise=0.0, rng=None,
+                            ranges='train_and_save_model'):
+    """
+    Generate n_rows labelled feature rows, drawn from the RANGE_PRESETS entry `ranges`.
+
+    correlation (0..1) couples inflow, outflow share, transaction count and
+    balance volatility through a shared "business scale" factor; 0 keeps
+    them independent like the original loop-based generators.
+    """
+    rng = rng if rng is not None else np.random.default_rng(seed)
+    r = RANGE_PRESETS[ranges]
+
+    # Latent business scale drives correlated size features
+    scale = rng.standard_normal(n_rows)
+    def correlated_normal():
+        return correlation * scale + np.sqrt(1 - correlation ** 2) * rng.standard_normal(n_rows)
+
+    # Cash flow
+    inflow = np.floor(_uniform_from_normal(correlated_normal(), *r['inflow'])).astype(np.int64)
+    outflow_high = (inflow * r['outflow_share']).astype(np.int64) + 1
+    outflow = rng.integers(r['outflow_low'], outflow_high)
+    net_flow = inflow - outflow
+
+    # Activity
+    transaction_count = np.floor(_uniform_from_normal(correlated_normal(), *r['transaction_count'])).astype(np.int64)
+    repayments = rng.integers(*r['repayments'], size=n_rows)
+    repayment_ratio = repayments / transaction_count
+    # Larger businesses carry larger, less volatile balances
+    balance_volatility = _uniform_from_normal(-correlated_normal(), *r['balance_volatility'])
+    avg_transaction = inflow / rng.integers(*r['transactions_per_inflow'], size=n_rows)
+
+    columns = {
+        'monthly_inflow': inflow,
+        'monthly_outflow': outflow,
+        'net_cash_flow': net_flow,
+        'repayments': repayments,
+        'repayment_ratio': repayment_ratio,
+        'balance_volatility': balance_volatility,
+        'avg_transaction_amount': avg_transaction,
+        'transaction_count': transaction_count,
+    }
+
+    # Temporal patterns
+    days_covered = rng.choice(np.array([30, 60, 90]), size=n_rows)
+    columns.update({
+        'days_covered': days_covered,
+        'transactions_per_day': transaction_count / days_covered,
+        'inflow_trend': rng.uniform(-0.3, 0.3, size=n_rows),
+        'transaction_consistency': rng.uniform(1, 10, size=n_rows),
+    })
+
+    # Counterparty concentration (spec v3 only, so v1/v2 frames stay identical for a seed).
+    # The top payer's share bounds the HHI from below.
+    if needs_counterparty_features(feature_columns(spec_version)):
+        unique_payers = rng.integers(1, 26, size=n_rows)
+        top_share = np.where(unique_payers == 1, 1.0, rng.uniform(1 / unique_payers, 1.0))
+        rest = np.maximum(unique_payers - 1, 1)
+        columns.update({
+            'top_payer_inflow_share': top_share,
+            'unique_payers': unique_payers,
+            'payer_concentration_hhi': top_share ** 2 + (1 - top_share) ** 2 / rest,
+            'recurring_payer_regularity': rng.uniform(0, 1, size=n_rows) * top_share,
+            'unique_payees': rng.integers(1, 41, size=n_rows),
+        })
+
+    df = pd.DataFrame(columns)
+    expression = LABEL_RULES.get(label_rule, label_rule)
+    labels = df.eval(expression).to_numpy(dtype=bool)
+    if label_noise:
+        labels = labels ^ (rng.random(n_rows) < label_noise)
+
+    df = df[feature_columns(spec_version)]
+    df[label_column] = labels.astype(np.int8)
+    return df
+
+
+def write_shards(n_rows, out_dir, shard_rows=1_000_000, seed=42, file_format='parquet', **kwargs):
+    """Generate n_rows in independent shards (one child seed each) and write them to out_dir"""
+    if file_format == 'parquet':
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise SystemExit("Parquet output needs pyarrow (pip install pyarrow) - or use --format csv")
+
+    os.makedirs(out_dir, exist_ok=True)
+    n_shards = -(-n_rows // shard_rows)
+    child_seeds = np.random.SeedSequence(seed).spawn(n_shards)
+    paths = []
+    for shard, child_seed in enumerate(child_seeds):
+        rows = min(shard_rows, n_rows - shard * shard_rows)
+        df = generate_training_frame(rows, rng=np.random.default_rng(child_seed), **kwargs)
+        path = os.path.join(out_dir, f"part-{shard:05d}.{file_format}")
+        if file_format == 'parquet':
+            df.to_parquet(path, index=False)
+        else:
+            df.to_csv(path, index=False)
+        paths.append(path)
+        print(f"   💾 {path} ({rows:,} rows)")
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic credit training data")
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--shard-rows', type=int, default=1_000_000)
+    parser.add_argument('--out', default='training_shards')
+    parser.add_argument('--format', choices=['parquet', 'csv'], default='parquet')
+    parser.add_argument('--spec', default='v2', help='feature spec version (v1, v2, v3)')
+    parser.add_argument('--label-rule', default='repayment', help=f"one of {sorted(LABEL_RULES)} or an expression")
+    parser.add_argument('--label-column', default='creditworthy')
+    parser.add_argument('--ranges', choices=sorted(RANGE_PRESETS), default='train_and_save_model',
+                        help='value ranges of the original training script to reproduce')
+    parser.add_argument('--correlation', type=float, default=0.0)
+    parser.add_argument('--label-noise', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"🔄 Generating {args.rows:,} rows into {args.out}/")
+    started = time.perf_counter()
+    write_shards(
+        args.rows, args.out, shard_rows=args.shard_rows, seed=args.seed, file_format=args.format,
+        spec_version=args.spec, label_rule=args.label_rule, label_column=args.label_column,
+        correlation=args.correlation, label_noise=args.label_noise, ranges=args.ranges
+    )
+    print(f"✅ Done in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
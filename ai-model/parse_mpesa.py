@@ -1,10 +1,16 @@
 import pdfplumber
 import pandas as pd
 
-def parse_mpesa_tables(pdf_path):
+def parse_mpesa_tables(pdf_path, on_page=None):
+    """
+    Transactions table from an M-Pesa PDF statement.
+
+    on_page(page_number, page_count) is called after each page; it may raise to abort the parse.
+    """
     all_data = []
     with pdfplumber.open(pdf_path) as pdf:
-        for page in pdf.pages:
+        page_count = len(pdf.pages)
+        for page_number, page in enumerate(pdf.pages, start=1):
             tables = page.extract_tables()
             for table in tables:
                 if not table or len(table[0]) < 5:
@@ -15,6 +21,8 @@ def parse_mpesa_tables(pdf_path):
                         continue
                     row_dict = dict(zip(headers, row))
                     all_data.append(row_dict)
+            if on_page is not None:
+                on_page(page_number, page_count)
 
     df = pd.DataFrame(all_data)
 
@@ -1,30 +1,26 @@
 import shap
 import pandas as pd
 from joblib import load
-from feature_engineering import extract_features
+from feature_engineering import (
+    extract_features,
+    feature_columns,
+    feature_vector,
+    needs_counterparty_features,
+    spec_version_for_model,
+)
 
 model = load("credit_model.joblib")
 
 # Load some sample data
 df = pd.read_csv("mpesa_synthetic_dataset.csv")
 
-# Extract features with new temporal features
-features = extract_features(df)
+# Column order of the feature spec the model was trained on
+feature_names = feature_columns(spec_version_for_model(model))
 
-# Create feature array with all 12 features
-feature_names = [
-    'monthly_inflow', 'monthly_outflow', 'net_cash_flow',
-    'repayments', 'repayment_ratio', 'balance_volatility',
-    'avg_transaction_amount', 'transaction_count',
-    'days_covered', 'transactions_per_day', 'inflow_trend', 'transaction_consistency'
-]
+# Extract features with the shared library used by the API
+features = extract_features(df, counterparty=needs_counterparty_features(feature_names))
 
-# Ensure all features exist
-for name in feature_names:
-    if name not in features:
-        features[name] = 0
-
-X = pd.DataFrame([[features[col] for col in feature_names]], columns=feature_names)
+X = pd.DataFrame([feature_vector(features, feature_names)], columns=feature_names)
 
 print(f"Explaining model with {X.shape[1]} features")
 
@@ -33,4 +29,4 @@ shap_values = explainer.shap_values(X)
 
 # Plot with new feature names
 shap.summary_plot(shap_values, X, feature_names=feature_names, show=True)
-print("✅ SHAP plot generated with temporal features")
\ No newline at end of file
+print(f"✅ SHAP plot generated for feature spec {spec_version_for_model(model)}")
\ No newline at end of file
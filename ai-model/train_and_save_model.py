@@ -3,61 +3,26 @@ import numpy as np
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import train_test_split
 from joblib import dump
-import random
 
-def create_training_data():
+from calibrate_model import calibrate
+from feature_engineering import build_reference, feature_columns, write_reference
+from generate_training_data import generate_training_frame
+
+def create_training_data(n_rows=1000, seed=42):
     """Create realistic training data based on M-Pesa patterns"""
-    samples = []
-    
-    for _ in range(1000):
-        # Realistic M-Pesa user patterns
-        inflow = random.randint(5000, 80000)
-        outflow = random.randint(4000, int(inflow * 0.9))  # ✅ FIXED (cast to int)
-        net_flow = inflow - outflow
-        
-        # Loan repayment behavior
-        repayments = random.randint(0, 8)
-        repayment_ratio = repayments / max(inflow, 1)
-        
-        # Transaction patterns
-        balance_volatility = random.uniform(100, 5000)
-        avg_transaction = inflow / random.randint(15, 60)
-        transaction_count = random.randint(20, 200)
-        
-        # Creditworthiness factors
-        has_consistent_income = inflow > 20000
-        has_positive_flow = net_flow > 0
-        has_repayment_history = repayments > 2
-        has_low_volatility = balance_volatility < 2000
-        
-        # Credit score simulation (1 = good, 0 = bad)
-        credit_score = 1 if (
-            has_consistent_income and 
-            has_positive_flow and 
-            has_repayment_history and
-            has_low_volatility
-        ) else 0
-        
-        samples.append({
-            'monthly_inflow': inflow,
-            'monthly_outflow': outflow,
-            'net_cash_flow': net_flow,
-            'repayments': repayments,
-            'repayment_ratio': repayment_ratio,
-            'balance_volatility': balance_volatility,
-            'avg_transaction_amount': avg_transaction,
-            'transaction_count': transaction_count,
-            'creditworthy': credit_score
-        })
-    
-    return pd.DataFrame(samples)
+    # Vectorized generator with the old loop's distributions and labeling rule;
+    # repayment_ratio now uses the serving definition (repayments per transaction).
+    # All 12 columns are kept for the drift reference; the model trains on v1.
+    return generate_training_frame(
+        n_rows, seed=seed, spec_version='v2', label_rule='repayment', label_column='creditworthy'
+    )
 
 def train_model():
     print("🔄 Creating training data...")
     df = create_training_data()
     
     # Prepare features and target
-    X = df.drop('creditworthy', axis=1)
+    X = df[feature_columns('v1')]
     y = df['creditworthy']
     
     # Split the data
@@ -85,6 +50,17 @@ def train_model():
     dump(model, 'credit_model.joblib')
     print("💾 Model saved as 'credit_model.joblib'")
     
+    # Calibration curve served with the model (credit_model.calibration.json)
+    calibrate('credit_model.joblib', label_rule='repayment', label_column='creditworthy')
+    
+    # Reference distributions for the API's drift monitor (/api/drift); raw probabilities,
+    # which is what the monitor observes whether or not a calibration is deployed
+    reference = build_reference(
+        df[feature_columns('v2')], model.predict_proba(X)[:, 1], source='train_and_save_model.py'
+    )
+    write_reference(reference, 'drift_reference.json')
+    print("💾 Drift reference saved as 'drift_reference.json'")
+    
     # Print feature importance
     feature_importance = pd.DataFrame({
         'feature': X.columns,
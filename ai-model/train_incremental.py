@@ -0,0 +1,169 @@
+"""
+Out-of-core training over sharded feature files.
+
+Streams the shards written by generate_training_data.py (or any Parquet/CSV
+files with the spec's feature columns plus a label) one at a time and grows
+a RandomForestClassifier with warm_start: every shard adds --trees-per-shard
+trees fitted on that shard only. Peak memory is one shard plus the forest.
+
+    python train_incremental.py training_shards --out credit_model.joblib
+    python train_incremental.py training_shards --resume      # continue after a crash
+
+After every shard the forest and the list of finished shards are written to a
+checkpoint, so an interrupted run resumes where it stopped. The result is a
+plain RandomForestClassifier fitted on named columns, so backend/app.py's
+predict_with_ai_model picks the right feature spec automatically.
+"""
+import argparse
+import glob
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from joblib import dump, load
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import roc_auc_score
+
+from feature_engineering import feature_columns
+
+
+def list_shards(shard_dir):
+    shards = sorted(glob.glob(os.path.join(shard_dir, '*.parquet')) + glob.glob(os.path.join(shard_dir, '*.csv')))
+    if not shards:
+        raise SystemExit(f"No .parquet or .csv shards found in {shard_dir}")
+    return shards
+
+
+def read_shard(path, columns, max_rows=None, seed=0):
+    """Load only the needed columns of one shard, optionally subsampled to max_rows"""
+    if path.endswith('.parquet'):
+        df = pd.read_parquet(path, columns=columns)
+    else:
+        df = pd.read_csv(path, usecols=columns)
+    if max_rows and len(df) > max_rows:
+        df = df.sample(n=max_rows, random_state=seed)
+    return df
+
+
+class TrainingCheckpoint:
+    """Forest + progress written after every shard so training can resume"""
+
+    def __init__(self, out_path):
+        self.model_path = out_path + '.checkpoint.joblib'
+        self.progress_path = out_path + '.checkpoint.json'
+
+    def load(self):
+        if not (os.path.exists(self.model_path) and os.path.exists(self.progress_path)):
+            return None, {'completed_shards': [], 'rows_seen': 0}
+        with open(self.progress_path) as f:
+            progress = json.load(f)
+        return load(self.model_path), progress
+
+    def save(self, model, progress):
+        # Model first, then progress: a crash in between only repeats one shard
+        dump(model, self.model_path + '.tmp')
+        os.replace(self.model_path + '.tmp', self.model_path)
+        with open(self.progress_path + '.tmp', 'w') as f:
+            json.dump(progress, f, indent=2)
+        os.replace(self.progress_path + '.tmp', self.progress_path)
+
+    def clear(self):
+        for path in (self.model_path, self.progress_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def evaluate(model, shards, columns, label_column, chunk_rows=200_000):
+    """Accuracy and AUC over holdout shards, scored chunk by chunk"""
+    labels, scores = [], []
+    for path in shards:
+        df = read_shard(path, columns + [label_column])
+        for start in range(0, len(df), chunk_rows):
+            chunk = df.iloc[start:start + chunk_rows]
+            scores.append(model.predict_proba(chunk[columns])[:, 1])
+            labels.append(chunk[label_column].to_numpy())
+    y, p = np.concatenate(labels), np.concatenate(scores)
+    auc = roc_auc_score(y, p) if len(np.unique(y)) > 1 else float('nan')
+    return {'rows': int(len(y)), 'accuracy': float(((p >= 0.5) == y).mean()), 'auc': float(auc)}
+
+
+def train_incremental(shard_dir, out_path='credit_model.joblib', spec_version='v1', label_column='creditworthy',
+                      trees_per_shard=10, max_depth=10, min_samples_split=5, max_rows_per_shard=None,
+                      holdout_shards=1, resume=False, n_jobs=-1, seed=42):
+    shards = list_shards(shard_dir)
+    holdout = shards[-holdout_shards:] if 0 < holdout_shards < len(shards) else []
+    train_shards = shards[:len(shards) - len(holdout)]
+    columns = feature_columns(spec_version)
+
+    checkpoint = TrainingCheckpoint(out_path)
+    model, progress = checkpoint.load() if resume else (None, {'completed_shards': [], 'rows_seen': 0})
+    if model is not None:
+        print(f"🔁 Resuming: {len(progress['completed_shards'])} shards done, {len(model.estimators_)} trees")
+    else:
+        model = RandomForestClassifier(
+            n_estimators=0, warm_start=True, max_depth=max_depth,
+            min_samples_split=min_samples_split, n_jobs=n_jobs, random_state=seed
+        )
+
+    for i, path in enumerate(train_shards):
+        name = os.path.basename(path)
+        if name in progress['completed_shards']:
+            continue
+        started = time.perf_counter()
+        df = read_shard(path, columns + [label_column], max_rows_per_shard, seed=seed + i)
+        y = df[label_column]
+        if y.nunique() < 2:
+            # A one-class shard would reset classes_ on the warm-started forest
+            print(f"   ⚠️  Skipping {name}: only one class present")
+            continue
+
+        model.n_estimators += trees_per_shard
+        model.fit(df[columns], y)
+
+        progress['completed_shards'].append(name)
+        progress['rows_seen'] += len(df)
+        checkpoint.save(model, progress)
+        print(f"   🌲 {name}: {len(df):,} rows, {model.n_estimators} trees total "
+              f"({time.perf_counter() - started:.1f}s)")
+        del df, y
+
+    if not progress['completed_shards']:
+        raise SystemExit("No shard could be trained on")
+
+    dump(model, out_path)
+    checkpoint.clear()
+    print(f"💾 Model saved as '{out_path}' ({model.n_estimators} trees, {progress['rows_seen']:,} rows, spec {spec_version})")
+
+    if holdout:
+        metrics = evaluate(model, holdout, columns, label_column)
+        print(f"📊 Holdout ({metrics['rows']:,} rows): accuracy {metrics['accuracy']:.3f}, AUC {metrics['auc']:.3f}")
+    return model
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train a credit model over sharded feature files")
+    parser.add_argument('shard_dir')
+    parser.add_argument('--out', default='credit_model.joblib')
+    parser.add_argument('--spec', default='v1', help='feature spec version (v1, v2, v3)')
+    parser.add_argument('--label-column', default='creditworthy')
+    parser.add_argument('--trees-per-shard', type=int, default=10)
+    parser.add_argument('--max-depth', type=int, default=10)
+    parser.add_argument('--max-rows-per-shard', type=int, help='subsample large shards to bound memory')
+    parser.add_argument('--holdout-shards', type=int, default=1, help='last N shards used for evaluation only')
+    parser.add_argument('--resume', action='store_true', help='continue from the last checkpoint')
+    parser.add_argument('--n-jobs', type=int, default=-1)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    train_incremental(
+        args.shard_dir, out_path=args.out, spec_version=args.spec, label_column=args.label_column,
+        trees_per_shard=args.trees_per_shard, max_depth=args.max_depth,
+        max_rows_per_shard=args.max_rows_per_shard, holdout_shards=args.holdout_shards,
+        resume=args.resume, n_jobs=args.n_jobs, seed=args.seed
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+"""
+Admission control for statement uploads.
+
+Every upload is sized before pandas touches it: the byte length and a cheap
+newline count give an estimate of the memory the request will hold at peak
+(DataFrame copies, per-row transaction dicts, the JSON response). Requests
+reserve that estimate against a per-process MemoryBudget; very large
+statements go to a single background lane (LargeStatementQueue) so they
+cannot crowd out interactive uploads on the same worker.
+"""
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# Rough peak cost model. tracemalloc over synthetic statements (warmup.py) peaks at
+# ~1.8-3.3 KB per row - mostly the ~15-key transaction dicts and their JSON - plus the
+# raw text held a few times over. Padded for allocator fragmentation.
+BYTES_PER_UPLOAD_BYTE = 3
+BYTES_PER_ROW = 3072
+
+
+class AdmissionRejected(Exception):
+    """Raised when a statement can't be admitted; carries the HTTP status and reason"""
+
+    def __init__(self, status_code, reason, retry_after=None):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def count_rows(raw_bytes):
+    """Data rows in a CSV payload (line count minus header), without parsing it"""
+    lines = raw_bytes.count(b'\n')
+    if raw_bytes and not raw_bytes.endswith(b'\n'):
+        lines += 1
+    return max(0, lines - 1)
+
+
+def estimate_statement_memory(n_bytes, n_rows):
+    """Estimated peak bytes needed to score a statement of this size"""
+    return n_bytes * BYTES_PER_UPLOAD_BYTE + n_rows * BYTES_PER_ROW
+
+
+class MemoryBudget:
+    """Per-process budget shared by all concurrent requests in a worker"""
+
+    def __init__(self, limit_bytes):
+        self.limit_bytes = limit_bytes
+        self.in_use_bytes = 0
+        self.peak_bytes = 0
+        self.rejected = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, nbytes, timeout):
+        """Reserve nbytes, waiting up to timeout seconds (None = forever) for other requests to release"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self.in_use_bytes + nbytes > self.limit_bytes:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    self.rejected += 1
+                    return False
+                self._cond.wait(remaining)
+            self.in_use_bytes += nbytes
+            self.peak_bytes = max(self.peak_bytes, self.in_use_bytes)
+            return True
+
+    def release(self, nbytes):
+        with self._cond:
+            self.in_use_bytes = max(0, self.in_use_bytes - nbytes)
+            self._cond.notify_all()
+
+    def snapshot(self):
+        with self._cond:
+            return {
+                'limit_mb': round(self.limit_bytes / 1048576, 1),
+                'in_use_mb': round(self.in_use_bytes / 1048576, 1),
+                'peak_mb': round(self.peak_bytes / 1048576, 1),
+                'rejected': self.rejected
+            }
+
+
+class LargeStatementQueue:
+    """
+    Background lane for statements above the async row threshold.
+
+    Jobs run one at a time per worker. Results are written as JSON files to a
+    shared directory so any gunicorn worker can answer the status poll.
+    """
+
+    def __init__(self, job_dir, max_pending=4, result_ttl_seconds=3600):
+        self.job_dir = job_dir
+        self.max_pending = max_pending
+        self.result_ttl_seconds = result_ttl_seconds
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='large-statement')
+        os.makedirs(job_dir, exist_ok=True)
+
+    def _path(self, job_id, suffix):
+        return os.path.join(self.job_dir, f"{job_id}.{suffix}")
+
+    def _write_json(self, job_id, suffix, payload):
+        tmp_path = self._path(job_id, suffix + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(payload, f)
+        os.replace(tmp_path, self._path(job_id, suffix))
+
+    def _expire_old_results(self):
+        cutoff = time.time() - self.result_ttl_seconds
+        for name in os.listdir(self.job_dir):
+            path = os.path.join(self.job_dir, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    def submit(self, fn, *args):
+        """Queue fn(*args) -> (payload, status_code); returns the job id"""
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise AdmissionRejected(503, "Large-statement queue is full, retry shortly", retry_after=30)
+            self._pending += 1
+
+        self._expire_old_results()
+        job_id = uuid.uuid4().hex
+        self._write_json(job_id, 'status', {'status': 'queued', 'submitted_at': time.time()})
+        self._executor.submit(self._run, job_id, fn, args)
+        return job_id
+
+    def _run(self, job_id, fn, args):
+        try:
+            self._write_json(job_id, 'status', {'status': 'running', 'started_at': time.time()})
+            payload, status_code = fn(*args)
+            self._write_json(job_id, 'result', {'status_code': status_code, 'payload': payload})
+        except Exception as e:
+            self._write_json(job_id, 'result', {'status_code': 500, 'payload': {'status': 'error', 'error': str(e)}})
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def lookup(self, job_id):
+        """Return ('done', result) / ('queued'|'running', status) / (None, None) for unknown ids"""
+        if not job_id.isalnum():
+            return None, None
+        for suffix in ('result', 'status'):
+            try:
+                with open(self._path(job_id, suffix)) as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            return ('done', data) if suffix == 'result' else (data['status'], data)
+        return None, None
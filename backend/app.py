@@ -1,25 +1,201 @@
-from flask import Flask, request, jsonify
+import time
+_IMPORT_STARTED = time.perf_counter()
+
+from flask import Flask, request, jsonify, send_file
 from flask_cors import CORS
+from werkzeug.exceptions import RequestEntityTooLarge
 import pandas as pd
 import numpy as np
 import logging
 from datetime import datetime
 import traceback
-import joblib
+import functools
+import hmac
+import json
 import os
+import random
+import threading
+import uuid
+import weakref
 
-app = Flask(__name__)
-CORS(app)
+from explanations import explain_credit_decision
+import admission
+import audit
+import compression
+import portfolio
+import profiler
+import decisions
+import drift
+import integrity
+import receipt_index
+import scheduler
+import shadow
+import statement_schema
+from mpesa_features import (
+    convert_numpy_types,
+    extract_features,
+    feature_columns,
+    load_reference,
+    needs_counterparty_features,
+    parse_completion_time,
+    spec_version_for_model
+)
+import warmup
+import whatif
 
-# Set up logging
+# Set up logging (before the module-level init below, which logs)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+app = Flask(__name__)
+
+# Comma-separated list of allowed frontend origins; "*" keeps the old dev behaviour
+CORS_ORIGINS = [o.strip() for o in os.environ.get('CORS_ORIGINS', '*').split(',') if o.strip()]
+CORS(app, resources={r"/api/*": {"origins": CORS_ORIGINS}}, expose_headers=['Retry-After'])
+
+# Statements are small text files; anything above this is rejected with 413 before parsing
+MAX_UPLOAD_MB = float(os.environ.get('MAX_UPLOAD_MB', '10'))
+app.config['MAX_CONTENT_LENGTH'] = int(MAX_UPLOAD_MB * 1024 * 1024)
+
+# gzip/zstd uploads are checked against this after decompression (MAX_UPLOAD_MB applies to the wire size)
+MAX_DECOMPRESSED_MB = float(os.environ.get('MAX_DECOMPRESSED_MB', '50'))
+# Prediction responses at least this large are streamed, compressed when the client accepts it
+RESPONSE_COMPRESS_MIN_BYTES = int(os.environ.get('RESPONSE_COMPRESS_MIN_BYTES', '1024'))
+
+# Admin endpoints (model reload, ...) are disabled unless a token is configured
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+# Customer histories (/api/customers/<id>/..., X-Customer-Id on /api/predict) need the admin token
+# or X-Customer-Token = hex HMAC-SHA256(CUSTOMER_TOKEN_SECRET, customer id), issued by the lender's
+# backend; with neither configured they are disabled
+CUSTOMER_TOKEN_SECRET = os.environ.get('CUSTOMER_TOKEN_SECRET')
+
+# Admission control: per-worker memory budget and row limits for statement uploads
+MEMORY_BUDGET_MB = float(os.environ.get('MEMORY_BUDGET_MB', '512'))
+MAX_STATEMENT_ROWS = int(os.environ.get('MAX_STATEMENT_ROWS', '200000'))
+ASYNC_ROW_THRESHOLD = int(os.environ.get('ASYNC_ROW_THRESHOLD', '20000'))
+ADMISSION_WAIT_SECONDS = float(os.environ.get('ADMISSION_WAIT_SECONDS', '2'))
+JOB_DIR = os.environ.get('JOB_DIR', 'jobs')
+# Retry-After sent with 202 job responses: how long clients wait between status polls
+JOB_POLL_SECONDS = int(os.environ.get('JOB_POLL_SECONDS', '2'))
+
+# Portfolio rollups: per-worker counters flushed here and merged across workers on read
+PORTFOLIO_DIR = os.environ.get('PORTFOLIO_DIR', 'portfolio')
+portfolio_rollup = portfolio.PortfolioRollup(
+    PORTFOLIO_DIR, flush_seconds=float(os.environ.get('PORTFOLIO_FLUSH_SECONDS', '5'))
+)
+
+# Drift monitor: streaming sketches of served features/probabilities vs the training reference
+DRIFT_REFERENCE_PATH = os.environ.get(
+    'DRIFT_REFERENCE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'drift_reference.json')
+)
+DRIFT_DIR = os.environ.get('DRIFT_DIR', 'drift')
+
+def load_drift_reference(path):
+    """Training-time reference written by ai-model/train_and_save_model.py; None if unavailable"""
+    if not os.path.exists(path):
+        logger.warning(f"⚠️  No drift reference at {path} - /api/drift will report live quantiles only")
+        return None
+    try:
+        return load_reference(path)
+    except Exception as e:
+        logger.error(f"❌ Failed to load drift reference: {str(e)}")
+        return None
+
+drift_monitor = drift.DriftMonitor(
+    feature_columns('v2'),
+    reference=load_drift_reference(DRIFT_REFERENCE_PATH),
+    state_dir=DRIFT_DIR,
+    flush_seconds=float(os.environ.get('DRIFT_FLUSH_SECONDS', '10')),
+    window_seconds=float(os.environ.get('DRIFT_WINDOW_HOURS', '24')) * 3600
+)
+
+# Per-customer receipt history (Bloom filter + exact set) and ingestion ledgers
+RECEIPT_INDEX_DIR = os.environ.get('RECEIPT_INDEX_DIR', 'receipt_index')
+receipt_store = receipt_index.ReceiptIndex(RECEIPT_INDEX_DIR)
+
+# Decision audit log: queued in memory by requests, written in compressed batches by a background thread
+AUDIT_DIR = os.environ.get('AUDIT_DIR', 'audit')
+audit_log = audit.AuditLog(
+    AUDIT_DIR,
+    flush_seconds=float(os.environ.get('AUDIT_FLUSH_SECONDS', '1')),
+    segment_max_bytes=int(float(os.environ.get('AUDIT_SEGMENT_MB', '64')) * 1024 * 1024)
+)
+
+# Stack-sampling profiles of scoring requests: on demand (admin X-Profile header / ?profile=1) or sampled
+PROFILE_DIR = os.environ.get('PROFILE_DIR', 'profiles')
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', '0'))
+PROFILE_INTERVAL_MS = float(os.environ.get('PROFILE_INTERVAL_MS', '1'))
+PROFILE_KEEP = int(os.environ.get('PROFILE_KEEP', '200'))
+
+# Upper bound on the cartesian product scored by one /api/whatif call
+WHATIF_MAX_VARIANTS = int(os.environ.get('WHATIF_MAX_VARIANTS', '5000'))
+
+# Scheduler: scoring slots per worker shared by interactive and batch traffic (weighted fair).
+# Keep SCHEDULER_SLOTS + batch queue below GUNICORN_THREADS so waiting batch requests never
+# occupy every thread.
+SCHEDULER_SLOTS = int(os.environ.get('SCHEDULER_SLOTS', '2'))
+request_scheduler = scheduler.PriorityScheduler(SCHEDULER_SLOTS, {
+    name: {
+        'weight': float(os.environ.get(f'SCHEDULER_{name.upper()}_WEIGHT', config['weight'])),
+        'max_slots': int(os.environ.get(f'SCHEDULER_{name.upper()}_MAX_SLOTS', config['max_slots'] or 0)) or None,
+        'max_queue': int(os.environ.get(f'SCHEDULER_{name.upper()}_MAX_QUEUE', config['max_queue'])),
+        'max_wait': float(os.environ.get(f'SCHEDULER_{name.upper()}_MAX_WAIT_SECONDS', config['max_wait'])),
+        'rate': float(os.environ.get(f'SCHEDULER_{name.upper()}_RATE', config['rate'] or 0)) or None,
+        'burst': float(os.environ.get(f'SCHEDULER_{name.upper()}_BURST', config['burst'])),
+        'nice': int(os.environ.get(f'SCHEDULER_{name.upper()}_NICE', config['nice'])),
+    }
+    for name, config in scheduler.DEFAULT_CLASSES.items()
+})
+# The token buckets are keyed on the caller's address. When the peer is one of these proxies /
+# load balancers, the client comes from X-Client-Id (a gateway's authenticated client) or else
+# from X-Forwarded-For; neither header is trusted from anyone else.
+TRUSTED_PROXIES = {a.strip() for a in os.environ.get('TRUSTED_PROXIES', '').split(',') if a.strip()}
+
+memory_budget = admission.MemoryBudget(int(MEMORY_BUDGET_MB * 1024 * 1024))
+large_statement_queue = admission.LargeStatementQueue(
+    JOB_DIR, max_pending=int(os.environ.get('ASYNC_MAX_PENDING', '4'))
+)
+
 # Load your trained model
-MODEL_PATH = 'credit_model.joblib'
+MODEL_PATH = os.environ.get('MODEL_PATH', 'credit_model.joblib')
+
+# Set WARMUP_ON_START=0 to skip the synthetic warm-up (e.g. for quick local scripts)
+WARMUP_ON_START = os.environ.get('WARMUP_ON_START', '1') != '0'
+
+# Startup timings (and any warm-up error) reported by /api/health
+startup_state = {
+    'timings': {'imports_ms': round((time.perf_counter() - _IMPORT_STARTED) * 1000, 2)},
+    'error': None
+}
+
+# Calibration and decision rules per loaded model, read from the model's .calibration.json sidecar
+_decision_tables = weakref.WeakKeyDictionary()
+
+def load_decision_table(path):
+    """DecisionTable for the model at path; uncalibrated when the sidecar is missing or unusable"""
+    try:
+        table = decisions.DecisionTable.for_model(path)
+    except (OSError, ValueError, KeyError) as e:
+        logger.error(f"❌ Ignoring calibration for {path}, serving raw probabilities: {str(e)}")
+        return decisions.MODEL_DECISIONS
+    if table.calibration is not None:
+        logger.info(f"📐 Calibration for {path}: {table.method} ({len(table.calibration['x'])} knots)")
+    return table
+
+def decision_table_for(active_model):
+    """Decision table a loaded model was shipped with"""
+    return _decision_tables.get(active_model, decisions.MODEL_DECISIONS)
+
+def load_model(path):
+    """Load a joblib model and its calibration; joblib (and through it sklearn) is only imported here"""
+    import joblib
+    loaded = joblib.load(path)
+    _decision_tables[loaded] = load_decision_table(path)
+    return loaded
 
+_model_load_started = time.perf_counter()
 try:
-    model = joblib.load(MODEL_PATH)
+    model = load_model(MODEL_PATH)
     logger.info(f"✅ AI Model loaded successfully from {MODEL_PATH}")
     logger.info(f"📊 Model type: {type(model).__name__}")
     # Check model feature count
@@ -28,155 +204,87 @@ try:
 except Exception as e:
     logger.error(f"❌ Failed to load model: {str(e)}")
     model = None
+startup_state['timings']['model_load_ms'] = round((time.perf_counter() - _model_load_started) * 1000, 2)
 
-# ============================================
-# EXPLANATION ENGINE
-# ============================================
+# Optional distilled model (ai-model/distill_model.py) served to latency-critical channels
+COMPACT_MODEL_PATH = os.environ.get('COMPACT_MODEL_PATH', 'credit_model_compact.joblib')
+LOW_LATENCY_CHANNELS = {c.strip().lower() for c in os.environ.get('LOW_LATENCY_CHANNELS', 'ussd').split(',') if c.strip()}
 
-def explain_credit_decision(features, prediction, prediction_proba=None):
-    """MSME Credit Scoring Explanation Engine"""
-    
-    # BUSINESS BEHAVIOR CLASSIFICATION
-    volatility = features.get('balance_volatility', 0)
-    tx_count = features.get('transaction_count', 0)
-    net_flow = features.get('net_cash_flow', 0)
-    
-    if volatility < 1000 and tx_count > 50:
-        business_label = "Stable Business"
-    elif net_flow > 10000 and features.get('monthly_inflow', 0) > 50000:
-        business_label = "Growing Business"
-    elif volatility > 3000 or abs(net_flow) > 5000:
-        business_label = "Volatile Business"
-    elif tx_count < 20:
-        business_label = "Low Activity Business"
-    elif features.get('repayment_ratio', 0) > 0.1:
-        business_label = "Credit-Conscious Business"
-    else:
-        business_label = "Typical MSME"
-    
-    # RISK LEVEL ASSESSMENT
-    risk_score = 0
-    
-    if net_flow > 0:
-        risk_score -= 1
-    if features.get('repayments', 0) >= 3:
-        risk_score -= 1
-    if volatility < 1500:
-        risk_score -= 1
-    
-    if net_flow < -2000:
-        risk_score += 2
-    if volatility > 4000:
-        risk_score += 2
-    if features.get('repayments', 0) == 0:
-        risk_score += 1
-    
-    if risk_score <= -2:
-        risk_level = "Low Risk"
-    elif risk_score <= 0:
-        risk_level = "Medium Risk"
-    else:
-        risk_level = "High Risk"
-    
-    if prediction == 0:
-        risk_level = "High Risk"
-    
-    # EXPLANATION GENERATION
-    explanations = []
-    
-    if prediction == 1:
-        if prediction_proba:
-            confidence = "high" if prediction_proba > 0.8 else "moderate"
-            explanations.append(f"AI model indicates {confidence} confidence in creditworthiness ({prediction_proba:.0%})")
-        else:
-            explanations.append("AI model classifies as creditworthy based on transaction patterns")
-    else:
-        if prediction_proba:
-            confidence = "high" if prediction_proba < 0.3 else "moderate"
-            explanations.append(f"AI model shows {confidence} confidence in elevated risk ({1-prediction_proba:.0%})")
-        else:
-            explanations.append("AI model identifies elevated risk factors in transaction history")
-    
-    # Cash flow explanation
-    if net_flow > 5000:
-        explanations.append(f"Strong positive cash flow: Business generates KES {net_flow:,.0f} more than it spends monthly")
-    elif net_flow > 0:
-        explanations.append(f"Positive cash flow: Business maintains a healthy financial buffer of KES {net_flow:,.0f}")
-    elif net_flow < 0:
-        explanations.append(f"Cash flow concern: Monthly spending exceeds income by KES {abs(net_flow):,.0f}")
-    else:
-        explanations.append("Balanced cash flow: Income and expenses are closely matched")
-    
-    # Repayment behavior explanation
-    repayments = features.get('repayments', 0)
-    if repayments >= 4:
-        explanations.append(f"Excellent repayment history: {repayments} loan/credit transactions indicate strong financial discipline")
-    elif repayments >= 2:
-        explanations.append(f"Good repayment pattern: {repayments} credit-related transactions show credit awareness")
-    elif repayments == 1:
-        explanations.append(f"Limited credit history: Only {repayments} credit-related transaction detected")
-    else:
-        explanations.append("No detected repayment history: Consider establishing credit relationships")
-    
-    # Transaction stability explanation
-    if volatility < 1000:
-        explanations.append(f"High financial stability: Low balance volatility (KES {volatility:,.0f}) indicates consistent operations")
-    elif volatility < 3000:
-        explanations.append(f"Moderate financial stability: Balance volatility of KES {volatility:,.0f} suggests typical business fluctuations")
-    else:
-        explanations.append(f"Financial variability: High balance volatility (KES {volatility:,.0f}) may indicate inconsistent cash management")
-    
-    # Transaction volume explanation
-    if tx_count > 100:
-        explanations.append(f"High transaction volume: {tx_count} transactions monthly show active business operations")
-    elif tx_count > 30:
-        explanations.append(f"Healthy transaction activity: {tx_count} monthly transactions indicate regular business flow")
-    else:
-        explanations.append(f"Limited transaction activity: {tx_count} transactions may suggest seasonal or low-volume business")
-    
-    # FINAL EXPLANATION PACKAGE
-    explanation_package = {
-        "business_behavior": business_label,
-        "risk_assessment": risk_level,
-        "explanations": explanations[:4],
-        "key_metrics": {
-            "net_monthly_cash_flow": f"KES {net_flow:,.0f}",
-            "monthly_transactions": tx_count,
-            "detected_repayments": repayments,
-            "balance_stability": f"KES {volatility:,.0f} volatility"
-        },
-        "note": "Explanations generated using rule-based logic. In production, this would be powered by Gemini on Vertex AI."
-    }
-    
-    return explanation_package
+def calibration_mismatch(primary, compact):
+    """Why primary and compact can't be served side by side, or None when their calibrations agree"""
+    if primary is None or compact is None:
+        return None
+    primary_method = decision_table_for(primary).method
+    compact_method = decision_table_for(compact).method
+    if (primary_method is None) != (compact_method is None):
+        return (f"primary model calibration is {primary_method or 'none'} but compact model calibration is "
+                f"{compact_method or 'none'}; re-run distill_model.py so both report the same scale")
+    return None
 
-# ============================================
-# HELPER FUNCTIONS
-# ============================================
+def load_compact_model(path):
+    """Load the distilled model and its manifest; (None, None) when absent or unusable"""
+    if not os.path.exists(path):
+        return None, None
+    manifest_path = path.replace('.joblib', '.manifest.json')
+    try:
+        compact = load_model(path)
+        manifest = {}
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+        spec_version = spec_version_for_model(compact)
+        if manifest.get('feature_spec') and manifest['feature_spec'] != spec_version:
+            raise ValueError(f"manifest spec {manifest['feature_spec']} does not match model spec {spec_version}")
+        mismatch = calibration_mismatch(model, compact)
+        if mismatch:
+            raise ValueError(mismatch)
+        winner = manifest.get('report', {}).get(manifest.get('model'), {})
+        logger.info(f"⚡ Compact model loaded from {path}: {type(compact).__name__} (spec {spec_version}, "
+                    f"band agreement {winner.get('band_agreement')}, AUC drop {winner.get('auc_drop')}) "
+                    f"for channels {sorted(LOW_LATENCY_CHANNELS)}")
+        return compact, manifest
+    except Exception as e:
+        logger.error(f"❌ Failed to load compact model, latency-critical channels use the main model: {str(e)}")
+        return None, None
+
+compact_model, compact_manifest = load_compact_model(COMPACT_MODEL_PATH)
 
-def convert_numpy_types(obj):
-    """Convert numpy types to native Python types for JSON serialization"""
-    if isinstance(obj, (np.integer, np.int32, np.int64)):
-        return int(obj)
-    elif isinstance(obj, (np.floating, np.float32, np.float64)):
-        return float(obj)
-    elif isinstance(obj, np.ndarray):
-        return obj.tolist()
-    elif isinstance(obj, pd.Timestamp):
-        if pd.isna(obj):
-            return None
-        return obj.isoformat()
-    elif pd.isna(obj):
+# Shadow scoring: candidate models ("name=path,...") score primary-model requests off the request path
+SHADOW_MODELS = os.environ.get('SHADOW_MODELS', '')
+SHADOW_DIR = os.environ.get('SHADOW_DIR', 'shadow')
+# Cost submit() may add to a request (p99); reported by /api/shadow
+SHADOW_OVERHEAD_BUDGET_MS = float(os.environ.get('SHADOW_OVERHEAD_BUDGET_MS', '0.25'))
+
+def load_shadow_scorer(spec):
+    """ShadowScorer over the loadable candidates in spec; None when none are configured or loadable"""
+    candidates = {}
+    for name, path in shadow.parse_candidates(spec):
+        try:
+            candidates[name] = load_model(path)
+            logger.info(f"👥 Shadow candidate '{name}' loaded from {path}: {type(candidates[name]).__name__} "
+                        f"(spec {spec_version_for_model(candidates[name])})")
+        except Exception as e:
+            logger.error(f"❌ Failed to load shadow candidate '{name}' from {path}: {str(e)}")
+    if not candidates:
         return None
-    else:
-        return obj
+    return shadow.ShadowScorer(
+        candidates,
+        decision_tables={name: decision_table_for(candidate) for name, candidate in candidates.items()},
+        log_dir=SHADOW_DIR,
+        batch_size=int(os.environ.get('SHADOW_BATCH_SIZE', '64')),
+        max_wait_seconds=float(os.environ.get('SHADOW_MAX_WAIT_SECONDS', '0.5')),
+        max_queue=int(os.environ.get('SHADOW_MAX_QUEUE', '10000')),
+        overhead_budget_ms=SHADOW_OVERHEAD_BUDGET_MS
+    )
 
-def safe_date_convert(date_str):
-    """Safely convert date strings, handling NaT"""
-    try:
-        return pd.to_datetime(date_str, errors='coerce')
-    except:
-        return pd.NaT
+shadow_scorer = load_shadow_scorer(SHADOW_MODELS)
+
+# Serialises hot-swaps; readers never take it, they just grab the current `model` reference
+_model_swap_lock = threading.Lock()
+
+# ============================================
+# HELPER FUNCTIONS
+# ============================================
 
 def parse_and_format_transactions(df):
     """Parse and format transactions for frontend display with proper date handling"""
@@ -184,9 +292,9 @@ def parse_and_format_transactions(df):
         # Make a copy to avoid warnings
         df = df.copy()
         
-        # Convert date column to datetime
+        # Convert date column to datetime (no-op when ingestion already typed it)
         if 'completion_time' in df.columns:
-            df['completion_time'] = df['completion_time'].apply(safe_date_convert)
+            df['completion_time'] = parse_completion_time(df['completion_time'])
             
             # Sort by date (earliest to latest for analysis)
             df = df.sort_values('completion_time', ascending=True)
@@ -197,20 +305,32 @@ def parse_and_format_transactions(df):
                 date_range = (valid_dates.max() - valid_dates.min()).days
                 logger.info(f"📅 Date range: {date_range} days")
         
-        # Format for frontend
+        # Format for frontend - walk plain column iterators instead of building a Series per row
+        def column(name, default):
+            return df[name] if name in df.columns else [default] * len(df)
+        
         transactions = []
-        for idx, row in df.iterrows():
+        for idx, receipt_no, date_val, details, status, paid_in, withdrawn, balance in zip(
+            df.index,
+            column('receipt_no.', 'N/A'),
+            column('completion_time', None),
+            column('details', 'N/A'),
+            column('transaction_status', 'N/A'),
+            column('paid_in', 0),
+            column('withdrawn', 0),
+            column('balance', 0)
+        ):
             # Extract values safely
-            paid_in = float(row.get('paid_in', 0) or 0)
-            withdrawn = float(row.get('withdrawn', 0) or 0)
-            balance = float(row.get('balance', 0) or 0)
+            paid_in = float(paid_in or 0)
+            withdrawn = float(withdrawn or 0)
+            balance = float(balance or 0)
             
             transaction = {
                 'id': idx,
-                'receipt_no': str(row.get('receipt_no.', 'N/A')).strip(),
-                'date': row.get('completion_time'),
-                'description': str(row.get('details', 'N/A')).strip(),
-                'status': str(row.get('transaction_status', 'N/A')).strip(),
+                'receipt_no': str(receipt_no).strip(),
+                'date': date_val,
+                'description': str(details).strip(),
+                'status': str(status).strip(),
                 'amount_in': paid_in,
                 'amount_out': withdrawn,
                 'balance': balance,
@@ -246,209 +366,54 @@ def parse_and_format_transactions(df):
         logger.error(traceback.format_exc())
         return []
 
-def extract_features(df):
-    """Extract features including temporal patterns"""
-    try:
-        # Make a copy to avoid warnings
-        df = df.copy()
-        
-        # Convert date column to datetime
-        if 'completion_time' in df.columns:
-            df['completion_time'] = df['completion_time'].apply(safe_date_convert)
-        
-        # ===== TEMPORAL ANALYSIS =====
-        has_temporal_data = 'completion_time' in df.columns and not df['completion_time'].isna().all()
-        
-        temporal_features = {}
-        if has_temporal_data:
-            # Sort by date for temporal analysis
-            df = df.sort_values('completion_time', ascending=True)
-            
-            # Calculate days covered by transactions
-            valid_dates = df['completion_time'].dropna()
-            if len(valid_dates) > 1:
-                date_range = (valid_dates.max() - valid_dates.min()).days
-                days_covered = max(1, date_range)
-                
-                # Transaction frequency
-                transactions_per_day = len(df) / days_covered
-                
-                # Simple trend: compare first half vs second half
-                half_idx = len(df) // 2
-                # FIXED: Use .loc to avoid reindexing warning
-                first_half_mask = df.index[:half_idx]
-                second_half_mask = df.index[half_idx:]
-                
-                first_half_inflow = df.loc[first_half_mask][df.loc[first_half_mask, 'paid_in'] > 0]['paid_in'].sum()
-                second_half_inflow = df.loc[second_half_mask][df.loc[second_half_mask, 'paid_in'] > 0]['paid_in'].sum()
-                
-                if first_half_inflow > 0:
-                    inflow_trend = (second_half_inflow - first_half_inflow) / first_half_inflow
-                else:
-                    inflow_trend = 0 if second_half_inflow == 0 else 1
-                
-                # Consistency: check if transactions are regular
-                if len(valid_dates) > 5:
-                    date_diffs = []
-                    sorted_dates = valid_dates.sort_values().dt.date
-                    for i in range(1, min(10, len(sorted_dates))):
-                        diff = (sorted_dates.iloc[i] - sorted_dates.iloc[i-1]).days
-                        if diff > 0:
-                            date_diffs.append(diff)
-                    
-                    if date_diffs:
-                        transaction_consistency = np.std(date_diffs)
-                    else:
-                        transaction_consistency = 0
-                else:
-                    transaction_consistency = 0
-                
-                temporal_features = {
-                    'days_covered': days_covered,
-                    'transactions_per_day': transactions_per_day,
-                    'inflow_trend': inflow_trend,
-                    'transaction_consistency': transaction_consistency
-                }
-            else:
-                temporal_features = {
-                    'days_covered': 30,
-                    'transactions_per_day': len(df) / 30,
-                    'inflow_trend': 0,
-                    'transaction_consistency': 0
-                }
-        else:
-            temporal_features = {
-                'days_covered': 30,
-                'transactions_per_day': len(df) / 30,
-                'inflow_trend': 0,
-                'transaction_consistency': 0
-            }
-        
-        # ===== EXISTING FEATURE CALCULATIONS =====
-        inflow = df[df['paid_in'] > 0]['paid_in'].sum()
-        outflow = df[df['withdrawn'] > 0]['withdrawn'].sum()
-        net_flow = inflow - outflow
-
-        # Improved repayment pattern detection
-        repayment_patterns = [
-            "repay", "loan", "lend", "borrow", "credit", 
-            "finance", "microfinance", "branch", "equity", 
-            "kcb", "cooperative", "sacco", "m-shwari"
-        ]
-        
-        # Count transactions that might indicate financial responsibility
-        repayments = df['details'].str.contains(
-            "|".join(repayment_patterns), 
-            case=False, 
-            na=False
-        ).sum()
-        
-        # Also count consistent send money patterns
-        send_money_count = df['details'].str.contains("send money", case=False, na=False).sum()
-        
-        # If user has regular send money patterns, count some as potential repayments
-        potential_repayments = repayments + (send_money_count * 0.3)
-        
-        repayment_ratio = potential_repayments / len(df) if len(df) > 0 else 0
-
-        balance_volatility = df['balance'].std() if 'balance' in df.columns else 0
-        avg_transaction = df[df['paid_in'] > 0]['paid_in'].mean() or 0
-        transaction_count = len(df)
-
-        # ===== COMBINE ALL FEATURES =====
-        features = {
-            # Existing features
-            'monthly_inflow': inflow,
-            'monthly_outflow': outflow,
-            'net_cash_flow': net_flow,
-            'repayments': int(potential_repayments),
-            'repayment_ratio': repayment_ratio,
-            'balance_volatility': balance_volatility,
-            'avg_transaction_amount': avg_transaction,
-            'transaction_count': transaction_count,
-            
-            # New temporal features
-            **temporal_features,
-            
-            # Metadata
-            'has_temporal_data': has_temporal_data
-        }
-        
-        # Convert all values to native Python types
-        features = {k: convert_numpy_types(v) for k, v in features.items()}
-        
-        logger.info(f"🔍 Features extracted: {features}")
-        return features
-        
-    except Exception as e:
-        logger.error(f"Error extracting features: {str(e)}")
-        raise
-
-def prepare_features_for_model(features):
+def prepare_features_for_model(features, active_model=None):
     """Convert features to the exact format expected by your trained model"""
-    # Define feature order - MUST MATCH WHAT YOUR MODEL WAS TRAINED WITH
-    # Check your model's feature count!
-    if model and hasattr(model, 'n_features_in_'):
-        feature_count = model.n_features_in_
-        logger.info(f"📊 Model expects {feature_count} features")
-        
-        if feature_count == 8:
-            # Old model (8 features)
-            feature_columns = [
-                'monthly_inflow', 'monthly_outflow', 'net_cash_flow',
-                'repayments', 'repayment_ratio', 'balance_volatility',
-                'avg_transaction_amount', 'transaction_count'
-            ]
-        elif feature_count == 12:
-            # New model with temporal features (12 features)
-            feature_columns = [
-                'monthly_inflow', 'monthly_outflow', 'net_cash_flow',
-                'repayments', 'repayment_ratio', 'balance_volatility',
-                'avg_transaction_amount', 'transaction_count',
-                'days_covered', 'transactions_per_day', 'inflow_trend', 'transaction_consistency'
-            ]
-        else:
-            # Default to new model
-            feature_columns = [
-                'monthly_inflow', 'monthly_outflow', 'net_cash_flow',
-                'repayments', 'repayment_ratio', 'balance_volatility',
-                'avg_transaction_amount', 'transaction_count',
-                'days_covered', 'transactions_per_day', 'inflow_trend', 'transaction_consistency'
-            ]
-    else:
-        # Default to 12 features if we can't determine
-        feature_columns = [
-            'monthly_inflow', 'monthly_outflow', 'net_cash_flow',
-            'repayments', 'repayment_ratio', 'balance_volatility',
-            'avg_transaction_amount', 'transaction_count',
-            'days_covered', 'transactions_per_day', 'inflow_trend', 'transaction_consistency'
-        ]
+    active_model = active_model if active_model is not None else model
+    # Column order comes from the versioned spec the model was trained on
+    spec_version = spec_version_for_model(active_model)
+    feature_columns_for_model = feature_columns(spec_version)
     
     # Ensure all features exist with default values
-    for col in feature_columns:
+    for col in feature_columns_for_model:
         if col not in features:
             features[col] = 0
     
     # Create array in the exact order
-    feature_array = np.array([[features[col] for col in feature_columns]])
-    logger.info(f"📊 Prepared {len(feature_columns)} features for model")
+    feature_array = np.array([[features[col] for col in feature_columns_for_model]])
+    logger.info(f"📊 Prepared {len(feature_columns_for_model)} features for model (spec {spec_version})")
     return feature_array
 
-def predict_with_ai_model(features):
+def select_model(channel=None):
+    """(model, variant) for a request channel: the compact model for low-latency channels when loaded"""
+    if channel in LOW_LATENCY_CHANNELS and compact_model is not None:
+        return compact_model, 'compact'
+    return model, 'primary'
+
+def counterparty_features_needed():
+    """True when any loaded model (primary, compact or shadow candidate) uses the spec v3 counterparty features"""
+    columns = [col for m in (model, compact_model) if m is not None for col in feature_columns(spec_version_for_model(m))]
+    if shadow_scorer is not None:
+        columns += [col for _, candidate_columns in shadow_scorer.candidates.values() for col in candidate_columns]
+    return needs_counterparty_features(columns)
+
+def predict_with_ai_model(features, active_model=None):
     """Use your trained AI model for prediction"""
-    if model is None:
+    # Hold one reference for the whole request so a hot-swap can't mix models mid-prediction
+    if active_model is None:
+        active_model = model
+    if active_model is None:
         raise Exception("AI model not loaded - using fallback scoring")
     
     try:
         # Prepare features for model
-        X = prepare_features_for_model(features)
+        X = prepare_features_for_model(features, active_model)
         
         # Make prediction
         logger.info(f"🤖 Making AI prediction with features shape: {X.shape}")
         
-        if hasattr(model, 'predict_proba'):
-            prediction_proba = model.predict_proba(X)[0]
-            prediction = model.predict(X)[0]
+        if hasattr(active_model, 'predict_proba'):
+            prediction_proba = active_model.predict_proba(X)[0]
+            prediction = active_model.predict(X)[0]
             
             logger.info(f"📈 Prediction probabilities: {prediction_proba}")
             logger.info(f"🎯 Raw prediction: {prediction}")
@@ -459,23 +424,41 @@ def predict_with_ai_model(features):
                 'prediction': int(prediction),
                 'approval_probability': float(approval_probability),
                 'model_used': True,
-                'model_type': type(model).__name__
+                'model_type': type(active_model).__name__
             }
         else:
-            prediction = model.predict(X)[0]
+            prediction = active_model.predict(X)[0]
             logger.info(f"🎯 Raw prediction: {prediction}")
             
             return {
                 'prediction': int(prediction),
                 'approval_probability': None,
                 'model_used': True,
-                'model_type': type(model).__name__
+                'model_type': type(active_model).__name__
             }
         
     except Exception as e:
         logger.error(f"AI model prediction failed: {str(e)}")
         raise
 
+def reload_model(path=None):
+    """Load and warm a new model, then swap it in atomically for subsequent requests"""
+    global model, compact_model, compact_manifest
+    path = path or MODEL_PATH
+    with _model_swap_lock:
+        new_model = load_model(path)
+        if hasattr(new_model, 'predict_proba'):
+            # Pay the first-call cost before the model takes traffic
+            new_model.predict_proba(prepare_features_for_model({}, new_model))
+        previous = type(model).__name__ if model is not None else "none"
+        model = new_model
+        mismatch = calibration_mismatch(model, compact_model)
+        if mismatch:
+            logger.error(f"❌ Compact model withdrawn, latency-critical channels use the main model: {mismatch}")
+            compact_model, compact_manifest = None, None
+    logger.info(f"🔁 Model hot-swapped from {path} ({previous} -> {type(new_model).__name__})")
+    return new_model
+
 def fallback_prediction(features):
     """Fallback to rule-based scoring if model fails"""
     logger.warning("🔄 Using fallback rule-based scoring")
@@ -502,32 +485,508 @@ def fallback_prediction(features):
         score += 10
     
     final_score = max(0, min(100, score))
-    
-    if final_score >= 60:
-        decision = "APPROVED"
-        limit = min(50000, max(5000, final_score * 500))
-    elif final_score >= 40:
-        decision = "APPROVED_WITH_CAUTION"
-        limit = min(10000, max(1000, final_score * 200))
-    elif final_score >= 20:
-        decision = "REVIEW_NEEDED"
-        limit = 0
-    else:
-        decision = "DECLINED"
-        limit = 0
+    decision = decisions.FALLBACK_DECISIONS.decide(final_score / 100)
     
     return {
         'credit_score': round(final_score, 2),
-        'decision': decision,
-        'recommended_limit': round(limit, 2),
+        'decision': decision['decision_status'],
+        'recommended_limit': decision['recommended_limit'],
+        'synthetic_interest_rate': decision['synthetic_interest_rate'],
         'model_used': False,
         'reasoning': f"Fallback scoring: Net flow KES {features['net_cash_flow']:.0f}, Repayments: {features['repayments']}, Volatility: {features['balance_volatility']:.0f}"
     }
 
+def score_statement(raw_bytes, channel=None, record=True, statement_format='csv', customer_id=None):
+    """Parse, validate and score one statement; returns (response_dict, http_status)"""
+    # Read and parse the statement into the compact typed schema
+    try:
+        df = statement_schema.read_statement(raw_bytes, statement_format)
+    except statement_schema.MalformedStatement as e:
+        return {'error': str(e)}, 400
+    logger.info(f"✅ Successfully parsed {statement_format} statement with {len(df)} rows")
+
+    # Validate required columns
+    missing_columns = statement_schema.missing_columns(df)
+
+    if missing_columns:
+        return {'error': f'{statement_format.upper()} missing required columns: {missing_columns}'}, 400
+
+    # A known customer's upload also lands in their history (see /api/customers/<id>/score)
+    previously_seen = None
+    if customer_id:
+        ingested = receipt_store.ingest(customer_id, df, statement_schema.REQUIRED_COLUMNS, add=record)
+        previously_seen = ingested['already_ingested']
+
+    # Drop repeated receipts and reversed transactions before they inflate inflow and counts
+    uploaded_df = df
+    df, receipt_check = receipt_index.clean_statement(df)
+
+    if previously_seen is not None:
+        receipt_check['previously_seen'] = previously_seen
+    if any(receipt_check.values()):
+        logger.info(f"🧾 Receipt check: {receipt_check}")
+
+    # Balance continuity, ordering and gaps on the statement as uploaded
+    integrity_report = integrity.check_statement(uploaded_df, duplicate_receipts=receipt_check['duplicates_removed'])
+    if integrity_report['confidence'] != 'high':
+        logger.warning(f"🔎 Statement integrity {integrity_report['confidence']}: {integrity_report['issues']}")
+
+    # Extract features (counterparty concentration only when a loaded model was trained on it)
+    features = extract_features(df, counterparty=counterparty_features_needed())
+
+    # Parse and format transactions for display
+    transactions = parse_and_format_transactions(df)
+    logger.info(f"📊 Processed {len(transactions)} transactions for display")
+
+    # Try to use AI model first, fallback to rule-based if needed
+    try:
+        active_model, model_variant = select_model(channel)
+        model_prediction = predict_with_ai_model(features, active_model)
+        logger.info(f"🤖 AI Model prediction: {model_prediction}")
+
+        if model_prediction['approval_probability'] is not None:
+            # Calibration, cut-offs, limit and rate in one lookup
+            decision_table = decision_table_for(active_model)
+            decision = decision_table.decide(model_prediction['approval_probability'])
+            prob = decision['approval_probability']
+            credit_score = round(prob * 100, 2)
+
+            explanations = explain_credit_decision(
+                features=features,
+                prediction=model_prediction['prediction'],
+                prediction_proba=prob
+            )
+
+            prediction_result = {
+                'decision_status': decision['decision_status'],
+                'alt_score': credit_score,
+                'synthetic_interest_rate': decision['synthetic_interest_rate'],
+                'recommended_limit': decision['recommended_limit'],
+                'model_used': True,
+                'approval_probability': round(prob, 4),
+                'model_type': model_prediction['model_type'],
+                'model_variant': model_variant,
+                'explanations': explanations,
+                'reason_codes': [
+                    f"Transaction pattern analysis: {credit_score}% confidence",
+                    f"Cash flow: {'Positive' if features['net_cash_flow'] > 0 else 'Needs improvement'}",
+                    f"Repayment history: {features['repayments']} transactions identified"
+                ],
+                'breakdown': {
+                    'cash_flow_analysis': f"KES {features['net_cash_flow']:.0f} net monthly flow",
+                    'repayment_behavior': f"{features['repayments']} repayment transactions",
+                    'balance_stability': f"Volatility: KES {features['balance_volatility']:.0f}",
+                    'transaction_volume': f"{features['transaction_count']} total transactions"
+                }
+            }
+            if decision_table.calibration is not None:
+                prediction_result['raw_approval_probability'] = round(model_prediction['approval_probability'], 4)
+                prediction_result['calibration'] = decision_table.method
+        else:
+            raw_pred = model_prediction['prediction']
+            decision_status = "APPROVED" if raw_pred == 1 else "DECLINED"
+            credit_score = 100 if raw_pred == 1 else 0
+
+            explanations = explain_credit_decision(
+                features=features,
+                prediction=raw_pred,
+                prediction_proba=None
+            )
+
+            prediction_result = {
+                'decision_status': decision_status,
+                'alt_score': credit_score,
+                'synthetic_interest_rate': 12.0 if raw_pred == 1 else 0,
+                'recommended_limit': 50000 if raw_pred == 1 else 0,
+                'model_used': True,
+                'model_type': model_prediction['model_type'],
+                'model_variant': model_variant,
+                'explanations': explanations,
+                'reason_codes': [f"AI classification: {'Creditworthy' if raw_pred == 1 else 'Not creditworthy'}"],
+                'breakdown': {
+                    'ai_assessment': 'Model classification completed',
+                    'decision_basis': 'Trained on transaction patterns'
+                }
+            }
+
+    except Exception as model_error:
+        logger.warning(f"AI model failed, using fallback: {model_error}")
+        fallback = fallback_prediction(features)
+
+        explanations = explain_credit_decision(
+            features=features,
+            prediction=1 if fallback['credit_score'] >= 60 else 0,
+            prediction_proba=fallback['credit_score'] / 100
+        )
+
+        prediction_result = {
+            'decision_status': fallback['decision'],
+            'alt_score': fallback['credit_score'],
+            'synthetic_interest_rate': fallback['synthetic_interest_rate'],
+            'recommended_limit': fallback['recommended_limit'],
+            'model_used': False,
+            'explanations': explanations,
+            'reason_codes': [fallback['reasoning']],
+            'breakdown': {
+                'fallback_analysis': 'Rule-based scoring used',
+                'scoring_factors': 'Cash flow, repayments, stability'
+            }
+        }
+
+    logger.info(f"🎯 Final prediction: {prediction_result['decision_status']} (Score: {prediction_result['alt_score']})")
+    if record:
+        portfolio_rollup.record(prediction_result)
+        # The drift reference holds raw model probabilities (train_and_save_model.py)
+        drift_monitor.observe(
+            features, prediction_result.get('raw_approval_probability', prediction_result.get('approval_probability')))
+        if shadow_scorer is not None and prediction_result.get('model_variant') == 'primary' \
+                and prediction_result.get('approval_probability') is not None:
+            shadow_scorer.submit(features, prediction_result['approval_probability'], prediction_result['decision_status'])
+
+    # Prepare response - ensure all dates are serializable
+    features_clean = {k: convert_numpy_types(v) for k, v in features.items()}
+    transactions_clean = []
+    for tx in transactions:
+        tx_clean = {}
+        for k, v in tx.items():
+            tx_clean[k] = convert_numpy_types(v)
+        transactions_clean.append(tx_clean)
+
+    response = {
+        'status': 'success',
+        'features': features_clean,
+        'transactions': transactions_clean,
+        'prediction': prediction_result,
+        'receipt_check': receipt_check,
+        'integrity': integrity_report,
+        'timestamp': datetime.now().isoformat()
+    }
+
+    if record:
+        response['audit_id'] = uuid.uuid4().hex
+        audit_log.record({
+            'audit_id': response['audit_id'],
+            'timestamp': response['timestamp'],
+            'customer_id': customer_id,
+            'channel': channel,
+            'statement_format': statement_format,
+            'rows': len(df),
+            'receipt_check': receipt_check,
+            'integrity': integrity_report,
+            'features': features_clean,
+            'prediction': prediction_result
+        }, raw_bytes)
+
+    return response, 200
+
+def score_statement_with_budget(raw_bytes, estimate, channel=None, statement_format='csv', customer_id=None):
+    """score_statement for the background lane, holding the memory reservation while it runs"""
+    memory_budget.acquire(estimate, timeout=None)
+    try:
+        return score_statement(raw_bytes, channel, statement_format=statement_format, customer_id=customer_id)
+    finally:
+        memory_budget.release(estimate)
+
 # ============================================
 # API ENDPOINTS
 # ============================================
 
+def current_rss_mb():
+    """Resident set size of this worker process in MB (peak RSS where /proc is unavailable)"""
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    try:
+        import resource
+        import sys
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is bytes on macOS, KB elsewhere
+        return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+    except ImportError:
+        return None
+
+def request_channel():
+    """Originating channel from the X-Channel header or a 'channel' query/form field (e.g. 'ussd')"""
+    channel = request.headers.get('X-Channel') or request.values.get('channel') or ''
+    return channel.strip().lower() or None
+
+def request_priority(default='interactive'):
+    """Scheduler class from X-Priority ('batch'/'bulk' or 'interactive'); unknown values get the default"""
+    priority = (request.headers.get('X-Priority') or '').strip().lower()
+    if priority in ('batch', 'bulk'):
+        return 'batch'
+    return 'interactive' if priority == 'interactive' else default
+
+def request_client():
+    """Rate-limit key: the caller's address, seen through TRUSTED_PROXIES (X-Client-Id, else X-Forwarded-For)"""
+    remote = request.remote_addr or 'unknown'
+    if remote not in TRUSTED_PROXIES:
+        return remote
+    client_id = (request.headers.get('X-Client-Id') or '').strip()
+    if client_id:
+        return client_id
+    # Walk the hops right to left: the first one no trusted proxy added is the client
+    hops = [hop.strip() for hop in request.headers.get('X-Forwarded-For', '').split(',') if hop.strip()]
+    for hop in reversed(hops):
+        if hop not in TRUSTED_PROXIES:
+            return hop
+    return hops[0] if hops else remote
+
+def request_customer_id():
+    """Customer the statement belongs to (X-Customer-Id header or 'customer_id' field); enables cross-upload checks"""
+    customer_id = request.headers.get('X-Customer-Id') or request.values.get('customer_id') or ''
+    return customer_id.strip() or None
+
+def read_upload(stream, encoding):
+    """Upload bytes, inflated chunk by chunk (and size-capped) when gzip/zstd encoded"""
+    if encoding is None:
+        return stream.read()
+    return compression.decompress_chunks(
+        compression.iter_chunks(stream), encoding, int(MAX_DECOMPRESSED_MB * 1024 * 1024))
+
+def json_body(payload, status=200):
+    """jsonify for potentially large bodies: streamed and gzip/zstd-negotiated above RESPONSE_COMPRESS_MIN_BYTES"""
+    return compression.json_response(
+        app, payload, status, request.headers.get('Accept-Encoding'), RESPONSE_COMPRESS_MIN_BYTES)
+
+def size_statement(raw_bytes, statement_format):
+    """(rows, estimated bytes to score) for a statement; AdmissionRejected (413) when it can never fit"""
+    # Size the statement before pandas touches it
+    if statement_format == 'csv':
+        n_rows = admission.count_rows(raw_bytes)
+    else:
+        n_rows = statement_schema.count_statement_rows(raw_bytes, statement_format)
+    estimate = admission.estimate_statement_memory(len(raw_bytes), n_rows)
+    logger.info(f"📏 Statement ({statement_format}): {len(raw_bytes)} bytes, {n_rows} rows, ~{estimate / 1048576:.1f} MB estimated")
+    
+    if n_rows > MAX_STATEMENT_ROWS:
+        raise admission.AdmissionRejected(
+            413, f'Statement has {n_rows} rows; the limit is {MAX_STATEMENT_ROWS}')
+    if estimate > memory_budget.limit_bytes:
+        raise admission.AdmissionRejected(
+            413, f'Statement needs ~{estimate / 1048576:.0f} MB to score, above the '
+                 f'{memory_budget.limit_bytes / 1048576:.0f} MB per-worker budget')
+    return n_rows, estimate
+
+def reserve_memory(estimate):
+    """Take a memory reservation, waiting at most ADMISSION_WAIT_SECONDS; AdmissionRejected (503) otherwise"""
+    if not memory_budget.acquire(estimate, timeout=ADMISSION_WAIT_SECONDS):
+        raise admission.AdmissionRejected(
+            503, 'Worker memory budget is exhausted by concurrent statements, retry shortly',
+            retry_after=5)
+
+def admit_and_score(raw_bytes, statement_format, channel=None, customer_id=None, priority='interactive'):
+    """Size the statement, then score it inline, queue it for the async lane, or raise AdmissionRejected"""
+    n_rows, estimate = size_statement(raw_bytes, statement_format)
+    
+    if n_rows >= ASYNC_ROW_THRESHOLD:
+        # Large statements are scored off the interactive path; the client polls for the result
+        job_id = large_statement_queue.submit(
+            score_statement_with_budget, raw_bytes, estimate, channel, statement_format, customer_id)
+        logger.info(f"📥 Queued large statement ({n_rows} rows) as job {job_id}")
+        return jsonify({
+            'status': 'accepted',
+            'job_id': job_id,
+            'status_url': f'/api/predict/jobs/{job_id}',
+            'rows': n_rows,
+            'timestamp': datetime.now().isoformat()
+        }), 202, {'Retry-After': str(JOB_POLL_SECONDS)}
+    
+    response, status_code = request_scheduler.run(
+        priority, request_client(), score_within_budget,
+        raw_bytes, estimate, channel, not is_warmup_request(), statement_format, customer_id)
+    return json_body(response, status_code)
+
+def score_within_budget(raw_bytes, estimate, channel, record, statement_format, customer_id):
+    """score_statement under a memory reservation, waiting at most ADMISSION_WAIT_SECONDS for one"""
+    reserve_memory(estimate)
+    try:
+        return score_statement(
+            raw_bytes, channel, record=record, statement_format=statement_format, customer_id=customer_id)
+    finally:
+        memory_budget.release(estimate)
+
+def admission_rejected(e):
+    """JSON error response for an AdmissionRejected (with Retry-After when set)"""
+    logger.warning(f"🚫 Statement rejected ({e.status_code}): {e.reason}")
+    rejection = jsonify({
+        'status': 'error',
+        'error': e.reason,
+        'timestamp': datetime.now().isoformat()
+    })
+    if e.retry_after:
+        rejection.headers['Retry-After'] = str(e.retry_after)
+    return rejection, e.status_code
+
+def is_warmup_request():
+    """True for the synthetic requests sent by warmup.py at startup"""
+    return bool(request.environ.get('mpesa.warmup'))
+
+def has_admin_token():
+    """Constant-time check of the X-Admin-Token header against ADMIN_TOKEN"""
+    supplied = request.headers.get('X-Admin-Token', '')
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(supplied.encode('utf-8'), ADMIN_TOKEN.encode('utf-8'))
+
+def require_admin():
+    """Return an error response unless the request carries the admin token"""
+    if not ADMIN_TOKEN:
+        return jsonify({'error': 'Admin endpoints are disabled (ADMIN_TOKEN not set)'}), 404
+    if not has_admin_token():
+        return jsonify({'error': 'Admin token required'}), 403
+    return None
+
+def customer_token(customer_id):
+    """Token a caller presents (X-Customer-Token) to read or extend one customer's history"""
+    return hmac.new(CUSTOMER_TOKEN_SECRET.encode('utf-8'), customer_id.encode('utf-8'), 'sha256').hexdigest()
+
+def require_customer(customer_id):
+    """Return an error response unless the caller may use this customer's history (admin or customer token)"""
+    if not ADMIN_TOKEN and not CUSTOMER_TOKEN_SECRET:
+        return jsonify({'error': 'Customer histories are disabled (set CUSTOMER_TOKEN_SECRET or ADMIN_TOKEN)'}), 404
+    if has_admin_token():
+        return None
+    supplied = request.headers.get('X-Customer-Token', '')
+    if CUSTOMER_TOKEN_SECRET and hmac.compare_digest(supplied.encode('utf-8'), customer_token(customer_id).encode('utf-8')):
+        return None
+    return jsonify({'error': 'Customer token required'}), 403
+
+def profile_trigger():
+    """'requested' (admin flag), 'sampled' (PROFILE_SAMPLE_RATE) or None for the normal, unprofiled path"""
+    flag = request.headers.get('X-Profile') or request.args.get('profile')
+    if flag and flag != '0' and has_admin_token():
+        return 'requested'
+    if PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE:
+        return 'sampled'
+    return None
+
+def profiled(view):
+    """Sample the view's stack (through the end of a streamed response) when profile_trigger() selects the request"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        trigger = profile_trigger()
+        if trigger is None:
+            return view(*args, **kwargs)
+        session = profiler.ProfileSession(PROFILE_DIR, {
+            'method': request.method,
+            'path': request.path,
+            'trigger': trigger,
+            'content_length': request.content_length,
+            'started_at': datetime.now().isoformat()
+        }, interval=PROFILE_INTERVAL_MS / 1000, keep=PROFILE_KEEP)
+        # Lets scheduler lane threads running this request's work join the profile
+        token = profiler.current_session.set(session)
+        try:
+            response = app.make_response(view(*args, **kwargs))
+        except Exception:
+            session.finish()
+            raise
+        finally:
+            profiler.current_session.reset(token)
+        response.headers['X-Profile-Id'] = session.profile_id
+        # Runs once the body has been sent, so streamed JSON encoding is part of the profile
+        response.call_on_close(session.finish)
+        return response
+    return wrapper
+
+@app.errorhandler(413)
+def upload_too_large(e):
+    """Reject oversized uploads with a JSON body the frontend can show"""
+    return jsonify({
+        'status': 'error',
+        'error': f'Upload exceeds the {MAX_UPLOAD_MB:g} MB limit',
+        'timestamp': datetime.now().isoformat()
+    }), 413
+
+@app.route('/api/admin/reload-model', methods=['POST'])
+def reload_model_endpoint():
+    """Hot-swap the model in this process from MODEL_PATH (or a JSON 'path')"""
+    denied = require_admin()
+    if denied:
+        return denied
+    
+    path = (request.get_json(silent=True) or {}).get('path') or MODEL_PATH
+    try:
+        new_model = reload_model(path)
+    except Exception as e:
+        logger.error(f"❌ Model reload failed, keeping current model: {str(e)}")
+        return jsonify({'status': 'error', 'error': str(e)}), 500
+    
+    return jsonify({
+        'status': 'success',
+        'model_path': path,
+        'model_type': type(new_model).__name__,
+        'pid': os.getpid(),
+        'timestamp': datetime.now().isoformat()
+    })
+
+def parse_audit_time(value):
+    """Epoch seconds or an ISO timestamp (local time, like the 'timestamp' fields) -> epoch seconds"""
+    if value is None or value == '':
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+@app.route('/api/admin/audit', methods=['GET'])
+def audit_records():
+    """Range scan of the decision audit log: ?from=&to= (ISO or epoch), ?statement_hash=, ?limit= (admin)"""
+    denied = require_admin()
+    if denied:
+        return denied
+    
+    try:
+        start = parse_audit_time(request.args.get('from'))
+        end = parse_audit_time(request.args.get('to'))
+        limit = min(int(request.args.get('limit', '1000')), 10000)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'error': f'Invalid audit query: {str(e)}'}), 400
+    
+    started = time.perf_counter()
+    records, members_read = audit.scan(
+        AUDIT_DIR, start=start, end=end, statement_hash=request.args.get('statement_hash') or None, limit=limit)
+    return json_body({
+        'status': 'success',
+        'records': records,
+        'count': len(records),
+        'members_read': members_read,
+        'scan_ms': round((time.perf_counter() - started) * 1000, 2),
+        'note': f'Decisions reach the log within ~{audit_log.flush_seconds:g}s of being made',
+        'timestamp': datetime.now().isoformat()
+    })
+
+@app.route('/api/admin/profiles', methods=['GET'])
+def list_profiles():
+    """Stored request profiles, newest first, with duration and hottest frames (admin)"""
+    denied = require_admin()
+    if denied:
+        return denied
+    
+    return jsonify({
+        'status': 'success',
+        'profiles': profiler.list_profiles(PROFILE_DIR, limit=int(request.args.get('limit', '50'))),
+        'sample_rate': PROFILE_SAMPLE_RATE,
+        'timestamp': datetime.now().isoformat()
+    })
+
+@app.route('/api/admin/profiles/<profile_id>', methods=['GET'])
+def download_profile(profile_id):
+    """One profile as ?format=speedscope (default, open in speedscope.app) or collapsed stacks (admin)"""
+    denied = require_admin()
+    if denied:
+        return denied
+    
+    fmt = request.args.get('format', 'speedscope')
+    path = profiler.profile_path(PROFILE_DIR, profile_id, fmt)
+    if path is None:
+        return jsonify({'error': 'Unknown profile id or format (expected speedscope or collapsed)'}), 404
+    return send_file(os.path.abspath(path), mimetype='application/json' if fmt == 'speedscope' else 'text/plain',
+                     as_attachment=True, download_name=os.path.basename(path))
+
 @app.route('/api/explain', methods=['POST'])
 def explain_decision():
     """Endpoint to get explanations for credit decisions without prediction"""
@@ -557,168 +1016,110 @@ def explain_decision():
         logger.error(f"Explanation error: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/predict', methods=['POST'])
-def predict():
-    """Main prediction endpoint using your AI model WITH explanations"""
+@app.route('/api/whatif', methods=['POST'])
+@profiled
+def what_if():
+    """Score a feature vector under a grid of perturbations in one batched model call"""
     try:
-        logger.info(f"📨 Received POST request to /api/predict")
-        
-        if 'mpesa_statement' not in request.files and 'file' not in request.files:
-            return jsonify({'error': 'No file uploaded'}), 400
-        
-        file_field = 'mpesa_statement' if 'mpesa_statement' in request.files else 'file'
-        file = request.files[file_field]
-        
-        logger.info(f"📁 Processing file: {file.filename}")
-        
-        if file.filename == '':
-            return jsonify({'error': 'No file selected'}), 400
+        data = request.get_json(silent=True) or {}
+        features = data.get('features', {})
+        perturbations = data.get('perturbations', {})
         
-        if not file.filename.endswith('.csv'):
-            return jsonify({'error': 'File must be a CSV'}), 400
+        if not features:
+            return jsonify({'error': 'No features provided'}), 400
         
-        # Read and parse CSV
-        df = pd.read_csv(file)
-        logger.info(f"✅ Successfully parsed CSV with {len(df)} rows")
+        active_model, model_variant = select_model(request_channel())
+        if active_model is None or not hasattr(active_model, 'predict_proba'):
+            return jsonify({'error': 'What-if analysis needs a loaded probabilistic model'}), 503
         
-        # Validate required columns
-        required_columns = ['receipt_no.', 'completion_time', 'details', 'transaction_status', 'paid_in', 'withdrawn', 'balance']
-        missing_columns = [col for col in required_columns if col not in df.columns]
+        started = time.perf_counter()
+        columns = feature_columns(spec_version_for_model(active_model))
+        result = whatif.analyse(active_model, features, perturbations, columns, WHATIF_MAX_VARIANTS,
+                                decision_table_for(active_model))
+        logger.info(f"🔮 What-if: {result['variants']} variants scored in {(time.perf_counter() - started) * 1000:.1f} ms")
         
-        if missing_columns:
-            return jsonify({'error': f'CSV missing required columns: {missing_columns}'}), 400
+        return jsonify({
+            'status': 'success',
+            **result,
+            'model_type': type(active_model).__name__,
+            'model_variant': model_variant,
+            'timestamp': datetime.now().isoformat()
+        })
         
-        # Extract features
-        features = extract_features(df)
+    except whatif.WhatIfError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"What-if error: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/predict', methods=['POST'])
+@profiled
+def predict():
+    """Main prediction endpoint using your AI model WITH explanations"""
+    try:
+        logger.info(f"📨 Received POST request to /api/predict")
         
-        # Parse and format transactions for display
-        transactions = parse_and_format_transactions(df)
-        logger.info(f"📊 Processed {len(transactions)} transactions for display")
+        # Naming a customer writes the upload into their history
+        customer_id = request_customer_id()
+        if customer_id:
+            denied = require_customer(customer_id)
+            if denied:
+                return denied
         
-        # Try to use AI model first, fallback to rule-based if needed
-        try:
-            model_prediction = predict_with_ai_model(features)
-            logger.info(f"🤖 AI Model prediction: {model_prediction}")
+        if 'mpesa_statement' in request.files or 'file' in request.files:
+            file_field = 'mpesa_statement' if 'mpesa_statement' in request.files else 'file'
+            file = request.files[file_field]
             
-            if model_prediction['approval_probability'] is not None:
-                prob = model_prediction['approval_probability']
-                credit_score = round(prob * 100, 2)
-                
-                if prob >= 0.7:
-                    decision_status = "APPROVED"
-                    limit = prob * 50000
-                elif prob >= 0.5:
-                    decision_status = "APPROVED_WITH_CAUTION" 
-                    limit = prob * 20000
-                elif prob >= 0.3:
-                    decision_status = "REVIEW_NEEDED"
-                    limit = 0
-                else:
-                    decision_status = "DECLINED"
-                    limit = 0
-                    
-                base_rate = 12.0
-                risk_adjustment = (1 - prob) * 15.0
-                synthetic_interest_rate = round(base_rate + risk_adjustment, 2)
-                    
-                explanations = explain_credit_decision(
-                    features=features,
-                    prediction=model_prediction['prediction'],
-                    prediction_proba=prob
-                )
-                    
-                prediction_result = {
-                    'decision_status': decision_status,
-                    'alt_score': credit_score,
-                    'synthetic_interest_rate': synthetic_interest_rate,
-                    'recommended_limit': round(limit, 2),
-                    'model_used': True,
-                    'approval_probability': round(prob, 4),
-                    'model_type': model_prediction['model_type'],
-                    'explanations': explanations,
-                    'reason_codes': [
-                        f"Transaction pattern analysis: {credit_score}% confidence",
-                        f"Cash flow: {'Positive' if features['net_cash_flow'] > 0 else 'Needs improvement'}",
-                        f"Repayment history: {features['repayments']} transactions identified"
-                    ],
-                    'breakdown': {
-                        'cash_flow_analysis': f"KES {features['net_cash_flow']:.0f} net monthly flow",
-                        'repayment_behavior': f"{features['repayments']} repayment transactions",
-                        'balance_stability': f"Volatility: KES {features['balance_volatility']:.0f}",
-                        'transaction_volume': f"{features['transaction_count']} total transactions"
-                    }
-                }
-            else:
-                raw_pred = model_prediction['prediction']
-                decision_status = "APPROVED" if raw_pred == 1 else "DECLINED"
-                credit_score = 100 if raw_pred == 1 else 0
-                
-                explanations = explain_credit_decision(
-                    features=features,
-                    prediction=raw_pred,
-                    prediction_proba=None
-                )
-                
-                prediction_result = {
-                    'decision_status': decision_status,
-                    'alt_score': credit_score,
-                    'synthetic_interest_rate': 12.0 if raw_pred == 1 else 0,
-                    'recommended_limit': 50000 if raw_pred == 1 else 0,
-                    'model_used': True,
-                    'model_type': model_prediction['model_type'],
-                    'explanations': explanations,
-                    'reason_codes': [f"AI classification: {'Creditworthy' if raw_pred == 1 else 'Not creditworthy'}"],
-                    'breakdown': {
-                        'ai_assessment': 'Model classification completed',
-                        'decision_basis': 'Trained on transaction patterns'
-                    }
-                }
-                
-        except Exception as model_error:
-            logger.warning(f"AI model failed, using fallback: {model_error}")
-            fallback = fallback_prediction(features)
+            logger.info(f"📁 Processing file: {file.filename}")
             
-            explanations = explain_credit_decision(
-                features=features,
-                prediction=1 if fallback['credit_score'] >= 60 else 0,
-                prediction_proba=fallback['credit_score'] / 100
-            )
+            if file.filename == '':
+                return jsonify({'error': 'No file selected'}), 400
             
-            prediction_result = {
-                'decision_status': fallback['decision'],
-                'alt_score': fallback['credit_score'],
-                'synthetic_interest_rate': 15.0 if fallback['credit_score'] > 60 else 25.0,
-                'recommended_limit': fallback['recommended_limit'],
-                'model_used': False,
-                'explanations': explanations,
-                'reason_codes': [fallback['reasoning']],
-                'breakdown': {
-                    'fallback_analysis': 'Rule-based scoring used',
-                    'scoring_factors': 'Cash flow, repayments, stability'
-                }
-            }
+            # statement.csv.gz / statement.csv.zst are inflated before parsing
+            encoding, filename = compression.split_encoding_suffix(file.filename)
+            statement_format = statement_schema.format_from_filename(filename)
+            if statement_format is None:
+                return jsonify({'error': 'File must be a CSV, Parquet, Arrow IPC or NDJSON statement'}), 400
+            
+            raw_bytes = read_upload(file.stream, encoding)
+        else:
+            # Partner integrations can send the statement as the raw body, typed by Content-Type
+            statement_format = statement_schema.format_from_content_type(request.content_type)
+            if statement_format is None:
+                return jsonify({'error': 'No file uploaded'}), 400
+            encoding = request.headers.get('Content-Encoding', '').strip().lower()
+            raw_bytes = read_upload(request.stream, None if encoding in ('', 'identity') else encoding)
         
-        logger.info(f"🎯 Final prediction: {prediction_result['decision_status']} (Score: {prediction_result['alt_score']})")
+        return admit_and_score(
+            raw_bytes, statement_format, request_channel(), customer_id, request_priority())
         
-        # Prepare response - ensure all dates are serializable
-        features_clean = {k: convert_numpy_types(v) for k, v in features.items()}
-        transactions_clean = []
-        for tx in transactions:
-            tx_clean = {}
-            for k, v in tx.items():
-                tx_clean[k] = convert_numpy_types(v)
-            transactions_clean.append(tx_clean)
+    except admission.AdmissionRejected as e:
+        return admission_rejected(e)
         
-        response = {
-            'status': 'success',
-            'features': features_clean,
-            'transactions': transactions_clean,
-            'prediction': prediction_result,
+    except compression.DecompressedTooLarge as e:
+        return jsonify({
+            'status': 'error',
+            'error': str(e),
             'timestamp': datetime.now().isoformat()
-        }
+        }), 413
         
-        return jsonify(response)
+    except (compression.CorruptCompressedUpload, statement_schema.MalformedStatement) as e:
+        return jsonify({
+            'status': 'error',
+            'error': str(e),
+            'timestamp': datetime.now().isoformat()
+        }), 400
         
+    except (statement_schema.UnsupportedStatementFormat, compression.UnsupportedEncoding) as e:
+        return jsonify({
+            'status': 'error',
+            'error': str(e),
+            'timestamp': datetime.now().isoformat()
+        }), 415
+        
+    except RequestEntityTooLarge:
+        # Let the 413 handler answer instead of reporting a server error
+        raise
     except Exception as e:
         logger.error(f"❌ Prediction error: {str(e)}")
         logger.error(traceback.format_exc())
@@ -728,9 +1129,137 @@ def predict():
             'timestamp': datetime.now().isoformat()
         }), 500
 
+@app.route('/api/predict/jobs/<job_id>', methods=['GET'])
+def predict_job_status(job_id):
+    """Poll a large statement queued by /api/predict; returns the normal predict response when done"""
+    state, data = large_statement_queue.lookup(job_id)
+    if state is None:
+        return jsonify({'status': 'error', 'error': 'Unknown or expired job id'}), 404
+    if state == 'done':
+        return json_body(data['payload'], data['status_code'])
+    return (jsonify({'status': state, 'job_id': job_id, 'timestamp': datetime.now().isoformat()}), 202,
+            {'Retry-After': str(JOB_POLL_SECONDS)})
+
+@app.route('/api/customers/<customer_id>/statements', methods=['POST'])
+def ingest_statements(customer_id):
+    """Add one or more statement files to a customer's history; rows already ingested are skipped"""
+    denied = require_customer(customer_id)
+    if denied:
+        return denied
+    try:
+        files = [f for _, f in request.files.items(multi=True) if f.filename]
+        if not files:
+            return jsonify({'error': 'No file uploaded'}), 400
+        
+        uploads = []
+        for file in files:
+            encoding, filename = compression.split_encoding_suffix(file.filename)
+            statement_format = statement_schema.format_from_filename(filename)
+            if statement_format is None:
+                return jsonify({'error': f'{file.filename}: file must be a CSV, Parquet, Arrow IPC or NDJSON statement'}), 400
+            
+            raw_bytes = read_upload(file.stream, encoding)
+            # Same row cap and memory reservation as scoring, taken before the file is parsed
+            _, estimate = size_statement(raw_bytes, statement_format)
+            reserve_memory(estimate)
+            try:
+                df = statement_schema.read_statement(raw_bytes, statement_format)
+                missing_columns = statement_schema.missing_columns(df)
+                if missing_columns:
+                    return jsonify({'error': f'{file.filename}: missing required columns: {missing_columns}'}), 400
+                
+                report = request_scheduler.run(
+                    request_priority(default='batch'), request_client(),
+                    receipt_store.ingest, customer_id, df, statement_schema.REQUIRED_COLUMNS)
+            finally:
+                memory_budget.release(estimate)
+            logger.info(f"🧾 Ingested {file.filename}: {report}")
+            uploads.append({'filename': file.filename, **report})
+        
+        return jsonify({
+            'status': 'success',
+            'uploads': uploads,
+            'appended': sum(u['appended'] for u in uploads),
+            'score_url': f'/api/customers/{customer_id}/score',
+            'timestamp': datetime.now().isoformat()
+        })
+        
+    except admission.AdmissionRejected as e:
+        return admission_rejected(e)
+    except compression.DecompressedTooLarge as e:
+        return jsonify({'status': 'error', 'error': str(e)}), 413
+    except (compression.CorruptCompressedUpload, statement_schema.MalformedStatement) as e:
+        return jsonify({'status': 'error', 'error': str(e)}), 400
+    except (statement_schema.UnsupportedStatementFormat, compression.UnsupportedEncoding) as e:
+        return jsonify({'status': 'error', 'error': str(e)}), 415
+    except RequestEntityTooLarge:
+        raise
+    except Exception as e:
+        logger.error(f"❌ Ingestion error: {str(e)}")
+        logger.error(traceback.format_exc())
+        return jsonify({'status': 'error', 'error': str(e)}), 500
+
+@app.route('/api/customers/<customer_id>/score', methods=['POST'])
+@profiled
+def score_customer(customer_id):
+    """Score everything ingested for a customer as one deduplicated statement"""
+    denied = require_customer(customer_id)
+    if denied:
+        return denied
+    ledger_path = receipt_store.ledger_path(customer_id)
+    if not os.path.exists(ledger_path):
+        return jsonify({'error': 'No statements ingested for this customer'}), 404
+    try:
+        with open(ledger_path, 'rb') as f:
+            raw_bytes = f.read()
+        # The ledger is already deduplicated against the index; scoring only pairs reversals
+        return admit_and_score(raw_bytes, 'csv', request_channel(), priority=request_priority())
+    except admission.AdmissionRejected as e:
+        return admission_rejected(e)
+    except Exception as e:
+        logger.error(f"❌ Customer scoring error: {str(e)}")
+        logger.error(traceback.format_exc())
+        return jsonify({'status': 'error', 'error': str(e)}), 500
+
+@app.route('/api/portfolio', methods=['GET'])
+@app.route('/api/portfolio/<view>', methods=['GET'])
+def portfolio_rollups(view=None):
+    """Portfolio aggregates from the materialized rollups; ?days= bounds the limits series"""
+    if view is not None and view not in portfolio.VIEWS:
+        return jsonify({'error': f'Unknown portfolio view, expected one of {sorted(portfolio.VIEWS)}'}), 404
+    
+    try:
+        days = int(request.args.get('days', 90))
+    except ValueError:
+        return jsonify({'error': 'days must be an integer'}), 400
+    
+    state = portfolio_rollup.merged_state()
+    views = [view] if view else list(portfolio.VIEWS)
+    response = {name: portfolio.limits_view(state, days) if name == 'limits' else portfolio.VIEWS[name](state)
+                for name in views}
+    response['timestamp'] = datetime.now().isoformat()
+    return jsonify(response)
+
+@app.route('/api/drift', methods=['GET'])
+def drift_report():
+    """PSI/KS of served features and approval probabilities against the training reference"""
+    return jsonify({**drift_monitor.report(), 'timestamp': datetime.now().isoformat()})
+
+@app.route('/api/shadow', methods=['GET'])
+def shadow_report():
+    """Shadow scoring counters, decision flips per candidate and the measured enqueue overhead"""
+    if shadow_scorer is None:
+        return jsonify({'enabled': False, 'message': 'Set SHADOW_MODELS to score candidate models in shadow'})
+    return jsonify({'enabled': True, 'pid': os.getpid(), 'log_dir': SHADOW_DIR, **shadow_scorer.stats()})
+
+@app.route('/api/scheduler', methods=['GET'])
+def scheduler_metrics():
+    """Queue depth, in-flight slots, rejections and wait-time percentiles per priority class (this worker)"""
+    return jsonify({'pid': os.getpid(), **request_scheduler.snapshot(), 'timestamp': datetime.now().isoformat()})
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
-    """Health check endpoint"""
+    """Health check endpoint (warm-up finishes while app is imported, before any request is served)"""
     model_status = "loaded" if model is not None else "not loaded"
     model_type = type(model).__name__ if model else "none"
     
@@ -739,6 +1268,22 @@ def health_check():
         'timestamp': datetime.now().isoformat(),
         'model_status': model_status,
         'model_type': model_type,
+        'calibration': decision_table_for(model).method if model is not None else None,
+        'compact_model': {
+            'loaded': compact_model is not None,
+            'model_type': type(compact_model).__name__ if compact_model is not None else 'none',
+            'calibration': decision_table_for(compact_model).method if compact_model is not None else None,
+            'channels': sorted(LOW_LATENCY_CHANNELS),
+            'accuracy_budget': (compact_manifest or {}).get('accuracy_budget')
+        },
+        'shadow_candidates': sorted(shadow_scorer.candidates) if shadow_scorer is not None else [],
+        'startup': startup_state,
+        'pid': os.getpid(),
+        'rss_mb': current_rss_mb(),
+        'memory_budget': memory_budget.snapshot(),
+        'audit_log': audit_log.stats(),
+        'scheduler': {name: {k: c[k] for k in ('queue_depth', 'in_flight')}
+                      for name, c in request_scheduler.snapshot()['classes'].items()},
         'message': 'Credit Scoring API with AI Model & Explanation Engine'
     })
 
@@ -751,12 +1296,50 @@ def index():
         'model_loaded': model is not None,
         'explanation_engine': 'Enabled',
         'endpoints': {
-            'POST /api/predict': 'Upload CSV for AI credit scoring with explanations',
+            'POST /api/predict': 'Upload a CSV, Parquet, Arrow IPC or NDJSON statement for AI credit scoring with explanations',
+            'GET /api/predict/jobs/<job_id>': 'Result of a large statement queued by /api/predict',
+            'POST /api/customers/<customer_id>/statements': 'Ingest statements into a customer history, skipping rows already seen (X-Customer-Token or admin)',
+            'POST /api/customers/<customer_id>/score': 'Score a customer history as one deduplicated statement (X-Customer-Token or admin)',
             'POST /api/explain': 'Get explanations for existing predictions',
-            'GET /api/health': 'Health check'
+            'POST /api/whatif': 'Probability surface and decision flips over a feature perturbation grid',
+            'GET /api/portfolio[/<view>]': 'Portfolio rollups: summary, decisions, scores, business-labels, limits',
+            'GET /api/drift': 'Feature and score drift (PSI/KS) against the training reference',
+            'GET /api/scheduler': 'Scheduler queue depth and wait times per priority class (this worker)',
+            'GET /api/shadow': 'Shadow scoring of candidate models: decision flips and request overhead',
+            'GET /api/health': 'Health check',
+            'POST /api/admin/reload-model': 'Hot-swap the model in this process (admin)',
+            'GET /api/admin/audit': 'Range scan of the decision audit log by time and statement hash (admin)',
+            'GET /api/admin/profiles[/<profile_id>]': 'Request profiles (X-Profile: 1 with the admin token) as speedscope or collapsed stacks (admin)'
         }
     })
 
+# ============================================
+# STARTUP
+# ============================================
+
+def run_startup_warmup():
+    """Warm every hot path with a synthetic statement"""
+    started = time.perf_counter()
+    try:
+        timings = warmup.warm_up(app, model, prepare_features_for_model)
+        startup_state['timings'].update(timings)
+        if compact_model is not None:
+            warm_started = time.perf_counter()
+            compact_model.predict_proba(prepare_features_for_model({}, compact_model))
+            startup_state['timings']['compact_first_predict_proba_ms'] = round((time.perf_counter() - warm_started) * 1000, 2)
+    except Exception as e:
+        # A failed warm-up only costs latency, never availability
+        logger.error(f"⚠️  Startup warm-up failed: {str(e)}")
+        startup_state['error'] = str(e)
+    startup_state['timings']['warmup_total_ms'] = round((time.perf_counter() - started) * 1000, 2)
+    startup_state['timings']['startup_total_ms'] = round((time.perf_counter() - _IMPORT_STARTED) * 1000, 2)
+    logger.info(f"🚀 Startup complete: {startup_state['timings']}")
+
+# Synchronous on purpose: a worker (including one started by a HUP reload) only
+# accepts connections once the import, and so the warm-up, has finished
+if WARMUP_ON_START:
+    run_startup_warmup()
+
 if __name__ == '__main__':
     if not os.path.exists(MODEL_PATH):
         logger.warning(f"⚠️  Model file not found at {MODEL_PATH}")
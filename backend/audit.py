@@ -0,0 +1,218 @@
+"""
+Append-only decision audit log.
+
+The request path calls AuditLog.record(), which is a single deque.append:
+no lock and no disk I/O. A background writer wakes every flush_seconds, or
+sooner once batch_size entries are waiting. It drains the deque and appends
+the batch as one gzip member to this worker's current segment:
+
+    <AUDIT_DIR>/audit-<pid>-<start ms>-<seq>.jsonl.gz   concatenated gzip members
+    <AUDIT_DIR>/audit-<pid>-<start ms>-<seq>.idx        one JSON line per member
+
+A segment is a valid gzip stream, so `zcat audit-*.jsonl.gz` reads
+everything. Each index line records the member's byte offset and length,
+its first/last timestamps and prefixes of the statement hashes inside. A range scan
+therefore reads only the index files and then seeks straight to the
+matching members.
+
+Files are never rewritten. Segments rotate at segment_max_bytes, and each
+worker writes only its own files. The index line is written after its
+member is fsynced. If only the index write fails, the next flush retries
+that line alone, so records are never written twice. A crash can leave at
+most an unindexed tail that scans ignore.
+"""
+import collections
+import glob
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+
+SEGMENT_GLOB = 'audit-*.idx'
+# Index lines keep hash prefixes only; records carry the full hash and are checked on read
+INDEX_HASH_CHARS = 12
+
+
+def statement_hash(raw_bytes):
+    """sha256 of the uploaded statement bytes (after any transfer decompression)"""
+    return hashlib.sha256(raw_bytes).hexdigest()
+
+
+class AuditLog:
+    """Per-worker batched writer of audit entries into compressed, indexed segments"""
+
+    def __init__(self, audit_dir, flush_seconds=1.0, batch_size=512, segment_max_bytes=64 * 1024 * 1024,
+                 compress_level=6):
+        self.audit_dir = audit_dir
+        self.flush_seconds = flush_seconds
+        self.batch_size = batch_size
+        self.segment_max_bytes = segment_max_bytes
+        self.compress_level = compress_level
+        self._pending = collections.deque()
+        self._wake = threading.Event()
+        self._write_lock = threading.Lock()
+        self._started_ms = int(time.time() * 1000)
+        self._segment_seq = 0
+        self._segment_bytes = 0
+        # (index path, index line) of a member that is on disk but not yet indexed
+        self._unindexed = None
+        self.counts = {'written': 0, 'members': 0, 'segments': 0, 'write_errors': 0}
+        os.makedirs(audit_dir, exist_ok=True)
+        threading.Thread(target=self._writer_loop, name='audit-writer', daemon=True).start()
+
+    def record(self, entry, raw_bytes=None):
+        """
+        Queue one decision; returns immediately.
+
+        raw_bytes (the statement) is hashed by the writer, not the request thread.
+        """
+        self._pending.append((time.time(), entry, raw_bytes))
+        if len(self._pending) >= self.batch_size:
+            self._wake.set()
+
+    def _segment_paths(self):
+        base = os.path.join(self.audit_dir, f"audit-{os.getpid()}-{self._started_ms}-{self._segment_seq:04d}")
+        return base + '.jsonl.gz', base + '.idx'
+
+    def _drain(self):
+        batch = []
+        while self._pending:
+            batch.append(self._pending.popleft())
+        return batch
+
+    def flush(self):
+        """Write everything queued so far (writer thread, and worker shutdown)"""
+        with self._write_lock:
+            if self._unindexed is not None:
+                self._append_index(*self._unindexed)
+                self._unindexed = None
+            batch = self._drain()
+            if not batch:
+                return 0
+            try:
+                index_path, index_line = self._write_member(batch)
+            except OSError:
+                # Put the batch back in order; the next flush retries it
+                self._pending.extendleft(reversed(batch))
+                raise
+            # The member is on disk: a failure from here retries only its index line
+            self._unindexed = (index_path, index_line)
+            self._append_index(index_path, index_line)
+            self._unindexed = None
+            return len(batch)
+
+    def _write_member(self, batch):
+        """Append the batch as one fsynced gzip member; returns (index path, index line)"""
+        lines, hashes = [], []
+        for ts, entry, raw_bytes in batch:
+            record = {'t': round(ts, 6), **entry}
+            if raw_bytes is not None:
+                record['statement_hash'] = statement_hash(raw_bytes)
+            if record.get('statement_hash'):
+                hashes.append(record['statement_hash'][:INDEX_HASH_CHARS])
+            lines.append(json.dumps(record, separators=(',', ':'), default=str))
+        member = gzip.compress(('\n'.join(lines) + '\n').encode('utf-8'), compresslevel=self.compress_level)
+
+        if self._segment_bytes and self._segment_bytes + len(member) > self.segment_max_bytes:
+            self._segment_seq += 1
+            self._segment_bytes = 0
+        data_path, index_path = self._segment_paths()
+        if self._segment_bytes == 0:
+            self.counts['segments'] += 1
+        with open(data_path, 'ab') as f:
+            offset = f.tell()
+            f.write(member)
+            f.flush()
+            os.fsync(f.fileno())
+        index_line = {
+            'offset': offset,
+            'length': len(member),
+            't_min': batch[0][0],
+            't_max': batch[-1][0],
+            'count': len(batch),
+            'hashes': sorted(set(hashes)),
+        }
+        self._segment_bytes = offset + len(member)
+        self.counts['written'] += len(batch)
+        self.counts['members'] += 1
+        return index_path, index_line
+
+    def _append_index(self, index_path, index_line):
+        with open(index_path, 'a') as f:
+            f.write(json.dumps(index_line, separators=(',', ':')) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _writer_loop(self):
+        while True:
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            try:
+                self.flush()
+            except OSError:
+                # Entries stay queued; the error count is visible on /api/health
+                self.counts['write_errors'] += 1
+
+    def stats(self):
+        return {**self.counts, 'pending': len(self._pending), 'unindexed': int(self._unindexed is not None)}
+
+
+def _index_entries(audit_dir):
+    for index_path in glob.glob(os.path.join(audit_dir, SEGMENT_GLOB)):
+        data_path = index_path[:-len('.idx')] + '.jsonl.gz'
+        try:
+            with open(index_path) as f:
+                lines = f.readlines()
+        except OSError:
+            continue
+        for line in lines:
+            try:
+                yield data_path, json.loads(line)
+            except ValueError:
+                # Torn last line from a crashed worker
+                continue
+
+
+def scan(audit_dir, start=None, end=None, statement_hash=None, limit=1000):
+    """
+    Audit records with start <= t < end (epoch seconds) and/or a statement hash, oldest first.
+
+    Only index files are read to pick members; each selected member is one
+    seek + read + gunzip. Returns (records, members_read).
+    """
+    selected = []
+    for data_path, entry in _index_entries(audit_dir):
+        if start is not None and entry['t_max'] < start:
+            continue
+        if end is not None and entry['t_min'] >= end:
+            continue
+        if statement_hash is not None and statement_hash[:INDEX_HASH_CHARS] not in entry['hashes']:
+            continue
+        selected.append((entry['t_min'], data_path, entry['offset'], entry['length']))
+    selected.sort()
+
+    records, members_read = [], 0
+    for i, (t_min, data_path, offset, length) in enumerate(selected):
+        with open(data_path, 'rb') as f:
+            f.seek(offset)
+            member = f.read(length)
+        members_read += 1
+        for line in gzip.decompress(member).splitlines():
+            record = json.loads(line)
+            if start is not None and record['t'] < start:
+                continue
+            if end is not None and record['t'] >= end:
+                continue
+            if statement_hash is not None and record.get('statement_hash') != statement_hash:
+                continue
+            records.append(record)
+        if len(records) >= limit and i + 1 < len(selected):
+            # Members are visited by first timestamp; stop once none can beat the current page
+            records.sort(key=lambda r: r['t'])
+            if selected[i + 1][0] > records[limit - 1]['t']:
+                break
+    # Members from different workers interleave in time
+    records.sort(key=lambda r: r['t'])
+    return records[:limit], members_read
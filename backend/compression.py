@@ -0,0 +1,248 @@
+"""
+gzip/zstd for statement uploads and API responses.
+
+Requests: a raw body with Content-Encoding: gzip|zstd, or an uploaded file
+named *.gz / *.zst (e.g. statement.csv.gz), is inflated chunk by chunk and
+capped at a decompressed size, so a small upload can't expand into
+gigabytes. zstd needs the optional `zstandard` package.
+
+Responses: json_response() negotiates Accept-Encoding. A payload that
+encodes to fewer than min_bytes is sent whole and uncompressed. Larger ones
+are streamed: JSONEncoder.iterencode output is compressed chunk by chunk and
+written out as it is produced, so the full JSON text never exists in memory.
+"""
+import itertools
+import json
+import zlib
+
+from flask import Response
+
+CHUNK_BYTES = 64 * 1024
+
+ENCODING_EXTENSIONS = {'.gz': 'gzip', '.gzip': 'gzip', '.zst': 'zstd', '.zstd': 'zstd'}
+
+
+class UnsupportedEncoding(Exception):
+    """Content encoding unknown, or zstd requested without the zstandard package"""
+
+
+class DecompressedTooLarge(Exception):
+    """Upload inflates past the configured decompressed-size cap"""
+
+
+class CorruptCompressedUpload(ValueError):
+    """Upload claims an encoding but does not decompress cleanly"""
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard
+
+
+def available_encodings():
+    """Encodings this server can produce, preferred first"""
+    return ['zstd', 'gzip'] if _zstandard() else ['gzip']
+
+
+def split_encoding_suffix(filename):
+    """(encoding or None, filename without the compression suffix)"""
+    for suffix, encoding in ENCODING_EXTENSIONS.items():
+        if filename.lower().endswith(suffix):
+            return encoding, filename[:-len(suffix)]
+    return None, filename
+
+
+def _zstd_module():
+    zstandard = _zstandard()
+    if zstandard is None:
+        raise UnsupportedEncoding("zstd uploads need the zstandard package, which is not installed on this server")
+    return zstandard
+
+
+class _ChunkReader:
+    """Minimal file-like read() over an iterable of byte chunks; keeps what it read in .chunks"""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._buffer = b''
+        self.chunks = []
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self.chunks.append(chunk)
+            self._buffer += chunk
+        if size < 0:
+            data, self._buffer = self._buffer, b''
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+
+def iter_chunks(stream, chunk_bytes=CHUNK_BYTES):
+    while True:
+        chunk = stream.read(chunk_bytes)
+        if not chunk:
+            return
+        yield chunk
+
+
+def _too_large(max_bytes):
+    return DecompressedTooLarge(f"Statement inflates past the {max_bytes / 1048576:g} MB decompressed limit")
+
+
+def _inflate_gzip(chunks, max_bytes):
+    output = bytearray()
+    # wbits 16 + MAX_WBITS: gzip header and trailer
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        while chunk:
+            # max_length bounds each step, so a bomb is caught after at most max_bytes + 1
+            output += decompressor.decompress(chunk, max_bytes + 1 - len(output))
+            if len(output) > max_bytes:
+                raise _too_large(max_bytes)
+            chunk = decompressor.unconsumed_tail
+            if decompressor.eof and decompressor.unused_data:
+                # Concatenated gzip members (e.g. `cat a.gz b.gz`): carry on with the next one
+                chunk = decompressor.unused_data
+                decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    if not decompressor.eof:
+        raise CorruptCompressedUpload("Compressed statement is truncated")
+    return bytes(output)
+
+
+def _inflate_zstd(chunks, max_bytes):
+    zstandard = _zstd_module()
+    source = _ChunkReader(chunks)
+    # Pass 1 sizes the output without keeping it. A read never asks for more than the cap
+    # allows, so a bomb is caught after at most max_bytes + 1 bytes.
+    reader = zstandard.ZstdDecompressor().stream_reader(source, read_across_frames=True)
+    size = 0
+    while True:
+        data = reader.read(min(CHUNK_BYTES, max_bytes + 1 - size))
+        if not data:
+            break
+        size += len(data)
+        if size > max_bytes:
+            raise _too_large(max_bytes)
+    # Pass 2: the output is now known to fit. The stream reader ends quietly on a cut-off
+    # frame, so decompress frame by frame where eof tells whether each one was complete.
+    output = bytearray()
+    data = b''.join(source.chunks)
+    while data:
+        decompressor = zstandard.ZstdDecompressor().decompressobj()
+        output += decompressor.decompress(data)
+        if not decompressor.eof:
+            raise CorruptCompressedUpload("Compressed statement is truncated")
+        data = decompressor.unused_data
+    return bytes(output)
+
+
+def decompress_chunks(chunks, encoding, max_bytes):
+    """Inflate an iterable of compressed chunks, refusing to produce more than max_bytes"""
+    if encoding == 'gzip':
+        inflate = _inflate_gzip
+    elif encoding == 'zstd':
+        _zstd_module()
+        inflate = _inflate_zstd
+    else:
+        raise UnsupportedEncoding(f"Unsupported Content-Encoding '{encoding}'")
+    try:
+        return inflate(chunks, max_bytes)
+    except (DecompressedTooLarge, CorruptCompressedUpload):
+        raise
+    except Exception as e:
+        # zlib.error / zstandard.ZstdError
+        raise CorruptCompressedUpload(f"Could not decompress {encoding} statement: {e}")
+
+
+def negotiate(accept_encoding):
+    """Best encoding the client accepts (q > 0), or None for identity"""
+    accepted = {}
+    for part in (accept_encoding or '').split(','):
+        name, _, params = part.strip().partition(';')
+        q = 1.0
+        if params.strip().startswith('q='):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    for encoding in available_encodings():
+        if accepted.get(encoding, accepted.get('*', 0)) > 0:
+            return encoding
+    return None
+
+
+def _compressor(encoding, level):
+    if encoding == 'gzip':
+        return zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return _zstandard().ZstdCompressor(level=level).compressobj()
+
+
+def _buffered(pieces, chunk_bytes):
+    """Regroup iterencode's many tiny strings into ~chunk_bytes UTF-8 blocks"""
+    buffer, size = [], 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= chunk_bytes:
+            yield ''.join(buffer).encode('utf-8')
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer).encode('utf-8')
+
+
+def json_response(app, payload, status, accept_encoding, min_bytes, gzip_level=6, zstd_level=3):
+    """
+    JSON Response matching app.json/jsonify output (trailing newline included).
+
+    Bodies under min_bytes go out whole and uncompressed; larger bodies are
+    streamed, compressed when the client accepts gzip or zstd.
+    """
+    provider = app.json
+    compact = provider.compact if provider.compact is not None else not app.debug
+    encoder = json.JSONEncoder(
+        default=provider.default,
+        ensure_ascii=provider.ensure_ascii,
+        sort_keys=provider.sort_keys,
+        indent=None if compact else 2,
+        separators=(',', ':') if compact else (',', ': '),
+    )
+    blocks = _buffered(encoder.iterencode(payload), CHUNK_BYTES)
+
+    # Peek far enough to know whether the body reaches min_bytes
+    head, size = [], 0
+    for block in blocks:
+        head.append(block)
+        size += len(block)
+        if size >= min_bytes:
+            break
+    else:
+        return Response(b''.join(head) + b'\n', status=status, mimetype=provider.mimetype)
+
+    encoding = negotiate(accept_encoding)
+
+    def body():
+        compressor = _compressor(encoding, gzip_level if encoding == 'gzip' else zstd_level) if encoding else None
+        for block in itertools.chain(head, blocks, [b'\n']):
+            if compressor is None:
+                yield block
+            else:
+                data = compressor.compress(block)
+                if data:
+                    yield data
+        if compressor is not None:
+            yield compressor.flush()
+
+    response = Response(body(), status=status, mimetype=provider.mimetype)
+    response.headers['Vary'] = 'Accept-Encoding'
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    return response
+
@@ -0,0 +1,135 @@
+"""
+Approval-probability to credit-decision mapping.
+
+Shared by /api/predict, /api/whatif, shadow scoring and the rule-based
+fallback, so every path turns a probability into a decision the same way.
+A DecisionTable holds, per decision band:
+
+    limit = clip(p * limit_scale, limit_floor, limit_cap)
+    rate  = rate_base + rate_slope * (1 - p)
+
+plus an optional calibration curve. Training writes that curve next to the
+model as <model>.calibration.json (ai-model/calibrate_model.py). It holds the
+knots of a monotone piecewise-linear map from raw to calibrated
+probability: isotonic thresholds, or a Platt sigmoid sampled on a fine
+grid. apply() scores a whole batch with one np.interp, one searchsorted
+and a few band-indexed takes.
+
+The cut-offs and the limit/rate rules are lending policy that was set on
+the raw model score, so p above is the raw probability. Calibration only
+changes the probability reported next to the decision. Deploying or
+refitting a sidecar never moves an applicant between bands or changes
+their limit.
+"""
+import hashlib
+import json
+import os
+
+import numpy as np
+
+# Lower bounds of REVIEW_NEEDED, APPROVED_WITH_CAUTION and APPROVED
+DECISION_THRESHOLDS = (0.3, 0.5, 0.7)
+DECISION_LABELS = ("DECLINED", "REVIEW_NEEDED", "APPROVED_WITH_CAUTION", "APPROVED")
+# Decisions that grant credit (the two bands from 0.5 up)
+APPROVED_DECISIONS = DECISION_LABELS[2:]
+
+CALIBRATION_SUFFIX = '.calibration.json'
+
+
+def decision_bands(probabilities, thresholds=DECISION_THRESHOLDS):
+    """Band index (0..3, into DECISION_LABELS) for each approval probability"""
+    return np.searchsorted(thresholds, probabilities, side='right')
+
+
+def calibration_path(model_path):
+    """Sidecar path of a model's calibration curve"""
+    return os.path.splitext(model_path)[0] + CALIBRATION_SUFFIX
+
+
+def load_calibration(path):
+    """Calibration sidecar as a dict (None when there is none); ValueError when it is unusable"""
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        calibration = json.load(f)
+    x = np.asarray(calibration.get('x', []), dtype=float)
+    y = np.asarray(calibration.get('y', []), dtype=float)
+    if len(x) < 2 or len(x) != len(y):
+        raise ValueError(f"{path}: needs matching x/y knots")
+    if np.any(np.diff(x) <= 0) or np.any(np.diff(y) < 0):
+        raise ValueError(f"{path}: knots must be increasing in x and non-decreasing in y")
+    if y[0] < 0 or y[-1] > 1:
+        raise ValueError(f"{path}: calibrated probabilities must lie in [0, 1]")
+    return calibration
+
+
+class DecisionTable:
+    """Calibration curve plus per-band limit and rate rules, applied to whole batches"""
+
+    def __init__(self, thresholds=DECISION_THRESHOLDS, limit_scale=(0, 0, 20000, 50000),
+                 limit_floor=(0, 0, 0, 0), limit_cap=(np.inf,) * 4, rate_base=(12.0,) * 4,
+                 rate_slope=(15.0,) * 4, calibration=None):
+        self.thresholds = tuple(thresholds)
+        self.limit_scale = np.asarray(limit_scale, dtype=float)
+        self.limit_floor = np.asarray(limit_floor, dtype=float)
+        self.limit_cap = np.asarray(limit_cap, dtype=float)
+        self.rate_base = np.asarray(rate_base, dtype=float)
+        self.rate_slope = np.asarray(rate_slope, dtype=float)
+        self.calibration = calibration
+        if calibration is not None:
+            self._x = np.asarray(calibration['x'], dtype=float)
+            self._y = np.asarray(calibration['y'], dtype=float)
+
+    @classmethod
+    def for_model(cls, model_path, **rules):
+        """Table with the calibration stored next to model_path, if any (ValueError when it is unusable)"""
+        calibration = load_calibration(calibration_path(model_path))
+        if calibration is not None and calibration.get('model_sha256'):
+            with open(model_path, 'rb') as f:
+                if hashlib.sha256(f.read()).hexdigest() != calibration['model_sha256']:
+                    raise ValueError(f"{calibration_path(model_path)} was fitted for a different model file")
+        return cls(calibration=calibration, **rules)
+
+    @property
+    def method(self):
+        return self.calibration.get('method') if self.calibration else None
+
+    def calibrate(self, raw_probabilities):
+        """Calibrated probabilities; raw ones unchanged without a calibration curve"""
+        raw = np.asarray(raw_probabilities, dtype=float)
+        if self.calibration is None:
+            return raw
+        return np.interp(raw, self._x, self._y)
+
+    def apply(self, raw_probabilities):
+        """(calibrated probability, band, limit, rate) arrays for a batch of raw probabilities"""
+        p = np.asarray(raw_probabilities, dtype=float)
+        # Bands, limits and rates follow the raw score the policy was set on
+        bands = decision_bands(p, self.thresholds)
+        limits = np.clip(p * self.limit_scale[bands], self.limit_floor[bands], self.limit_cap[bands])
+        rates = self.rate_base[bands] + self.rate_slope[bands] * (1 - p)
+        return self.calibrate(p), bands, limits, rates
+
+    def decide(self, raw_probability):
+        """Decision fields for one raw probability"""
+        p, bands, limits, rates = self.apply(np.array([raw_probability]))
+        return {
+            'approval_probability': float(p[0]),
+            'decision_status': DECISION_LABELS[bands[0]],
+            'recommended_limit': round(float(limits[0]), 2),
+            'synthetic_interest_rate': round(float(rates[0]), 2),
+        }
+
+
+# Model path: p * 20k / p * 50k limits for the approved bands, rate 12% + 15% * (1 - p)
+MODEL_DECISIONS = DecisionTable()
+
+# Rule-based fallback on score / 100: its own cut-offs, clamped limits and flat rates
+FALLBACK_DECISIONS = DecisionTable(
+    thresholds=(0.2, 0.4, 0.6),
+    limit_scale=(0, 0, 20000, 50000),
+    limit_floor=(0, 0, 1000, 5000),
+    limit_cap=(0, 0, 10000, 50000),
+    rate_base=(25.0, 25.0, 25.0, 15.0),
+    rate_slope=(0.0,) * 4,
+)
@@ -0,0 +1,312 @@
+"""
+Feature and score drift monitor.
+
+Every scored statement updates, per feature and for the approval probability,
+a KLL quantile sketch (a few hundred retained values whatever the volume) and
+a histogram over the training reference's decile bins. /api/drift compares
+them with the reference written at training time
+(mpesa_features.build_reference): PSI from the histograms, and the KS
+statistic from the sketch CDF evaluated at the reference quantiles.
+
+Like the portfolio rollups, each worker flushes its sketches to
+<DRIFT_DIR>/worker-<pid>-<start>.json and reads merge all workers. A worker
+starts a fresh window after window_seconds. Files that have not been
+rewritten within one window are dropped, so reports cover roughly the last
+window of traffic.
+"""
+import bisect
+import glob
+import json
+import math
+import os
+import random
+import threading
+import time
+
+import numpy as np
+
+# Population stability index bands commonly used in credit risk
+PSI_WARN = 0.1
+PSI_ALERT = 0.25
+# KS critical-value coefficient for alpha = 0.05
+KS_C_ALPHA = 1.358
+
+
+class KLLSketch:
+    """
+    KLL quantile sketch (Karnin, Lang, Liberty 2016).
+
+    Level h holds items of weight 2**h. Lower levels get geometrically
+    smaller capacities. A full level is sorted and every other item (random
+    offset) moves up one level, so memory stays O(k) and rank error stays
+    around 1.7/k.
+    """
+
+    def __init__(self, k=200, seed=None):
+        self.k = k
+        self.levels = [[]]
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self._rng = random.Random(seed)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(2, int(math.ceil(self.k * (2 / 3) ** depth)))
+
+    def update(self, value):
+        self.levels[0].append(value)
+        self.count += 1
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        if len(self.levels[0]) >= self._capacity(0):
+            self._compress()
+
+    def _compress(self):
+        for level in range(len(self.levels)):
+            if len(self.levels[level]) < self._capacity(level):
+                continue
+            if level + 1 == len(self.levels):
+                self.levels.append([])
+            items = sorted(self.levels[level])
+            # An odd item out stays behind so total weight is preserved exactly
+            keep = [items.pop()] if len(items) % 2 else []
+            self.levels[level + 1].extend(items[self._rng.randint(0, 1)::2])
+            self.levels[level] = keep
+
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self.levels.append([])
+        for level, items in enumerate(other.levels):
+            self.levels[level].extend(items)
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+
+    def _weighted_items(self):
+        values = np.concatenate([np.asarray(items, dtype=float) for items in self.levels])
+        weights = np.concatenate([np.full(len(items), 2 ** level) for level, items in enumerate(self.levels)])
+        order = np.argsort(values, kind='stable')
+        return values[order], np.cumsum(weights[order])
+
+    def cdf(self, points):
+        """Estimated fraction of observed values <= each point"""
+        if self.count == 0:
+            return np.zeros(len(points))
+        values, cumulative = self._weighted_items()
+        idx = np.searchsorted(values, points, side='right')
+        ranks = np.where(idx > 0, cumulative[np.maximum(idx - 1, 0)], 0)
+        return ranks / cumulative[-1]
+
+    def quantiles(self, qs):
+        if self.count == 0:
+            return [None] * len(qs)
+        values, cumulative = self._weighted_items()
+        idx = np.searchsorted(cumulative, np.asarray(qs) * cumulative[-1], side='left')
+        return values[np.minimum(idx, len(values) - 1)].tolist()
+
+    def to_dict(self):
+        return {'k': self.k, 'levels': self.levels, 'count': self.count,
+                'min': self.min if self.count else None, 'max': self.max if self.count else None}
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(k=data['k'])
+        sketch.levels = [list(items) for items in data['levels']]
+        sketch.count = data['count']
+        sketch.min = data['min'] if data['min'] is not None else math.inf
+        sketch.max = data['max'] if data['max'] is not None else -math.inf
+        return sketch
+
+
+class StreamSummary:
+    """Sketch + reference-binned histogram for one monitored value"""
+
+    def __init__(self, bin_edges=None, k=200):
+        self.sketch = KLLSketch(k=k)
+        self.bin_edges = list(bin_edges) if bin_edges is not None else None
+        self.bin_counts = [0] * (len(self.bin_edges) + 1) if self.bin_edges is not None else None
+        self.missing = 0
+
+    def update(self, value):
+        if value is None or not math.isfinite(value):
+            self.missing += 1
+            return
+        self.sketch.update(value)
+        if self.bin_edges is not None:
+            # Same bin rule as mpesa_features.histogram_bins (searchsorted side='right')
+            self.bin_counts[bisect.bisect_right(self.bin_edges, value)] += 1
+
+    def merge(self, other):
+        self.sketch.merge(other.sketch)
+        self.missing += other.missing
+        # Files written against an older reference have different bins; keep only the sketch
+        if self.bin_counts is not None and other.bin_edges == self.bin_edges:
+            self.bin_counts = [a + b for a, b in zip(self.bin_counts, other.bin_counts)]
+
+    def to_dict(self):
+        return {'sketch': self.sketch.to_dict(), 'bin_edges': self.bin_edges,
+                'bin_counts': self.bin_counts, 'missing': self.missing}
+
+    @classmethod
+    def from_dict(cls, data):
+        summary = cls(data['bin_edges'])
+        summary.sketch = KLLSketch.from_dict(data['sketch'])
+        summary.bin_counts = data['bin_counts']
+        summary.missing = data['missing']
+        return summary
+
+
+def population_stability_index(expected_shares, observed_counts, floor=1e-4):
+    """PSI between reference bin shares and live bin counts (shares floored to keep logs finite)"""
+    observed = np.asarray(observed_counts, dtype=float)
+    if observed.sum() == 0:
+        return None
+    expected = np.maximum(np.asarray(expected_shares, dtype=float), floor)
+    observed = np.maximum(observed / observed.sum(), floor)
+    return float(np.sum((observed - expected) * np.log(observed / expected)))
+
+
+def ks_statistic(reference_quantiles, sketch):
+    """KS distance: live CDF vs the reference CDF, evaluated at the reference quantile points"""
+    if sketch.count == 0:
+        return None
+    points = np.asarray(reference_quantiles, dtype=float)
+    # Repeated quantiles (discrete features) take the CDF at the last grid point sharing the value
+    reference_cdf = (np.searchsorted(points, points, side='right') - 1) / (len(points) - 1)
+    return float(np.max(np.abs(sketch.cdf(points) - reference_cdf)))
+
+
+def compare(summary, reference):
+    """Drift statistics for one monitored value against its reference entry"""
+    result = {
+        'count': summary.sketch.count,
+        'missing': summary.missing,
+        'live_quantiles': dict(zip(('p10', 'p50', 'p90'), summary.sketch.quantiles([0.1, 0.5, 0.9]))),
+    }
+    if not reference:
+        return result
+    quantiles = reference['quantiles']
+    result['reference_quantiles'] = {'p10': quantiles[10], 'p50': quantiles[50], 'p90': quantiles[90]}
+    psi = population_stability_index(reference['bin_shares'], summary.bin_counts)
+    ks = ks_statistic(quantiles, summary.sketch)
+    n, m = summary.sketch.count, reference['rows']
+    ks_critical = KS_C_ALPHA * math.sqrt((n + m) / (n * m)) if n else None
+    status = 'no_data'
+    if psi is not None:
+        status = 'alert' if psi >= PSI_ALERT else 'warn' if psi >= PSI_WARN or ks > ks_critical else 'ok'
+    result.update({
+        'psi': round(psi, 4) if psi is not None else None,
+        'ks': round(ks, 4) if ks is not None else None,
+        'ks_critical': round(ks_critical, 4) if ks_critical else None,
+        'status': status,
+    })
+    return result
+
+
+class DriftMonitor:
+    """Per-worker streaming summaries of scored features and probabilities"""
+
+    def __init__(self, columns, reference=None, state_dir='drift', flush_seconds=10, window_seconds=86400):
+        self.columns = list(columns)
+        self.reference = reference
+        self.state_dir = state_dir
+        self.flush_seconds = flush_seconds
+        self.window_seconds = window_seconds
+        self.worker_file = os.path.join(state_dir, f"worker-{os.getpid()}-{int(time.time() * 1000)}.json")
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._reset()
+        os.makedirs(state_dir, exist_ok=True)
+        threading.Thread(target=self._flush_loop, name='drift-flush', daemon=True).start()
+
+    def _reference_for(self, name):
+        if not self.reference:
+            return None
+        if name == 'approval_probability':
+            return self.reference.get('probability')
+        return self.reference.get('features', {}).get(name)
+
+    def _new_summaries(self):
+        names = self.columns + ['approval_probability']
+        return {name: StreamSummary((self._reference_for(name) or {}).get('bin_edges')) for name in names}
+
+    def _reset(self):
+        self.window_started = time.time()
+        self.summaries = self._new_summaries()
+
+    def observe(self, features, probability=None):
+        """Add one scored statement (a few microseconds: list appends and one bisect per value)"""
+        with self._lock:
+            if time.time() - self.window_started > self.window_seconds:
+                self._reset()
+            for name in self.columns:
+                value = features.get(name)
+                self.summaries[name].update(float(value) if value is not None else None)
+            if probability is not None:
+                self.summaries['approval_probability'].update(float(probability))
+            self._dirty = True
+
+    def _state(self):
+        return {'window_started': self.window_started,
+                'summaries': {name: summary.to_dict() for name, summary in self.summaries.items()}}
+
+    def flush(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            payload = json.dumps(self._state())
+            self._dirty = False
+        tmp_path = self.worker_file + '.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(payload)
+        os.replace(tmp_path, self.worker_file)
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_seconds)
+            try:
+                self.flush()
+            except OSError:
+                with self._lock:
+                    self._dirty = True
+
+    def merged_summaries(self):
+        """Summaries across workers: this one live, others from files rewritten within the window"""
+        with self._lock:
+            merged = {name: StreamSummary.from_dict(s.to_dict()) for name, s in self.summaries.items()}
+        cutoff = time.time() - self.window_seconds
+        for path in glob.glob(os.path.join(self.state_dir, 'worker-*.json')):
+            if path == self.worker_file:
+                continue
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    continue
+                with open(path) as f:
+                    state = json.load(f)
+            except (OSError, ValueError):
+                continue
+            for name, data in state['summaries'].items():
+                if name in merged:
+                    merged[name].merge(StreamSummary.from_dict(data))
+        return merged
+
+    def report(self):
+        summaries = self.merged_summaries()
+        values = {name: compare(summaries[name], self._reference_for(name)) for name in summaries}
+        statuses = [v.get('status') for v in values.values()]
+        overall = 'alert' if 'alert' in statuses else 'warn' if 'warn' in statuses else \
+            'ok' if 'ok' in statuses else 'no_data'
+        return {
+            'status': overall,
+            'reference': {k: self.reference.get(k) for k in ('created_at', 'source', 'rows')} if self.reference else None,
+            'statements': max(s.sketch.count + s.missing for s in summaries.values()),
+            'window_seconds': self.window_seconds,
+            'thresholds': {'psi_warn': PSI_WARN, 'psi_alert': PSI_ALERT, 'ks_alpha': 0.05},
+            'features': {name: values[name] for name in self.columns},
+            'approval_probability': values['approval_probability'],
+        }
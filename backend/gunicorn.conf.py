@@ -0,0 +1,67 @@
+"""
+Gunicorn settings for the credit scoring API.
+
+Scoring is CPU-bound (pandas + sklearn), so throughput comes from worker
+processes; a few threads per worker overlap upload I/O with scoring. Every
+setting can be overridden through the environment without editing this file.
+
+Model hot-swap with graceful draining:
+    1. copy the new credit_model.joblib over MODEL_PATH
+    2. kill -HUP <gunicorn master pid>
+Gunicorn then starts fresh workers (which load and warm the new model before
+accepting connections) and lets the old workers finish in-flight requests
+for up to graceful_timeout seconds. This is why preload_app stays off: with
+preload the master would keep re-forking the old model.
+"""
+import multiprocessing
+import os
+import sys
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+
+# Workers / threads
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', '4'))
+backlog = int(os.environ.get('GUNICORN_BACKLOG', '2048'))
+
+# Timeouts - a 10 MB statement parses and scores well inside this on one core
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '60'))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', '5'))
+
+# Recycle workers periodically to cap slow memory growth from pandas allocations
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', '2000'))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', '200'))
+
+# Header limits; the body limit is MAX_UPLOAD_MB, enforced by Flask (HTTP 413)
+limit_request_line = 4094
+limit_request_fields = 100
+limit_request_field_size = 8190
+
+preload_app = False
+
+# Set GUNICORN_ACCESS_LOG to an empty string to turn access logging off
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-') or None
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+
+def on_reload(server):
+    server.log.info("🔁 Reload requested - new workers will load the current model file")
+
+
+def post_fork(server, worker):
+    server.log.info(f"👷 Worker {worker.pid} forked, loading and warming model")
+
+
+def worker_exit(server, worker):
+    # Runs in the worker: persist rollups, drift sketches and queued audit entries, finish shadow scoring
+    app_module = sys.modules.get('app')
+    if app_module is not None:
+        app_module.portfolio_rollup.flush()
+        app_module.drift_monitor.flush()
+        app_module.audit_log.flush()
+        if app_module.shadow_scorer is not None:
+            app_module.shadow_scorer.drain()
+    server.log.info(f"👋 Worker {worker.pid} exited after draining")
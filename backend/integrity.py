@@ -0,0 +1,158 @@
+"""
+Statement integrity checks.
+
+check_statement() runs on every upload before scoring. It sorts the rows
+into time order once, then makes a handful of vectorized numpy passes:
+
+- balance continuity: balance[i] == balance[i-1] + paid_in[i] - withdrawn[i]
+  over completed transactions. Edited amounts, deleted rows and spliced
+  statements break the chain.
+- timestamp order: statements are exported newest-first or oldest-first.
+  Adjacent rows against the dominant direction mean rows were moved, and
+  unparseable timestamps are counted too.
+- duplicate receipt numbers
+- gap anomalies: silences much longer than the customer's usual
+  inter-transaction gap, typical of truncated or cut-together statements.
+- negative balances, which M-Pesa wallets can't have.
+
+The report is compact: counts, ratios and at most a few example rows. Its
+'confidence' flag ('high' / 'medium' / 'low') travels with the score. It
+does not change the score.
+"""
+import numpy as np
+import pandas as pd
+
+# Balances are printed to the cent; allow rounding drift
+BALANCE_TOLERANCE = 0.05
+# Share of broken links in the balance chain above which confidence is low
+MAX_BREAK_RATIO = 0.05
+# Share of adjacent rows against the statement's time direction tolerated before flagging
+MAX_DISORDER_RATIO = 0.01
+MAX_UNPARSED_TIME_RATIO = 0.05
+# A gap is anomalous when longer than both of these
+GAP_MIN_DAYS = 7
+GAP_MEDIAN_FACTOR = 20
+EXAMPLES = 3
+
+NS_PER_DAY = 86400 * 10**9
+
+
+def _amounts(df, col):
+    if col not in df.columns:
+        return np.zeros(len(df))
+    return pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=float)
+
+
+def _time_order(times_ns, valid):
+    """(row order oldest-first, newest_first flag, adjacent pairs against the dominant direction)"""
+    idx = np.flatnonzero(valid)
+    steps = np.diff(times_ns[idx])
+    forward, backward = int((steps > 0).sum()), int((steps < 0).sum())
+    newest_first = backward > forward
+    # Reverse newest-first files before the stable sort so same-timestamp rows keep their real order
+    candidates = idx[::-1] if newest_first else idx
+    order = candidates[np.argsort(times_ns[candidates], kind='stable')]
+    return order, newest_first, min(forward, backward)
+
+
+def check_statement(df, duplicate_receipts=None):
+    """
+    Integrity report for a parsed statement (see module docstring).
+
+    duplicate_receipts: count already known to the caller (receipt_index.clean_statement), saving a hash pass.
+    """
+    n = len(df)
+    report = {'rows': n, 'confidence': 'high', 'issues': []}
+    if n == 0:
+        return report
+
+    if 'completion_time' not in df.columns:
+        times = pd.Series(pd.NaT, index=df.index)
+    elif pd.api.types.is_datetime64_any_dtype(df['completion_time']):
+        times = df['completion_time']
+    else:
+        times = pd.to_datetime(df['completion_time'], errors='coerce')
+    valid_time = times.notna().to_numpy()
+    times_ns = times.to_numpy(dtype='datetime64[ns]').astype(np.int64)
+    order, newest_first, disordered = _time_order(times_ns, valid_time)
+
+    balance = _amounts(df, 'balance')
+    paid_in = np.nan_to_num(_amounts(df, 'paid_in'))
+    withdrawn = np.nan_to_num(_amounts(df, 'withdrawn'))
+    if 'transaction_status' in df.columns:
+        # String work on the handful of distinct statuses only
+        codes, statuses = pd.factorize(df['transaction_status'])
+        is_completed = np.array([str(s).strip().lower() == 'completed' for s in statuses] + [False])
+        completed = is_completed[codes]
+    else:
+        completed = np.ones(n, dtype=bool)
+
+    # Running-balance chain over completed rows in time order
+    chain = order[completed[order] & np.isfinite(balance[order])]
+    residual = balance[chain[1:]] - (balance[chain[:-1]] + paid_in[chain[1:]] - withdrawn[chain[1:]])
+    broken = np.abs(residual) > BALANCE_TOLERANCE
+    links = len(residual)
+    break_ratio = float(broken.mean()) if links else None
+    examples = []
+    receipts = df['receipt_no.'] if 'receipt_no.' in df.columns else None
+    for pos in np.flatnonzero(broken)[:EXAMPLES]:
+        row = chain[pos + 1]
+        examples.append({
+            'receipt_no': str(receipts.iat[row]) if receipts is not None else None,
+            'expected_balance': round(float(balance[chain[pos]] + paid_in[row] - withdrawn[row]), 2),
+            'balance': round(float(balance[row]), 2),
+        })
+
+    # Gaps between consecutive transactions, in days
+    gaps = np.diff(times_ns[order]) / NS_PER_DAY if len(order) > 1 else np.array([])
+    gap_limit = max(GAP_MIN_DAYS, GAP_MEDIAN_FACTOR * float(np.median(gaps))) if len(gaps) else None
+    gap_anomalies = int((gaps > gap_limit).sum()) if len(gaps) else 0
+
+    if duplicate_receipts is not None:
+        duplicates = duplicate_receipts
+    else:
+        duplicates = int((receipts.notna() & receipts.duplicated()).sum()) if receipts is not None else 0
+    negative_balances = int((balance < -BALANCE_TOLERANCE).sum())
+    unparsed = n - int(valid_time.sum())
+
+    report['checks'] = {
+        'balance_continuity': {
+            'links_checked': links,
+            'breaks': int(broken.sum()),
+            'break_ratio': round(break_ratio, 4) if break_ratio is not None else None,
+            'examples': examples,
+        },
+        'timestamp_order': {
+            'direction': 'newest_first' if newest_first else 'oldest_first',
+            'out_of_order_pairs': disordered,
+            'unparsed_timestamps': unparsed,
+        },
+        'duplicate_receipts': duplicates,
+        'gaps': {
+            'anomalies': gap_anomalies,
+            'largest_days': round(float(gaps.max()), 2) if len(gaps) else None,
+            'threshold_days': round(gap_limit, 2) if gap_limit is not None else None,
+        },
+        'negative_balances': negative_balances,
+    }
+
+    low, medium = [], []
+    if links == 0:
+        low.append('balance_unverifiable')
+    elif break_ratio > MAX_BREAK_RATIO:
+        low.append('balance_discontinuities')
+    elif broken.any():
+        medium.append('balance_discontinuities')
+    if negative_balances:
+        low.append('negative_balances')
+    if disordered > MAX_DISORDER_RATIO * max(1, len(order) - 1):
+        medium.append('rows_out_of_order')
+    if unparsed > MAX_UNPARSED_TIME_RATIO * n:
+        medium.append('unparsed_timestamps')
+    if duplicates:
+        medium.append('duplicate_receipts')
+    if gap_anomalies:
+        medium.append('gap_anomalies')
+    report['issues'] = low + medium
+    report['confidence'] = 'low' if low else 'medium' if medium else 'high'
+    return report
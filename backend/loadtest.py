@@ -0,0 +1,387 @@
+"""
+Load-test harness for the scoring API.
+
+Replays a corpus of generated M-Pesa CSVs against /api/predict and reports
+throughput, latency percentiles, error/fallback rates and per-worker RSS.
+Everything runs locally: the corpus is synthetic and --serve starts the API
+itself (gunicorn if installed, otherwise the threaded dev server).
+
+Examples:
+    python loadtest.py --serve --concurrency 8 --duration 30
+    python loadtest.py --rate 40 --duration 60 --save-baseline loadtest_baseline.json
+    python loadtest.py --rate 40 --duration 60 --baseline loadtest_baseline.json
+
+With --rate the arrivals are open-loop (Poisson) and latency is measured from
+the scheduled send time, so a saturated server shows up as queueing delay
+instead of silently lowering the offered load. Without --rate each of the
+--concurrency clients sends back to back (closed loop).
+
+--batch-concurrency adds closed-loop clients sending X-Priority: batch
+alongside the interactive load; their results are reported separately, so
+interactive percentiles can be compared with and without bulk traffic:
+    python loadtest.py --serve --rate 10 --duration 60 --batch-concurrency 4
+"""
+import argparse
+import json
+import math
+import os
+import random
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from warmup import build_synthetic_statement_csv
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Metric -> True when a higher value is better; drives baseline comparison
+COMPARED_METRICS = {
+    'throughput_rps': True,
+    'latency_p50_ms': False,
+    'latency_p95_ms': False,
+    'latency_p99_ms': False,
+    'error_rate': False,
+    'fallback_rate': False,
+    'max_worker_rss_mb': False,
+}
+
+
+# ============================================
+# CORPUS
+# ============================================
+
+def generate_corpus(directory, files=30, row_counts=(50, 200, 1000), seed=42):
+    """Write synthetic statements of mixed sizes to directory and return their paths"""
+    os.makedirs(directory, exist_ok=True)
+    rng = random.Random(seed)
+    paths = []
+    for i in range(files):
+        rows = rng.choice(row_counts)
+        path = os.path.join(directory, f"statement_{i:04d}_{rows}rows.csv")
+        with open(path, 'w') as f:
+            f.write(build_synthetic_statement_csv(n_rows=rows, seed=rng.randint(0, 99)))
+        paths.append(path)
+    return paths
+
+
+def load_corpus(directory):
+    """Read every CSV in directory into memory as (filename, bytes)"""
+    corpus = []
+    for name in sorted(os.listdir(directory)):
+        if name.endswith('.csv'):
+            with open(os.path.join(directory, name), 'rb') as f:
+                corpus.append((name, f.read()))
+    if not corpus:
+        raise SystemExit(f"No .csv files found in {directory}")
+    return corpus
+
+
+def build_multipart(filename, payload, field='mpesa_statement'):
+    """Encode one file upload as multipart/form-data"""
+    boundary = uuid.uuid4().hex
+    body = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+        "Content-Type: text/csv\r\n\r\n"
+    ).encode('utf-8') + payload + f"\r\n--{boundary}--\r\n".encode('utf-8')
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+# ============================================
+# REQUESTS
+# ============================================
+
+def send_prediction(url, request_body, content_type, timeout, priority='interactive', client_id=None):
+    """POST one statement; return (status, model_used or None)"""
+    headers = {'Content-Type': content_type, 'X-Priority': priority}
+    if client_id:
+        headers['X-Client-Id'] = client_id
+    req = urllib.request.Request(
+        f"{url}/api/predict", data=request_body, method='POST', headers=headers
+    )
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as response:
+            payload = json.loads(response.read())
+            return response.status, payload.get('prediction', {}).get('model_used')
+    except urllib.error.HTTPError as e:
+        return e.code, None
+    except Exception:
+        return 0, None
+
+
+def fetch_health(url, timeout=5):
+    try:
+        with urllib.request.urlopen(f"{url}/api/health", timeout=timeout) as response:
+            return json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return json.loads(e.read() or b'{}')
+    except Exception:
+        return None
+
+
+class RunRecorder:
+    """Thread-safe collection of per-request samples and worker RSS readings"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies_ms = []
+        self.status_counts = {}
+        self.fallbacks = 0
+        self.worker_rss_mb = {}
+
+    def record(self, latency_ms, status, model_used):
+        with self.lock:
+            self.latencies_ms.append(latency_ms)
+            self.status_counts[status] = self.status_counts.get(status, 0) + 1
+            if status == 200 and model_used is False:
+                self.fallbacks += 1
+
+    def record_rss(self, health):
+        if health and health.get('pid') and health.get('rss_mb') is not None:
+            with self.lock:
+                pid = str(health['pid'])
+                self.worker_rss_mb[pid] = max(self.worker_rss_mb.get(pid, 0), health['rss_mb'])
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return round(sorted_values[rank], 2)
+
+
+def poll_worker_rss(url, recorder, stop, interval):
+    """Sample /api/health in the background; each answer comes from whichever worker took it"""
+    while not stop.is_set():
+        recorder.record_rss(fetch_health(url))
+        stop.wait(interval)
+
+
+def summarise(recorder, elapsed):
+    latencies = sorted(recorder.latencies_ms)
+    total = len(latencies)
+    ok = recorder.status_counts.get(200, 0)
+    return {
+        'requests': total,
+        'throughput_rps': round(ok / elapsed, 2) if elapsed else 0,
+        'latency_p50_ms': percentile(latencies, 50),
+        'latency_p95_ms': percentile(latencies, 95),
+        'latency_p99_ms': percentile(latencies, 99),
+        'latency_max_ms': round(latencies[-1], 2) if latencies else None,
+        'error_rate': round((total - ok) / total, 4) if total else 0,
+        'fallback_rate': round(recorder.fallbacks / ok, 4) if ok else 0,
+        'status_counts': {str(k): v for k, v in sorted(recorder.status_counts.items())},
+    }
+
+
+def run_load(url, corpus, concurrency, rate, duration, timeout, seed=0, clients=None, batch_concurrency=0):
+    """Drive the server for duration seconds and return a summary dict"""
+    rng = random.Random(seed)
+    encoded = [build_multipart(name, payload) for name, payload in corpus]
+    recorder = RunRecorder()
+    batch_recorder = RunRecorder()
+    stop = threading.Event()
+    poller = threading.Thread(target=poll_worker_rss, args=(url, recorder, stop, 1.0), daemon=True)
+    poller.start()
+    # Spread requests over several client ids so per-client rate limits see realistic callers
+    client_ids = [f"loadtest-{uuid.uuid4().hex[:8]}" for _ in range(clients or concurrency)]
+
+    def timed_request(scheduled_at, priority='interactive', sink=recorder):
+        body, content_type = rng.choice(encoded)
+        status, model_used = send_prediction(url, body, content_type, timeout, priority, rng.choice(client_ids))
+        sink.record((time.perf_counter() - scheduled_at) * 1000, status, model_used)
+
+    started = time.perf_counter()
+    deadline = started + duration
+
+    def batch_loop():
+        while time.perf_counter() < deadline:
+            timed_request(time.perf_counter(), 'batch', batch_recorder)
+    batch_threads = [threading.Thread(target=batch_loop) for _ in range(batch_concurrency)]
+    for t in batch_threads:
+        t.start()
+    if rate:
+        # Open loop: Poisson arrivals, latency includes time spent queued client-side
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            next_arrival = started
+            while next_arrival < deadline:
+                delay = next_arrival - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(timed_request, next_arrival)
+                next_arrival += rng.expovariate(rate)
+    else:
+        # Closed loop: each client sends its next request as soon as the last one returns
+        def client_loop():
+            while time.perf_counter() < deadline:
+                timed_request(time.perf_counter())
+        threads = [threading.Thread(target=client_loop) for _ in range(concurrency)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    for t in batch_threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    poller.join()
+    recorder.record_rss(fetch_health(url))
+
+    return {
+        'url': url,
+        'concurrency': concurrency,
+        'offered_rate_rps': rate or None,
+        'duration_s': round(elapsed, 2),
+        'corpus_files': len(corpus),
+        **summarise(recorder, elapsed),
+        'batch': {'concurrency': batch_concurrency, **summarise(batch_recorder, elapsed)} if batch_concurrency else None,
+        'worker_rss_mb': recorder.worker_rss_mb,
+        'max_worker_rss_mb': max(recorder.worker_rss_mb.values()) if recorder.worker_rss_mb else None,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+# ============================================
+# BASELINE COMPARISON
+# ============================================
+
+def compare_to_baseline(result, baseline, tolerance):
+    """Return (rows, regressed) comparing result against a stored baseline run"""
+    rows = []
+    regressed = False
+    for metric, higher_is_better in COMPARED_METRICS.items():
+        current, previous = result.get(metric), baseline.get(metric)
+        if current is None or previous is None:
+            continue
+        if previous == 0:
+            change = 0.0 if current == 0 else float('inf')
+        else:
+            change = (current - previous) / abs(previous)
+        worse = -change if higher_is_better else change
+        # Rates near zero are compared absolutely so 0 -> 0.001 isn't an "infinite" regression
+        if metric.endswith('_rate'):
+            worse = (previous - current) if higher_is_better else (current - previous)
+        is_regression = worse > tolerance
+        regressed = regressed or is_regression
+        rows.append((metric, previous, current, change, is_regression))
+    return rows, regressed
+
+
+def print_report(result, comparison=None):
+    print("\n📊 Load test results")
+    for key in ('requests', 'duration_s', 'throughput_rps', 'latency_p50_ms', 'latency_p95_ms',
+                'latency_p99_ms', 'latency_max_ms', 'error_rate', 'fallback_rate', 'max_worker_rss_mb'):
+        print(f"   {key:<20} {result[key]}")
+    print(f"   {'status_counts':<20} {result['status_counts']}")
+    print(f"   {'worker_rss_mb':<20} {result['worker_rss_mb']}")
+    if result.get('batch'):
+        batch = result['batch']
+        print(f"\n📦 Batch traffic ({batch['concurrency']} closed-loop clients)")
+        for key in ('requests', 'throughput_rps', 'latency_p50_ms', 'latency_p95_ms', 'error_rate'):
+            print(f"   {key:<20} {batch[key]}")
+        print(f"   {'status_counts':<20} {batch['status_counts']}")
+    if comparison:
+        print("\n📈 Against baseline")
+        for metric, previous, current, change, is_regression in comparison:
+            flag = "❌ REGRESSION" if is_regression else "✅"
+            print(f"   {metric:<20} {previous:>10} -> {current:<10} ({change:+.1%}) {flag}")
+
+
+# ============================================
+# LOCAL SERVER
+# ============================================
+
+def start_local_server(port, workers):
+    """Start the API on localhost (gunicorn when available) and wait until it reports ready"""
+    env = dict(os.environ, GUNICORN_BIND=f"127.0.0.1:{port}", GUNICORN_WORKERS=str(workers),
+               GUNICORN_ACCESS_LOG='', TRUSTED_PROXIES='127.0.0.1')
+    if shutil.which('gunicorn'):
+        cmd = ['gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app']
+    else:
+        print("⚠️  gunicorn not found, falling back to the threaded dev server")
+        cmd = [sys.executable, '-c',
+               f"from app import app; app.run(host='127.0.0.1', port={port}, threaded=True)"]
+    process = subprocess.Popen(cmd, cwd=BACKEND_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise SystemExit("Local server exited during startup")
+        health = fetch_health(url, timeout=2)
+        if health and health.get('status') == 'healthy':
+            return process, url
+        time.sleep(0.5)
+    process.terminate()
+    raise SystemExit("Local server did not become ready within 120s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay synthetic M-Pesa statements against /api/predict")
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--serve', action='store_true', help='start a local server for the run')
+    parser.add_argument('--port', type=int, default=5099, help='port used with --serve')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers used with --serve')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--rate', type=float, default=0, help='open-loop arrivals per second (0 = closed loop)')
+    parser.add_argument('--duration', type=float, default=30, help='seconds')
+    parser.add_argument('--timeout', type=float, default=60, help='per-request timeout in seconds')
+    parser.add_argument('--clients', type=int,
+                        help='distinct X-Client-Id values to spread requests over (default: concurrency); '
+                             'the server honours them only from TRUSTED_PROXIES')
+    parser.add_argument('--batch-concurrency', type=int, default=0, help='extra closed-loop clients sending X-Priority: batch')
+    parser.add_argument('--corpus-dir', default=os.path.join(BACKEND_DIR, 'loadtest_corpus'))
+    parser.add_argument('--corpus-files', type=int, default=30)
+    parser.add_argument('--rows', default='50,200,1000', help='comma-separated statement sizes')
+    parser.add_argument('--out', help='write the result JSON here')
+    parser.add_argument('--baseline', help='compare against this stored result')
+    parser.add_argument('--save-baseline', help='store this run as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.10, help='allowed relative regression')
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.corpus_dir) or not any(n.endswith('.csv') for n in os.listdir(args.corpus_dir)):
+        row_counts = tuple(int(r) for r in args.rows.split(','))
+        generate_corpus(args.corpus_dir, files=args.corpus_files, row_counts=row_counts)
+        print(f"📁 Generated {args.corpus_files} synthetic statements in {args.corpus_dir}")
+    corpus = load_corpus(args.corpus_dir)
+
+    server = None
+    url = args.url.rstrip('/')
+    if args.serve:
+        server, url = start_local_server(args.port, args.workers)
+        print(f"🚀 Local server ready at {url}")
+
+    try:
+        print(f"🔄 Running {'open' if args.rate else 'closed'}-loop load for {args.duration:g}s "
+              f"(concurrency={args.concurrency}{f', rate={args.rate:g}/s' if args.rate else ''})")
+        result = run_load(url, corpus, args.concurrency, args.rate, args.duration, args.timeout,
+                          clients=args.clients, batch_concurrency=args.batch_concurrency)
+    finally:
+        if server:
+            server.terminate()
+            server.wait(timeout=30)
+
+    comparison, regressed = None, False
+    if args.baseline:
+        with open(args.baseline) as f:
+            comparison, regressed = compare_to_baseline(result, json.load(f), args.tolerance)
+    print_report(result, comparison)
+
+    for path in filter(None, (args.out, args.save_baseline)):
+        with open(path, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f"💾 Results saved to {path}")
+
+    sys.exit(1 if regressed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""
+Shared M-Pesa feature library.
+
+Imported by the API (backend/app.py), the training scripts, the SHAP demo
+and the Tk dashboard so training and serving compute features identically.
+Run `python -m mpesa_features.golden` from backend/ after touching anything
+here; it checks extraction against the recorded golden outputs.
+"""
+from mpesa_features.counterparty import (
+    COUNTERPARTY_FEATURES,
+    counterparty_features,
+    counterparty_ids,
+    needs_counterparty_features,
+)
+from mpesa_features.extract import (
+    REPAYMENT_PATTERNS,
+    convert_numpy_types,
+    extract_features,
+    parse_completion_time,
+)
+from mpesa_features.reference import (
+    build_reference,
+    histogram_bins,
+    load_reference,
+    write_reference,
+)
+from mpesa_features.specs import (
+    DEFAULT_SPEC_VERSION,
+    FEATURE_SPECS,
+    feature_columns,
+    feature_vector,
+    spec_version_for_model,
+)
+
+__all__ = [
+    'COUNTERPARTY_FEATURES',
+    'DEFAULT_SPEC_VERSION',
+    'FEATURE_SPECS',
+    'REPAYMENT_PATTERNS',
+    'build_reference',
+    'convert_numpy_types',
+    'counterparty_features',
+    'counterparty_ids',
+    'extract_features',
+    'feature_columns',
+    'feature_vector',
+    'histogram_bins',
+    'load_reference',
+    'needs_counterparty_features',
+    'parse_completion_time',
+    'spec_version_for_model',
+    'write_reference',
+]
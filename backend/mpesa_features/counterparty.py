@@ -0,0 +1,139 @@
+"""
+Counterparty concentration features.
+
+The `details` column names who the money came from or went to: "Customer
+Transfer to 0712***678 - JOHN DOE", "Pay Bill to 888880 - KPLC PREPAID
+Acc. 1234", "Business Payment from KCB". counterparty_ids() maps every row
+to an interned counterparty id. The string work runs once per distinct
+description, not once per row. After that every feature is a bincount over
+the ids, so a 100k-row statement costs a few hashing passes plus string
+work proportional to the number of distinct descriptions.
+
+Only feature spec v3 uses these. extract_features(df, counterparty=True)
+adds them; v1/v2 models never pay for the extra passes.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+COUNTERPARTY_FEATURES = [
+    'top_payer_inflow_share',
+    'unique_payers',
+    'payer_concentration_hhi',
+    'recurring_payer_regularity',
+    'unique_payees',
+]
+
+# Direction / product wording in front of the counterparty itself
+DIRECTION_REGEX = re.compile(
+    r"^(?:customer transfer(?: of funds)?(?: to| from)?|funds received from|received from"
+    r"|business payment(?: from| to)?|merchant payment(?: to| from)?|pay ?bill(?: online)?(?: to)?"
+    r"|buy goods(?: and services)?(?: to| from)?|send money(?: to)?|payment (?:from|to)"
+    r"|deposit of funds at agent till|withdrawal at agent till)\b[\s:-]*",
+    re.IGNORECASE
+)
+# Account references change per payment but belong to the same counterparty
+ACCOUNT_REGEX = re.compile(r"\s+acc(?:ount)?\b\.?.*$", re.IGNORECASE)
+SEPARATOR = ' - '
+WHITESPACE_REGEX = re.compile(r"\s+")
+
+# A payer needs this many payments before its rhythm counts as recurring
+MIN_RECURRING_PAYMENTS = 3
+
+NS_PER_DAY = 86400 * 10**9
+
+
+def counterparty_name(details):
+    """Normalised counterparty for one description ('' when there is none)"""
+    if not isinstance(details, str):
+        return ''
+    text = WHITESPACE_REGEX.sub(' ', details).strip()
+    text = ACCOUNT_REGEX.sub('', text)
+    remainder = DIRECTION_REGEX.sub('', text)
+    if SEPARATOR in remainder:
+        # "0712***678 - JOHN DOE": the name is stable, masked numbers are not
+        remainder = remainder.rsplit(SEPARATOR, 1)[1]
+    # Bare wording ("Send Money", "Salary") is the only identity the row has
+    return (remainder or text).strip(' .-').lower()
+
+
+def counterparty_ids(details):
+    """(ids per row, names) with -1 for rows without a counterparty"""
+    codes, uniques = pd.factorize(details)
+    names = [counterparty_name(value) for value in np.asarray(uniques, dtype=object)]
+    # Different descriptions of the same counterparty share one id
+    remap, interned = pd.factorize(pd.Series(names, dtype=object))
+    empty = np.flatnonzero(interned == '')
+    if len(empty):
+        remap = np.where(remap == empty[0], -1, remap)
+    remap = np.append(remap, -1)  # codes of -1 (missing details) index the last slot
+    ids = remap[codes]
+    return ids, list(interned)
+
+
+def _amounts(df, col):
+    if col not in df.columns:
+        return np.zeros(len(df))
+    values = pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=float)
+    return np.nan_to_num(values)
+
+
+def _recurring_regularity(ids, times_ns, inflow_by_payer):
+    """Per payer 1 / (1 + coefficient of variation of days between payments); 0 below MIN_RECURRING_PAYMENTS"""
+    n_payers = len(inflow_by_payer)
+    regularity = np.zeros(n_payers)
+    if len(ids) < MIN_RECURRING_PAYMENTS:
+        return regularity
+    order = np.lexsort((times_ns, ids))
+    ids, times_ns = ids[order], times_ns[order]
+    same_payer = ids[1:] == ids[:-1]
+    payer = ids[1:][same_payer]
+    gaps = np.diff(times_ns)[same_payer] / NS_PER_DAY
+    count = np.bincount(payer, minlength=n_payers)
+    total = np.bincount(payer, weights=gaps, minlength=n_payers)
+    squares = np.bincount(payer, weights=gaps * gaps, minlength=n_payers)
+    recurring = (count >= MIN_RECURRING_PAYMENTS - 1) & (total > 0)
+    mean = total[recurring] / count[recurring]
+    std = np.sqrt(np.maximum(squares[recurring] / count[recurring] - mean * mean, 0))
+    regularity[recurring] = 1 / (1 + std / mean)
+    return regularity
+
+
+def counterparty_features(df):
+    """Concentration of inflows across payers and breadth of payees"""
+    features = dict.fromkeys(COUNTERPARTY_FEATURES, 0)
+    if 'details' not in df.columns or len(df) == 0:
+        return features
+
+    ids, names = counterparty_ids(df['details'])
+    n_ids = len(names)
+    paid_in = _amounts(df, 'paid_in')
+    withdrawn = _amounts(df, 'withdrawn')
+
+    outgoing = (withdrawn > 0) & (ids >= 0)
+    features['unique_payees'] = int(np.count_nonzero(np.bincount(ids[outgoing], minlength=n_ids)))
+
+    incoming = (paid_in > 0) & (ids >= 0)
+    if not incoming.any():
+        return features
+    inflow_by_payer = np.bincount(ids[incoming], weights=paid_in[incoming], minlength=n_ids)
+    total_inflow = inflow_by_payer.sum()
+    shares = inflow_by_payer / total_inflow
+    features['top_payer_inflow_share'] = float(shares.max())
+    features['unique_payers'] = int(np.count_nonzero(inflow_by_payer))
+    features['payer_concentration_hhi'] = float((shares * shares).sum())
+
+    if 'completion_time' in df.columns and pd.api.types.is_datetime64_any_dtype(df['completion_time']):
+        times = df['completion_time']
+        dated = incoming & times.notna().to_numpy()
+        times_ns = times.to_numpy(dtype='datetime64[ns]').astype(np.int64)
+        regularity = _recurring_regularity(ids[dated], times_ns[dated], inflow_by_payer)
+        # Share of inflow arriving on a steady rhythm: ~1 for a salaried customer, 0 for one-off payers
+        features['recurring_payer_regularity'] = float((regularity * shares).sum())
+    return features
+
+
+def needs_counterparty_features(columns):
+    """True when a model's feature columns include any counterparty feature"""
+    return any(col in COUNTERPARTY_FEATURES for col in columns)
@@ -0,0 +1,185 @@
+"""
+Statement -> feature extraction.
+
+This is the serving definition of every feature (extended repayment keywords,
+Send Money counted at 0.3, repayment_ratio per transaction). Training,
+explanations and the dashboards all call this function, so a model is
+always fed the same numbers it would see in /api/predict.
+"""
+import logging
+import re
+
+import numpy as np
+import pandas as pd
+
+from mpesa_features.counterparty import counterparty_features
+
+logger = logging.getLogger(__name__)
+
+# Compiled once at import instead of on every request
+REPAYMENT_PATTERNS = [
+    "repay", "loan", "lend", "borrow", "credit",
+    "finance", "microfinance", "branch", "equity",
+    "kcb", "cooperative", "sacco", "m-shwari"
+]
+REPAYMENT_REGEX = re.compile("|".join(REPAYMENT_PATTERNS), re.IGNORECASE)
+SEND_MONEY_REGEX = re.compile("send money", re.IGNORECASE)
+
+# Share of Send Money transfers treated as informal repayments
+SEND_MONEY_REPAYMENT_WEIGHT = 0.3
+
+# Columns extract_features reads; everything else is dropped before sorting
+FEATURE_INPUT_COLUMNS = ['completion_time', 'details', 'paid_in', 'withdrawn', 'balance']
+
+
+def convert_numpy_types(obj):
+    """Convert numpy types to native Python types for JSON serialization"""
+    if isinstance(obj, (np.integer, np.int32, np.int64)):
+        return int(obj)
+    elif isinstance(obj, (np.floating, np.float32, np.float64)):
+        return float(obj)
+    elif isinstance(obj, np.ndarray):
+        return obj.tolist()
+    elif isinstance(obj, pd.Timestamp):
+        if pd.isna(obj):
+            return None
+        return obj.isoformat()
+    elif pd.isna(obj):
+        return None
+    else:
+        return obj
+
+
+def parse_completion_time(series):
+    """Vectorized equivalent of calling pd.to_datetime(value, errors='coerce') on each row"""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+    return pd.to_datetime(series, errors='coerce', format='mixed')
+
+
+def _default_temporal_features(transaction_count):
+    return {
+        'days_covered': 30,
+        'transactions_per_day': transaction_count / 30,
+        'inflow_trend': 0,
+        'transaction_consistency': 0
+    }
+
+
+def _temporal_features(df, valid_dates):
+    """Temporal features for a frame already sorted by completion_time"""
+    date_range = (valid_dates.max() - valid_dates.min()).days
+    days_covered = max(1, date_range)
+
+    # Transaction frequency
+    transactions_per_day = len(df) / days_covered
+
+    # Simple trend: compare first half vs second half of the sorted statement
+    half_idx = len(df) // 2
+    paid_in = df['paid_in'].to_numpy()
+    first_half, second_half = paid_in[:half_idx], paid_in[half_idx:]
+    first_half_inflow = first_half[first_half > 0].sum()
+    second_half_inflow = second_half[second_half > 0].sum()
+
+    if first_half_inflow > 0:
+        inflow_trend = (second_half_inflow - first_half_inflow) / first_half_inflow
+    else:
+        inflow_trend = 0 if second_half_inflow == 0 else 1
+
+    # Consistency: spread of day gaps between the first ten transactions
+    transaction_consistency = 0
+    if len(valid_dates) > 5:
+        sorted_dates = valid_dates.sort_values().iloc[:10].dt.date
+        date_diffs = []
+        for i in range(1, len(sorted_dates)):
+            diff = (sorted_dates.iloc[i] - sorted_dates.iloc[i - 1]).days
+            if diff > 0:
+                date_diffs.append(diff)
+        if date_diffs:
+            transaction_consistency = np.std(date_diffs)
+
+    return {
+        'days_covered': days_covered,
+        'transactions_per_day': transactions_per_day,
+        'inflow_trend': inflow_trend,
+        'transaction_consistency': transaction_consistency
+    }
+
+
+def extract_features(df, counterparty=False):
+    """
+    Extract behavioural and temporal features from a statement DataFrame.
+
+    counterparty=True adds the counterparty concentration features (spec v3).
+    """
+    try:
+        # Work on the columns we need only; the caller's frame is never modified
+        df = df[[col for col in FEATURE_INPUT_COLUMNS if col in df.columns]].copy()
+
+        if 'completion_time' in df.columns:
+            df['completion_time'] = parse_completion_time(df['completion_time'])
+
+        # ===== TEMPORAL ANALYSIS =====
+        has_temporal_data = 'completion_time' in df.columns and not df['completion_time'].isna().all()
+
+        temporal_features = _default_temporal_features(len(df))
+        if has_temporal_data:
+            # Sort by date; the aggregates below are summed in this order too
+            df = df.sort_values('completion_time', ascending=True)
+            valid_dates = df['completion_time'].dropna()
+            if len(valid_dates) > 1:
+                temporal_features = _temporal_features(df, valid_dates)
+
+        # ===== CASH FLOW AND REPAYMENT FEATURES =====
+        paid_in = df['paid_in']
+        inflows = paid_in[paid_in > 0]
+        inflow = inflows.sum()
+        outflow = df['withdrawn'][df['withdrawn'] > 0].sum()
+        net_flow = inflow - outflow
+
+        # Count transactions that might indicate financial responsibility
+        repayments = df['details'].str.contains(REPAYMENT_REGEX, na=False).sum()
+
+        # Also count consistent send money patterns
+        send_money_count = df['details'].str.contains(SEND_MONEY_REGEX, na=False).sum()
+
+        # If user has regular send money patterns, count some as potential repayments
+        potential_repayments = repayments + (send_money_count * SEND_MONEY_REPAYMENT_WEIGHT)
+
+        repayment_ratio = potential_repayments / len(df) if len(df) > 0 else 0
+
+        balance_volatility = df['balance'].std() if 'balance' in df.columns else 0
+        avg_transaction = inflows.mean() or 0
+        transaction_count = len(df)
+
+        # ===== COUNTERPARTY CONCENTRATION (spec v3 only) =====
+        counterparty_values = counterparty_features(df) if counterparty else {}
+
+        # ===== COMBINE ALL FEATURES =====
+        features = {
+            'monthly_inflow': inflow,
+            'monthly_outflow': outflow,
+            'net_cash_flow': net_flow,
+            'repayments': int(potential_repayments),
+            'repayment_ratio': repayment_ratio,
+            'balance_volatility': balance_volatility,
+            'avg_transaction_amount': avg_transaction,
+            'transaction_count': transaction_count,
+
+            # Temporal features
+            **temporal_features,
+            **counterparty_values,
+
+            # Metadata
+            'has_temporal_data': has_temporal_data
+        }
+
+        # Convert all values to native Python types
+        features = {k: convert_numpy_types(v) for k, v in features.items()}
+
+        logger.info(f"🔍 Features extracted: {features}")
+        return features
+
+    except Exception as e:
+        logger.error(f"Error extracting features: {str(e)}")
+        raise
@@ -0,0 +1,122 @@
+"""
+Golden-output check for the feature library.
+
+Runs extract_features over the recorded statements in golden/statements
+(plus the repo's sample dataset) and compares the results with
+golden/expected_features.json. Each statement is loaded twice: once with
+plain pd.read_csv and once through statement_schema.read_statement, the
+typed path the API ingests uploads with. This shows the output does not
+depend on how the frame was loaded.
+
+    python -m mpesa_features.golden            # verify, exit 1 on drift
+    python -m mpesa_features.golden --update   # re-record after an intended change
+
+The expected values were first recorded from the 12-feature extractor that
+used to live in backend/app.py, so this also guards parity with what the
+API served before the library existed. Statements are extracted with
+counterparty=True, so the spec v3 counterparty features are covered too.
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import sys
+
+import pandas as pd
+
+import statement_schema
+from mpesa_features.extract import extract_features
+
+GOLDEN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'golden')
+STATEMENTS_DIR = os.path.join(GOLDEN_DIR, 'statements')
+EXPECTED_PATH = os.path.join(GOLDEN_DIR, 'expected_features.json')
+SAMPLE_DATASET = os.path.join(GOLDEN_DIR, os.pardir, os.pardir, os.pardir, 'ai-model', 'mpesa_synthetic_dataset.csv')
+
+# Loose enough for summation-order noise across numpy builds, tight enough to catch real drift
+REL_TOLERANCE = 1e-9
+
+def _read_bytes(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+LOADERS = {
+    'untyped': lambda path: pd.read_csv(path),
+    'typed': lambda path: statement_schema.read_statement(_read_bytes(path), 'csv'),
+}
+
+
+def golden_statements():
+    """(name, path) for every statement in the golden set"""
+    statements = [
+        (os.path.splitext(name)[0], os.path.join(STATEMENTS_DIR, name))
+        for name in sorted(os.listdir(STATEMENTS_DIR)) if name.endswith('.csv')
+    ]
+    if os.path.exists(SAMPLE_DATASET):
+        statements.append(('mpesa_synthetic_dataset', os.path.normpath(SAMPLE_DATASET)))
+    return statements
+
+
+def compute_features(loader='untyped'):
+    return {name: extract_features(LOADERS[loader](path), counterparty=True) for name, path in golden_statements()}
+
+
+def _values_match(expected, actual):
+    if isinstance(expected, float) or isinstance(actual, float):
+        if expected is None or actual is None:
+            return expected is actual
+        if math.isnan(expected) or math.isnan(actual):
+            return math.isnan(expected) and math.isnan(actual)
+        return math.isclose(expected, actual, rel_tol=REL_TOLERANCE, abs_tol=1e-12)
+    return expected == actual
+
+
+def compare(expected, actual):
+    """List of human-readable mismatches between two {statement: features} maps"""
+    problems = []
+    for name in sorted(set(expected) | set(actual)):
+        if name not in actual:
+            problems.append(f"{name}: missing from current output")
+            continue
+        if name not in expected:
+            problems.append(f"{name}: no golden record (run with --update)")
+            continue
+        for key in sorted(set(expected[name]) | set(actual[name])):
+            exp, act = expected[name].get(key), actual[name].get(key)
+            if not _values_match(exp, act):
+                problems.append(f"{name}.{key}: expected {exp!r}, got {act!r}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check extract_features against golden outputs")
+    parser.add_argument('--update', action='store_true', help='re-record the golden outputs')
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    if args.update:
+        with open(EXPECTED_PATH, 'w') as f:
+            json.dump(compute_features(), f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"💾 Golden outputs written to {EXPECTED_PATH}")
+        return 0
+
+    with open(EXPECTED_PATH) as f:
+        expected = json.load(f)
+
+    failed = False
+    for loader in LOADERS:
+        problems = compare(expected, compute_features(loader))
+        if problems:
+            failed = True
+            print(f"❌ {loader} load: {len(problems)} mismatches")
+            for problem in problems:
+                print(f"   {problem}")
+        else:
+            print(f"✅ {loader} load: {len(expected)} statements match golden outputs")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,59 @@
+"""
+Training-time reference distributions for drift monitoring.
+
+The training scripts summarise every feature (and the model's training-set
+probabilities) as a quantile grid plus decile histogram. backend/drift.py
+compares live traffic against that summary, so the training data itself never
+has to ship with the model.
+"""
+import json
+from datetime import datetime
+
+import numpy as np
+
+# Quantile grid stored per feature (0%, 1%, ..., 100%)
+REFERENCE_QUANTILES = np.linspace(0, 1, 101)
+HISTOGRAM_BINS = 10
+
+
+def histogram_bins(edges, values):
+    """Bin index per value; bin i covers [edges[i-1], edges[i]) with open ends"""
+    return np.searchsorted(edges, values, side='right')
+
+
+def summarise(values):
+    """Quantiles, decile bin edges and bin shares for one numeric column"""
+    values = np.asarray(values, dtype=float)
+    values = values[np.isfinite(values)]
+    if len(values) == 0:
+        return None
+    # Ties (counts, 30/60/90 day spans) collapse duplicate edges
+    edges = np.unique(np.quantile(values, np.linspace(0, 1, HISTOGRAM_BINS + 1)[1:-1]))
+    counts = np.bincount(histogram_bins(edges, values), minlength=len(edges) + 1)
+    return {
+        'rows': int(len(values)),
+        'quantiles': np.quantile(values, REFERENCE_QUANTILES).tolist(),
+        'bin_edges': edges.tolist(),
+        'bin_shares': (counts / len(values)).tolist(),
+    }
+
+
+def build_reference(frame, probabilities=None, source=''):
+    """Reference summary for every column of frame, plus the model's probabilities if given"""
+    return {
+        'created_at': datetime.now().isoformat(),
+        'source': source,
+        'rows': int(len(frame)),
+        'features': {col: summarise(frame[col]) for col in frame.columns},
+        'probability': summarise(probabilities) if probabilities is not None else None,
+    }
+
+
+def write_reference(reference, path):
+    with open(path, 'w') as f:
+        json.dump(reference, f, indent=2)
+
+
+def load_reference(path):
+    with open(path) as f:
+        return json.load(f)
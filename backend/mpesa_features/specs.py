@@ -0,0 +1,60 @@
+"""
+Versioned feature specs.
+
+A spec is the ordered column list a model was trained on. Models are matched
+to a spec by feature names (when sklearn recorded them) or by feature count,
+so serving always builds vectors in the order the model expects.
+"""
+from mpesa_features.counterparty import COUNTERPARTY_FEATURES
+
+FEATURE_SPECS = {
+    # Original behavioural features - the shipped credit_model.joblib uses these
+    'v1': [
+        'monthly_inflow', 'monthly_outflow', 'net_cash_flow',
+        'repayments', 'repayment_ratio', 'balance_volatility',
+        'avg_transaction_amount', 'transaction_count'
+    ],
+    # v1 plus temporal patterns
+    'v2': [
+        'monthly_inflow', 'monthly_outflow', 'net_cash_flow',
+        'repayments', 'repayment_ratio', 'balance_volatility',
+        'avg_transaction_amount', 'transaction_count',
+        'days_covered', 'transactions_per_day', 'inflow_trend', 'transaction_consistency'
+    ],
+    # v2 plus counterparty concentration (extract_features(df, counterparty=True))
+    'v3': [
+        'monthly_inflow', 'monthly_outflow', 'net_cash_flow',
+        'repayments', 'repayment_ratio', 'balance_volatility',
+        'avg_transaction_amount', 'transaction_count',
+        'days_covered', 'transactions_per_day', 'inflow_trend', 'transaction_consistency',
+        *COUNTERPARTY_FEATURES
+    ],
+}
+
+DEFAULT_SPEC_VERSION = 'v2'
+
+
+def feature_columns(version=DEFAULT_SPEC_VERSION):
+    """Ordered feature names for a spec version"""
+    if version not in FEATURE_SPECS:
+        raise KeyError(f"Unknown feature spec '{version}', expected one of {sorted(FEATURE_SPECS)}")
+    return list(FEATURE_SPECS[version])
+
+
+def spec_version_for_model(model):
+    """Spec a fitted model was trained on (DEFAULT_SPEC_VERSION when it can't be told)"""
+    names = getattr(model, 'feature_names_in_', None)
+    if names is not None:
+        for version, columns in FEATURE_SPECS.items():
+            if list(names) == columns:
+                return version
+    count = getattr(model, 'n_features_in_', None)
+    for version, columns in FEATURE_SPECS.items():
+        if len(columns) == count:
+            return version
+    return DEFAULT_SPEC_VERSION
+
+
+def feature_vector(features, columns):
+    """Feature values in column order, 0 for anything missing"""
+    return [features.get(col, 0) for col in columns]
@@ -0,0 +1,256 @@
+"""
+Materialized portfolio rollups for the dashboard endpoints.
+
+Every completed prediction bumps a handful of counters (decision mix, score
+histogram, business labels, limits per day), so reads never rescan past
+decisions and cost the same at 100 or 1,000,000 of them.
+
+Each gunicorn worker keeps its own counters in memory and flushes them to
+<PORTFOLIO_DIR>/worker-<pid>-<start>.json every few seconds when they changed.
+Reads merge the live counters of the current worker with the files of all
+others. When a worker starts, files left by workers that are no longer running
+are folded into base.json, so the directory doesn't grow with every restart.
+PORTFOLIO_DIR is per host: liveness is checked by pid.
+"""
+import glob
+import json
+import os
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines: no cross-process compaction lock
+    fcntl = None
+
+SCORE_BIN_WIDTH = 5
+SCORE_BINS = 100 // SCORE_BIN_WIDTH
+APPROVED_DECISIONS = ('APPROVED', 'APPROVED_WITH_CAUTION')
+
+
+def empty_state():
+    return {
+        'total': 0,
+        'model_scored': 0,
+        'score_sum': 0.0,
+        'limit_sum': 0.0,
+        'decisions': {},
+        'business_labels': {},
+        'score_bins': [0] * SCORE_BINS,
+        # 'YYYY-MM-DD' -> {count, approved, limit_sum, approved_limit_sum, score_sum}
+        'daily': {},
+    }
+
+
+def merge_states(states):
+    """Sum any number of rollup states into one"""
+    merged = empty_state()
+    decisions, labels = Counter(), Counter()
+    for state in states:
+        for key in ('total', 'model_scored', 'score_sum', 'limit_sum'):
+            merged[key] += state.get(key, 0)
+        decisions.update(state.get('decisions', {}))
+        labels.update(state.get('business_labels', {}))
+        for i, count in enumerate(state.get('score_bins', [])):
+            merged['score_bins'][i] += count
+        for day, values in state.get('daily', {}).items():
+            target = merged['daily'].setdefault(day, Counter())
+            target.update(values)
+    merged['decisions'] = dict(decisions)
+    merged['business_labels'] = dict(labels)
+    merged['daily'] = {day: dict(values) for day, values in merged['daily'].items()}
+    return merged
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        # EPERM and friends: the pid exists, it just isn't ours
+        return True
+    return True
+
+
+class PortfolioRollup:
+    """Per-process incremental counters, flushed to disk and merged across workers on read"""
+
+    def __init__(self, rollup_dir, flush_seconds=5):
+        self.rollup_dir = rollup_dir
+        self.flush_seconds = flush_seconds
+        self.worker_file = os.path.join(rollup_dir, f"worker-{os.getpid()}-{int(time.time() * 1000)}.json")
+        self.base_file = os.path.join(rollup_dir, 'base.json')
+        self._state = empty_state()
+        self._dirty = False
+        self._lock = threading.Lock()
+        os.makedirs(rollup_dir, exist_ok=True)
+        self.compact()
+        threading.Thread(target=self._flush_loop, name='portfolio-flush', daemon=True).start()
+
+    def record(self, prediction_result, when=None):
+        """Fold one /api/predict prediction into the counters (O(1))"""
+        score = float(prediction_result.get('alt_score') or 0)
+        limit = float(prediction_result.get('recommended_limit') or 0)
+        decision = prediction_result.get('decision_status', 'UNKNOWN')
+        label = (prediction_result.get('explanations') or {}).get('business_behavior', 'Unknown')
+        approved = decision in APPROVED_DECISIONS
+        day = (when or datetime.now()).strftime('%Y-%m-%d')
+        score_bin = min(max(int(score // SCORE_BIN_WIDTH), 0), SCORE_BINS - 1)
+
+        with self._lock:
+            state = self._state
+            state['total'] += 1
+            state['model_scored'] += 1 if prediction_result.get('model_used') else 0
+            state['score_sum'] += score
+            state['limit_sum'] += limit
+            state['decisions'][decision] = state['decisions'].get(decision, 0) + 1
+            state['business_labels'][label] = state['business_labels'].get(label, 0) + 1
+            state['score_bins'][score_bin] += 1
+            daily = state['daily'].setdefault(
+                day, {'count': 0, 'approved': 0, 'limit_sum': 0.0, 'approved_limit_sum': 0.0, 'score_sum': 0.0})
+            daily['count'] += 1
+            daily['score_sum'] += score
+            daily['limit_sum'] += limit
+            if approved:
+                daily['approved'] += 1
+                daily['approved_limit_sum'] += limit
+            self._dirty = True
+
+    def flush(self):
+        """Write this worker's counters if they changed since the last flush"""
+        with self._lock:
+            if not self._dirty:
+                return
+            payload = json.dumps(self._state)
+            self._dirty = False
+        tmp_path = self.worker_file + '.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(payload)
+        os.replace(tmp_path, self.worker_file)
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_seconds)
+            try:
+                self.flush()
+            except OSError:
+                # Keep counting in memory; the next flush retries
+                with self._lock:
+                    self._dirty = True
+
+    def _read(self, path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def compact(self):
+        """Fold files left by dead workers into base.json (under a lock shared by all workers)"""
+        if fcntl is None:
+            return
+        with open(os.path.join(self.rollup_dir, '.lock'), 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            base = self._read(self.base_file) or {'state': empty_state(), 'absorbed': []}
+            dead = [
+                path for path in glob.glob(os.path.join(self.rollup_dir, 'worker-*.json'))
+                if path != self.worker_file and not _pid_alive(int(os.path.basename(path).split('-')[1]))
+            ]
+            if not dead:
+                return
+            # A crash between the base.json write and the deletes leaves absorbed files behind;
+            # they are deleted again below but never merged twice
+            previously_absorbed = base.get('absorbed', [])
+            fresh = [path for path in dead if os.path.basename(path) not in previously_absorbed]
+            states = [base['state']] + [s for s in map(self._read, fresh) if s]
+            # base.json records what it absorbed, so a crash before the deletes can't double count
+            absorbed = [
+                name for name in dict.fromkeys(previously_absorbed + [os.path.basename(path) for path in fresh])
+                if os.path.exists(os.path.join(self.rollup_dir, name))
+            ]
+            tmp_path = self.base_file + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump({'state': merge_states(states), 'absorbed': absorbed}, f)
+            os.replace(tmp_path, self.base_file)
+            for path in dead:
+                os.remove(path)
+
+    def merged_state(self):
+        """Counters across every worker: this one live, the others as last flushed"""
+        base = self._read(self.base_file) or {'state': empty_state(), 'absorbed': []}
+        absorbed = set(base.get('absorbed', []))
+        states = [base['state']]
+        for path in glob.glob(os.path.join(self.rollup_dir, 'worker-*.json')):
+            name = os.path.basename(path)
+            if path == self.worker_file or name in absorbed:
+                continue
+            state = self._read(path)
+            if state:
+                states.append(state)
+        with self._lock:
+            states.append(json.loads(json.dumps(self._state)))
+        return merge_states(states)
+
+
+def _share(count, total):
+    return round(count / total, 4) if total else 0.0
+
+
+def summary_view(state):
+    total = state['total']
+    approved = sum(state['decisions'].get(d, 0) for d in APPROVED_DECISIONS)
+    return {
+        'total_decisions': total,
+        'approval_rate': _share(approved, total),
+        'model_scored_share': _share(state['model_scored'], total),
+        'average_score': round(state['score_sum'] / total, 2) if total else 0.0,
+        'average_limit': round(state['limit_sum'] / total, 2) if total else 0.0,
+    }
+
+
+def decisions_view(state):
+    total = state['total']
+    return {d: {'count': n, 'share': _share(n, total)} for d, n in sorted(state['decisions'].items())}
+
+
+def scores_view(state):
+    return [
+        {'from': i * SCORE_BIN_WIDTH, 'to': (i + 1) * SCORE_BIN_WIDTH, 'count': count}
+        for i, count in enumerate(state['score_bins'])
+    ]
+
+
+def business_labels_view(state):
+    total = state['total']
+    return {
+        label: {'count': n, 'share': _share(n, total)}
+        for label, n in sorted(state['business_labels'].items(), key=lambda item: -item[1])
+    }
+
+
+def limits_view(state, days=90):
+    """Daily decision counts and average limits, oldest first, for the last `days` days with data"""
+    series = []
+    for day in sorted(state['daily'])[-days:]:
+        values = state['daily'][day]
+        series.append({
+            'date': day,
+            'decisions': values['count'],
+            'approved': values['approved'],
+            'average_limit': round(values['limit_sum'] / values['count'], 2) if values['count'] else 0.0,
+            'average_approved_limit': round(values['approved_limit_sum'] / values['approved'], 2) if values['approved'] else 0.0,
+            'average_score': round(values['score_sum'] / values['count'], 2) if values['count'] else 0.0,
+        })
+    return series
+
+
+VIEWS = {
+    'summary': summary_view,
+    'decisions': decisions_view,
+    'scores': scores_view,
+    'business-labels': business_labels_view,
+    'limits': limits_view,
+}
@@ -0,0 +1,221 @@
+"""
+Per-request stack-sampling profiler.
+
+Nothing here runs unless a request is selected for profiling, either by an
+admin flag or by sampling (see app.profiled). Then ProfileSession starts a
+sampler thread. The thread reads the request thread's stack through
+sys._current_frames() every interval until the response has been fully
+sent, so streamed JSON encoding is included. Work the scheduler hands to a
+lane thread (batch priority) is wrapped in follow_thread(). While it runs,
+the session samples that lane thread instead of the request thread, which
+is only waiting on the result.
+
+Each profile is written to <PROFILE_DIR> as:
+    <id>.collapsed          "frame;frame;frame count" lines (flamegraph.pl, speedscope)
+    <id>.speedscope.json    speedscope sampled profile (https://www.speedscope.app)
+    <id>.meta.json          path, trigger, duration, sample count
+
+The sampler needs the GIL to read a stack. While the request thread runs
+pure Python, samples land at most every sys.getswitchinterval() (5 ms by
+default). Inside numpy/sklearn/zlib calls that release the GIL they land
+at the configured interval.
+"""
+import collections
+import contextvars
+import functools
+import glob
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime
+
+SPEEDSCOPE_SCHEMA = 'https://www.speedscope.app/file-format-schema.json'
+
+# Session profiling the current request (set by app.profiled), for follow_thread()
+current_session = contextvars.ContextVar('profile_session', default=None)
+
+
+def _frame_key(frame):
+    code = frame.f_code
+    return code.co_name, code.co_filename, code.co_firstlineno
+
+
+def frame_label(key):
+    name, filename, line = key
+    return f"{name} ({os.path.basename(filename)}:{line})"
+
+
+class ProfileSession:
+    """Samples the request's stack until finish(), then writes the profile files"""
+
+    def __init__(self, profile_dir, meta, interval=0.001, keep=200, thread_id=None):
+        self.profile_dir = profile_dir
+        self.profile_id = f"{datetime.now():%Y%m%d-%H%M%S}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.meta = dict(meta)
+        self.interval = interval
+        self.keep = keep
+        # Threads doing the request's work; the last one (a lane thread, while it runs) is sampled
+        self._threads = [thread_id if thread_id is not None else threading.get_ident()]
+        self.stacks = collections.Counter()
+        self.samples = []  # (stack, elapsed seconds) in time order, for speedscope
+        self._stop = threading.Event()
+        self._finished = False
+        self._lock = threading.Lock()
+        self.started = time.perf_counter()
+        self._sampler = threading.Thread(target=self._run, name=f'profiler-{self.profile_id}', daemon=True)
+        self._sampler.start()
+
+    def _run(self):
+        own_frames = {self._run.__code__}
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._threads[-1])
+            now = time.perf_counter()
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                if frame.f_code not in own_frames:
+                    stack.append(_frame_key(frame))
+                frame = frame.f_back
+            stack = tuple(reversed(stack))
+            self.stacks[stack] += 1
+            self.samples.append((stack, now - last))
+            last = now
+
+    def follow(self, thread_id):
+        """Sample thread_id instead of the current thread until unfollow()"""
+        with self._lock:
+            self._threads.append(thread_id)
+
+    def unfollow(self, thread_id):
+        with self._lock:
+            self._threads.remove(thread_id)
+
+    def finish(self):
+        """Stop sampling and write the profile (idempotent; safe from response.call_on_close)"""
+        with self._lock:
+            if self._finished:
+                return None
+            self._finished = True
+        self._stop.set()
+        self._sampler.join()
+        duration = time.perf_counter() - self.started
+        try:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            self._write(duration)
+            prune(self.profile_dir, self.keep)
+        except OSError:
+            return None
+        return self.profile_id
+
+    def _path(self, suffix):
+        return os.path.join(self.profile_dir, f"{self.profile_id}.{suffix}")
+
+    def _write(self, duration):
+        with open(self._path('collapsed'), 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(';'.join(frame_label(key) for key in stack) + f" {count}\n")
+
+        frames, frame_index = [], {}
+        samples, weights = [], []
+        for stack, elapsed in self.samples:
+            indices = []
+            for key in stack:
+                if key not in frame_index:
+                    frame_index[key] = len(frames)
+                    frames.append({'name': key[0], 'file': key[1], 'line': key[2]})
+                indices.append(frame_index[key])
+            samples.append(indices)
+            weights.append(round(elapsed * 1000, 3))
+        speedscope = {
+            '$schema': SPEEDSCOPE_SCHEMA,
+            'name': f"{self.meta.get('method', '')} {self.meta.get('path', '')} {self.profile_id}".strip(),
+            'exporter': 'mpesa-credit-api profiler',
+            'shared': {'frames': frames},
+            'profiles': [{
+                'type': 'sampled',
+                'name': self.meta.get('path', self.profile_id),
+                'unit': 'milliseconds',
+                'startValue': 0,
+                'endValue': round(sum(weights), 3),
+                'samples': samples,
+                'weights': weights,
+            }],
+        }
+        with open(self._path('speedscope.json'), 'w') as f:
+            json.dump(speedscope, f, separators=(',', ':'))
+
+        meta = {
+            **self.meta,
+            'profile_id': self.profile_id,
+            'duration_ms': round(duration * 1000, 2),
+            'samples': len(self.samples),
+            'interval_ms': self.interval * 1000,
+            'top_frames': top_frames(self.stacks),
+        }
+        with open(self._path('meta.json'), 'w') as f:
+            json.dump(meta, f)
+
+
+def follow_thread(fn):
+    """fn, wrapped so that a profile of the calling request samples whichever thread runs it"""
+    session = current_session.get()
+    if session is None:
+        return fn
+
+    @functools.wraps(fn)
+    def run(*args, **kwargs):
+        thread_id = threading.get_ident()
+        session.follow(thread_id)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            session.unfollow(thread_id)
+    return run
+
+
+def top_frames(stacks, n=5):
+    """Innermost frames with the most samples (self time)"""
+    leaves = collections.Counter()
+    for stack, count in stacks.items():
+        if stack:
+            leaves[stack[-1]] += count
+    total = sum(leaves.values())
+    return [{'frame': frame_label(key), 'share': round(count / total, 3)} for key, count in leaves.most_common(n)]
+
+
+def list_profiles(profile_dir, limit=50):
+    """Metadata of the newest profiles, newest first"""
+    profiles = []
+    for path in sorted(glob.glob(os.path.join(profile_dir, '*.meta.json')), reverse=True)[:limit]:
+        try:
+            with open(path) as f:
+                profiles.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return profiles
+
+
+def profile_path(profile_dir, profile_id, fmt):
+    """Path of one stored profile in 'collapsed' or 'speedscope' format; None if unknown"""
+    if not all(c.isalnum() or c == '-' for c in profile_id):
+        return None
+    suffix = {'collapsed': 'collapsed', 'speedscope': 'speedscope.json'}.get(fmt)
+    path = os.path.join(profile_dir, f"{profile_id}.{suffix}") if suffix else None
+    return path if path and os.path.exists(path) else None
+
+
+def prune(profile_dir, keep):
+    """Delete all but the newest `keep` profiles"""
+    metas = sorted(glob.glob(os.path.join(profile_dir, '*.meta.json')), reverse=True)
+    for meta_path in metas[keep:]:
+        base = meta_path[:-len('.meta.json')]
+        for suffix in ('.meta.json', '.collapsed', '.speedscope.json'):
+            try:
+                os.remove(base + suffix)
+            except OSError:
+                pass
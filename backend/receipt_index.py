@@ -0,0 +1,319 @@
+"""
+Receipt-number deduplication and reversal pairing.
+
+clean_statement() runs on every upload before feature extraction. It drops
+repeated receipt numbers (concatenated or overlapping exports) and removes
+reversals together with the transactions they undo. Both passes are O(n):
+one duplicated() over hashed receipts, and one chronological pass with a
+hash map of unmatched originals.
+
+ReceiptIndex remembers, per customer, every receipt already ingested:
+- a Bloom filter, read on every lookup
+- an exact sorted fingerprint array, memory-mapped only when the Bloom
+  filter reports possible hits
+
+A statement that doesn't overlap earlier uploads never touches the exact
+set. Receipts are stored as 64-bit hashes, not in clear.
+
+ingest() appends only never-seen rows to a per-customer ledger CSV, so the
+customer's history can be scored as one statement however much the uploads
+overlap. Rows without a receipt number are keyed on a hash of their time,
+details, amounts and balance instead, so re-uploading them doesn't grow
+the ledger either. Reversals are paired when the ledger is scored, because a reversal
+can arrive in a later upload than the transaction it undoes.
+"""
+import contextlib
+import hashlib
+import os
+import re
+import threading
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines: per-process locking only
+    fcntl = None
+
+REVERSAL_REGEX = re.compile(r"\brevers(?:al|ed)\b", re.IGNORECASE)
+# M-Pesa receipt numbers: 10 upper-case alphanumerics (synthetic data uses shorter ones)
+RECEIPT_TOKEN_REGEX = re.compile(r"\b[A-Z0-9]{6,12}\b")
+MISSING_RECEIPTS = {'', 'NAN', 'N/A', 'NONE'}
+
+RECEIPT_HASH_KEY = 'mpesa-receipts-1'
+
+# Receipt-less rows are identified by these fields; receipts are alphanumeric, so the
+# '#' prefix keeps content keys from ever colliding with a real receipt number
+CONTENT_KEY_COLUMNS = ('completion_time', 'details', 'paid_in', 'withdrawn', 'balance')
+CONTENT_KEY_PREFIX = '#'
+
+BLOOM_CAPACITY = 100_000
+BLOOM_ERROR_RATE = 0.01
+
+
+def normalize_receipts(series):
+    """Upper-cased, stripped receipt strings; missing receipts become ''"""
+    receipts = series.astype(str).str.strip().str.upper()
+    return receipts.where(~receipts.isin(MISSING_RECEIPTS) & series.notna(), '')
+
+
+def receipt_hashes(receipts):
+    """Vectorized 64-bit fingerprint of each normalized receipt"""
+    return pd.util.hash_pandas_object(receipts, index=False, hash_key=RECEIPT_HASH_KEY).to_numpy()
+
+
+def content_keys(df):
+    """Stand-in receipts for rows without one: a hash of their time, details, amounts and balance"""
+    parts = {}
+    for col in CONTENT_KEY_COLUMNS:
+        if col not in df.columns:
+            continue
+        if col == 'completion_time':
+            parts[col] = pd.to_datetime(df[col], errors='coerce')
+        elif col == 'details':
+            parts[col] = df[col].astype(str).str.strip()
+        else:
+            # 100 and 100.0 are the same amount whichever dtype the upload's format gave it
+            parts[col] = pd.to_numeric(df[col], errors='coerce').astype(float).round(2)
+    hashes = pd.util.hash_pandas_object(pd.DataFrame(parts), index=False, hash_key=RECEIPT_HASH_KEY)
+    return np.array([f"{CONTENT_KEY_PREFIX}{h:016x}" for h in hashes.to_numpy()], dtype=object)
+
+
+def _probe_step(h1):
+    """Second Bloom hash derived from the fingerprint (splitmix64 finalizer, forced odd)"""
+    z = h1 + np.uint64(0x9E3779B97F4A7C15)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return (z ^ (z >> np.uint64(31))) | np.uint64(1)
+
+
+def _amounts(df, col):
+    return pd.to_numeric(df[col], errors='coerce').fillna(0).to_numpy(dtype=float) if col in df.columns \
+        else np.zeros(len(df))
+
+
+def pair_reversals(df, receipts):
+    """
+    Row positions of reversals and the transactions they undo.
+
+    A reversal names its original receipt ("Reversal of transaction QK1...")
+    or moves the same amount back the other way. Unnamed reversals are
+    matched with the most recent unmatched original of that amount,
+    walking the statement in time order.
+    """
+    details = df['details'].astype(str) if 'details' in df.columns else pd.Series([''] * len(df))
+    is_reversal = details.str.contains(REVERSAL_REGEX, na=False).to_numpy()
+    if not is_reversal.any():
+        return np.array([], dtype=int), np.array([], dtype=int), []
+
+    paid_in, withdrawn = _amounts(df, 'paid_in'), _amounts(df, 'withdrawn')
+    position_of = {r: i for i, r in enumerate(receipts) if r}
+    order = np.argsort(df['completion_time'].to_numpy(), kind='stable') \
+        if 'completion_time' in df.columns else np.arange(len(df))
+
+    removed = np.zeros(len(df), dtype=bool)
+    reversals, originals, unmatched = [], [], []
+    open_originals = {}  # (direction, amount) -> positions of earlier non-reversal rows
+    for pos in order:
+        amount_in, amount_out = paid_in[pos], withdrawn[pos]
+        if not is_reversal[pos]:
+            if amount_out > 0:
+                open_originals.setdefault(('out', amount_out), []).append(pos)
+            if amount_in > 0:
+                open_originals.setdefault(('in', amount_in), []).append(pos)
+            continue
+
+        match = None
+        for token in RECEIPT_TOKEN_REGEX.findall(details.iat[pos].upper()):
+            candidate = position_of.get(token)
+            if candidate is not None and candidate != pos and not removed[candidate] and not is_reversal[candidate]:
+                match = candidate
+                break
+        if match is None:
+            # Money coming back undoes an outgoing payment and vice versa
+            key = ('out', amount_in) if amount_in > 0 else ('in', amount_out)
+            candidates = open_originals.get(key, [])
+            while candidates and removed[candidates[-1]]:
+                candidates.pop()
+            match = candidates.pop() if candidates else None
+        if match is None:
+            unmatched.append(pos)
+            continue
+        removed[pos] = removed[match] = True
+        reversals.append(pos)
+        originals.append(match)
+    return np.array(reversals, dtype=int), np.array(originals, dtype=int), unmatched
+
+
+def drop_duplicate_receipts(df):
+    """(df without repeated receipt numbers, their normalized receipts, rows dropped)"""
+    receipts = normalize_receipts(df['receipt_no.'])
+    duplicated = (receipts.to_numpy() != '') & receipts.duplicated(keep='first').to_numpy()
+    if duplicated.any():
+        df, receipts = df[~duplicated], receipts[~duplicated]
+    return df, receipts, int(duplicated.sum())
+
+
+def clean_statement(df):
+    """Drop duplicate receipts and paired reversals; returns (clean_df, report)"""
+    if 'receipt_no.' not in df.columns or len(df) == 0:
+        return df, {'duplicates_removed': 0, 'reversals_paired': 0, 'unmatched_reversals': 0}
+
+    df, receipts, duplicates = drop_duplicate_receipts(df)
+
+    reversals, originals, unmatched = pair_reversals(df, receipts.tolist())
+    if len(reversals):
+        keep = np.ones(len(df), dtype=bool)
+        keep[reversals] = keep[originals] = False
+        df = df[keep]
+
+    return df, {
+        'duplicates_removed': duplicates,
+        'reversals_paired': int(len(reversals)),
+        'unmatched_reversals': len(unmatched),
+    }
+
+
+class BloomFilter:
+    """Bit-array Bloom filter over 64-bit fingerprints; probes h1 + i * h2 (Kirsch-Mitzenmacher)"""
+
+    def __init__(self, capacity=BLOOM_CAPACITY, error_rate=BLOOM_ERROR_RATE, bits=None, n_hashes=None):
+        self.capacity = capacity
+        # Whole bytes, so a filter reloaded from its bit array probes the same positions
+        n_bits = -(-int(np.ceil(-capacity * np.log(error_rate) / np.log(2) ** 2)) // 8) * 8
+        self.n_bits = n_bits if bits is None else len(bits) * 8
+        self.n_hashes = n_hashes or max(1, int(round(self.n_bits / capacity * np.log(2))))
+        self.bits = bits if bits is not None else np.zeros((self.n_bits + 7) // 8, dtype=np.uint8)
+
+    def _positions(self, fingerprints):
+        steps = np.arange(self.n_hashes, dtype=np.uint64)
+        h2 = _probe_step(fingerprints)
+        return (fingerprints[:, None] + steps[None, :] * h2[:, None]) % np.uint64(self.n_bits)
+
+    def add(self, fingerprints):
+        positions = self._positions(fingerprints).ravel()
+        np.bitwise_or.at(self.bits, (positions >> np.uint64(3)).astype(np.int64),
+                         (np.uint8(1) << (positions & np.uint64(7)).astype(np.uint8)))
+
+    def contains(self, fingerprints):
+        positions = self._positions(fingerprints)
+        hits = (self.bits[(positions >> np.uint64(3)).astype(np.int64)] >> (positions & np.uint64(7)).astype(np.uint8)) & 1
+        return hits.all(axis=1)
+
+
+class ReceiptIndex:
+    """Per-customer receipt history: Bloom filter + exact fingerprint set, persisted under index_dir"""
+
+    def __init__(self, index_dir):
+        self.index_dir = index_dir
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        os.makedirs(index_dir, exist_ok=True)
+
+    def _base(self, customer_id):
+        # Customer ids never reach the filesystem in clear
+        key = hashlib.sha256(str(customer_id).encode('utf-8')).hexdigest()[:32]
+        return os.path.join(self.index_dir, key)
+
+    def _paths(self, customer_id):
+        base = self._base(customer_id)
+        return base + '.bloom.npz', base + '.receipts.npy', base + '.lock'
+
+    def ledger_path(self, customer_id):
+        """Per-customer CSV of every distinct transaction ingested so far"""
+        return self._base(customer_id) + '.ledger.csv'
+
+    def _thread_lock(self, customer_id):
+        with self._locks_guard:
+            return self._locks.setdefault(customer_id, threading.Lock())
+
+    def _load_bloom(self, bloom_path):
+        if not os.path.exists(bloom_path):
+            return BloomFilter()
+        with np.load(bloom_path) as data:
+            return BloomFilter(capacity=int(data['capacity']), bits=data['bits'].copy(), n_hashes=int(data['n_hashes']))
+
+    @contextlib.contextmanager
+    def _customer_lock(self, customer_id):
+        """Serialises one customer's index across threads (thread lock) and workers (flock)"""
+        _, _, lock_path = self._paths(customer_id)
+        with self._thread_lock(customer_id), open(lock_path, 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    def _check_and_add(self, customer_id, receipts, add):
+        receipts = pd.Series(receipts, dtype=object).reset_index(drop=True)
+        present = (receipts != '').to_numpy()
+        seen = np.zeros(len(receipts), dtype=bool)
+        if not present.any():
+            return seen
+        fingerprints = receipt_hashes(receipts)
+        bloom_path, receipts_path, _ = self._paths(customer_id)
+        bloom = self._load_bloom(bloom_path)
+
+        maybe = present & bloom.contains(fingerprints)
+        if maybe.any() and os.path.exists(receipts_path):
+            # Only Bloom positives pay for the exact lookup
+            known = np.load(receipts_path, mmap_mode='r')
+            idx = np.minimum(np.searchsorted(known, fingerprints[maybe]), len(known) - 1)
+            seen[maybe] = known[idx] == fingerprints[maybe]
+
+        new = present & ~seen
+        if add and new.any():
+            known = np.load(receipts_path) if os.path.exists(receipts_path) else np.array([], dtype=np.uint64)
+            merged = np.union1d(known, fingerprints[new])
+            if len(merged) > bloom.capacity:
+                # Rebuild at double capacity to hold the error rate
+                bloom = BloomFilter(capacity=max(bloom.capacity * 2, len(merged)))
+                bloom.add(merged)
+            else:
+                bloom.add(fingerprints[new])
+            self._save(receipts_path, merged)
+            with open(bloom_path + '.tmp', 'wb') as f:
+                np.savez(f, bits=bloom.bits, capacity=bloom.capacity, n_hashes=bloom.n_hashes, count=len(merged))
+            os.replace(bloom_path + '.tmp', bloom_path)
+        return seen
+
+    def check_and_add(self, customer_id, receipts, add=True):
+        """
+        Boolean mask of receipts this customer has uploaded before; records the new ones when add=True.
+
+        receipts must be normalized (normalize_receipts); '' entries are never matched or stored.
+        """
+        with self._customer_lock(customer_id):
+            return self._check_and_add(customer_id, receipts, add)
+
+    def ingest(self, customer_id, df, columns, add=True):
+        """
+        Append the rows of df not ingested before to the customer's ledger; returns the report.
+
+        Rows without a receipt number are matched on content_keys() against earlier
+        uploads (not within this one, where identical rows can be genuine).
+        add=False only reports what would be appended.
+        """
+        df, receipts, duplicates = drop_duplicate_receipts(df)
+        missing = (receipts == '').to_numpy()
+        if missing.any():
+            keys = receipts.to_numpy(dtype=object, copy=True)
+            keys[missing] = content_keys(df[missing])
+            receipts = pd.Series(keys, index=receipts.index)
+        ledger_path = self.ledger_path(customer_id)
+        with self._customer_lock(customer_id):
+            seen = self._check_and_add(customer_id, receipts, add=add)
+            new_rows = df[~seen]
+            if add and len(new_rows):
+                write_header = not os.path.exists(ledger_path)
+                new_rows[columns].to_csv(ledger_path, mode='a', header=write_header, index=False)
+        return {
+            'rows': len(df) + duplicates,
+            'duplicates_in_upload': duplicates,
+            'already_ingested': int(seen.sum()),
+            'appended': len(new_rows),
+        }
+
+    def _save(self, path, array):
+        with open(path + '.tmp', 'wb') as f:
+            np.save(f, array)
+        os.replace(path + '.tmp', path)
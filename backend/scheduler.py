@@ -0,0 +1,202 @@
+"""
+Priority scheduler in front of statement scoring.
+
+Each worker runs at most `slots` statements at once. Requests are
+classified 'interactive' (uploads from the web app, the default) or
+'batch' (X-Priority: batch, bulk rescoring, ingestion). When a slot frees
+up it goes to the class with the lowest virtual time (served / weight), so
+with weights 4:1 interactive gets four slots for every batch slot while
+both are waiting. Batch alone soaks up whatever interactive leaves idle.
+
+Per class:
+- max_slots keeps batch from ever holding every slot.
+- max_queue bounds how many gunicorn threads may sit waiting. A thread
+  parked in the batch queue can't pick up an interactive connection.
+- max_wait turns a long wait into a 503 with Retry-After instead of a
+  gunicorn timeout.
+
+Per (client, class) token buckets rate-limit before queueing (429). Limits
+are per worker process, like the memory budget in admission.py. A class
+with rate None has no bucket. Interactive is unlimited by default, because
+behind a proxy every user can end up sharing one client key. The queue
+bounds and weights still protect it.
+
+Slots only order work inside one worker; the workers still share the CPUs.
+A class with `nice` set runs its work on dedicated lane threads at that
+nice level (Linux applies setpriority to the calling thread). Batch scoring
+in any worker then yields the CPU to interactive scoring in every worker.
+"""
+import collections
+import contextlib
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import profiler
+from admission import AdmissionRejected
+
+DEFAULT_CLASSES = {
+    'interactive': {'weight': 4, 'max_slots': None, 'max_queue': 16, 'max_wait': 10.0, 'rate': None, 'burst': 20, 'nice': 0},
+    'batch': {'weight': 1, 'max_slots': 1, 'max_queue': 2, 'max_wait': 30.0, 'rate': 2.0, 'burst': 10, 'nice': 15},
+}
+MAX_TRACKED_CLIENTS = 10000
+
+
+def _lower_priority(nice):
+    """Lane thread initializer: raise this thread's nice value (best effort)"""
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), nice)
+    except OSError:
+        pass
+
+
+class TokenBucket:
+    """rate tokens/second up to burst; take() spends one if available"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self):
+        """(True, 0) when a token was spent, else (False, seconds until one is available)"""
+        self._refill(time.monotonic())
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True, 0.0
+        return False, (1 - self.tokens) / self.rate
+
+
+class PriorityScheduler:
+    """Weighted fair slot allocation across priority classes, with per-client token buckets"""
+
+    def __init__(self, slots, classes=None):
+        self.slots = slots
+        self.classes = {name: dict(config) for name, config in (classes or DEFAULT_CLASSES).items()}
+        for config in self.classes.values():
+            config['max_slots'] = min(config['max_slots'] or slots, slots)
+        self._cond = threading.Condition()
+        self._waiting = {name: collections.deque() for name in self.classes}
+        self._in_flight = dict.fromkeys(self.classes, 0)
+        self._vtime = dict.fromkeys(self.classes, 0.0)
+        self._clock = 0.0
+        self._buckets = collections.OrderedDict()
+        self._waits = {name: collections.deque(maxlen=2048) for name in self.classes}
+        self._counts = {name: {'admitted': 0, 'rate_limited': 0, 'queue_full': 0, 'timed_out': 0} for name in self.classes}
+        self._lanes = {
+            name: ThreadPoolExecutor(max_workers=config['max_slots'], thread_name_prefix=f'{name}-lane',
+                                     initializer=_lower_priority, initargs=(config['nice'],))
+            for name, config in self.classes.items()
+            if config.get('nice') and hasattr(os, 'setpriority')
+        }
+
+    def _bucket(self, client, priority):
+        key = (client, priority)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            config = self.classes[priority]
+            bucket = self._buckets[key] = TokenBucket(config['rate'], config['burst'])
+            if len(self._buckets) > MAX_TRACKED_CLIENTS:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket
+
+    def _next_class(self):
+        """Class that gets the next free slot: waiting, under its cap, lowest virtual time"""
+        if sum(self._in_flight.values()) >= self.slots:
+            return None
+        eligible = [name for name, queue in self._waiting.items()
+                    if queue and self._in_flight[name] < self.classes[name]['max_slots']]
+        if not eligible:
+            return None
+        return min(eligible, key=lambda name: (self._vtime[name], -self.classes[name]['weight']))
+
+    @contextlib.contextmanager
+    def slot(self, priority, client):
+        """Hold a scoring slot for the duration of the with-block; raises AdmissionRejected"""
+        self.acquire(priority, client)
+        try:
+            yield
+        finally:
+            self.release(priority)
+
+    def run(self, priority, client, fn, *args):
+        """fn(*args) inside a slot of this class, on the class's lane threads when it has a nice level"""
+        with self.slot(priority, client):
+            lane = self._lanes.get(priority)
+            if lane is None:
+                return fn(*args)
+            # This thread only waits; a profile of the request follows the work onto the lane
+            return lane.submit(profiler.follow_thread(fn), *args).result()
+
+    def acquire(self, priority, client):
+        config = self.classes[priority]
+        with self._cond:
+            counts = self._counts[priority]
+            allowed, retry_after = self._bucket(client, priority).take() if config['rate'] else (True, 0.0)
+            if not allowed:
+                counts['rate_limited'] += 1
+                raise AdmissionRejected(429, f'Rate limit for {priority} requests exceeded', retry_after=max(1, round(retry_after)))
+            queue = self._waiting[priority]
+            if len(queue) >= config['max_queue']:
+                counts['queue_full'] += 1
+                raise AdmissionRejected(503, f'The {priority} queue is full, retry shortly', retry_after=5)
+
+            if not queue and not self._in_flight[priority]:
+                # A class coming back from idle doesn't get credit for the time it was away
+                self._vtime[priority] = max(self._vtime[priority], self._clock)
+            ticket = object()
+            queue.append(ticket)
+            enqueued = time.monotonic()
+            deadline = enqueued + config['max_wait']
+            while not (queue[0] is ticket and self._next_class() == priority):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    queue.remove(ticket)
+                    counts['timed_out'] += 1
+                    self._cond.notify_all()
+                    raise AdmissionRejected(503, f'Timed out waiting for a scoring slot ({priority})', retry_after=5)
+                self._cond.wait(remaining)
+
+            queue.popleft()
+            self._in_flight[priority] += 1
+            self._clock = self._vtime[priority]
+            self._vtime[priority] += 1.0 / config['weight']
+            counts['admitted'] += 1
+            self._waits[priority].append(time.monotonic() - enqueued)
+            self._cond.notify_all()
+
+    def release(self, priority):
+        with self._cond:
+            self._in_flight[priority] -= 1
+            self._cond.notify_all()
+
+    def snapshot(self):
+        """Queue depth, in-flight slots, counters and wait-time percentiles per class"""
+        with self._cond:
+            classes = {}
+            for name, config in self.classes.items():
+                waits = np.array(self._waits[name], dtype=float) * 1000
+                classes[name] = {
+                    'weight': config['weight'],
+                    'nice': config.get('nice', 0) if name in self._lanes else 0,
+                    'max_slots': config['max_slots'],
+                    'queue_depth': len(self._waiting[name]),
+                    'in_flight': self._in_flight[name],
+                    **self._counts[name],
+                    'wait_ms': {
+                        'p50': round(float(np.percentile(waits, 50)), 2) if len(waits) else None,
+                        'p95': round(float(np.percentile(waits, 95)), 2) if len(waits) else None,
+                        'max': round(float(waits.max()), 2) if len(waits) else None,
+                    },
+                }
+            return {'slots': self.slots, 'busy': sum(self._in_flight.values()), 'classes': classes}
@@ -0,0 +1,215 @@
+"""
+Shadow scoring of candidate models.
+
+/api/predict answers with the primary model only. When SHADOW_MODELS is set,
+the request also hands its feature dict and the primary decision to
+ShadowScorer.submit(), which is a put_nowait on a bounded queue and never
+waits. If the queue is full the request is dropped from shadowing, not
+delayed.
+
+A background thread drains the queue in batches and scores each batch with
+one predict_proba call per candidate, mapped through the candidate's own
+decision table (its calibration sidecar, if it has one). It appends one JSON line per request
+to <SHADOW_DIR>/shadow-<date>-<pid>.jsonl:
+
+    {"t": ..., "p": 0.8123, "d": "APPROVED", "x": [...v2 features...],
+     "c": {"candidate": [0.7712, "APPROVED_WITH_CAUTION"]}}
+
+submit() times itself. stats() reports mean/p99/max enqueue cost against
+the configured budget, plus decision flips per candidate.
+
+Offline comparison over the logs (all workers, all days):
+    python shadow.py shadow/*.jsonl
+"""
+import collections
+import glob
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+import decisions
+from mpesa_features import feature_columns, spec_version_for_model
+
+# Feature vector stored with every record, whatever spec the models use
+LOG_SPEC_VERSION = 'v2'
+
+
+def parse_candidates(spec):
+    """'name=path,path2' -> [(name, path)]; unnamed entries are named after the file"""
+    candidates = []
+    for entry in (spec or '').split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        name, sep, path = entry.partition('=')
+        if not sep:
+            name, path = os.path.splitext(os.path.basename(entry))[0], entry
+        candidates.append((name.strip(), path.strip()))
+    return candidates
+
+
+class ShadowScorer:
+    """Bounded queue + one batching thread scoring candidate models off the request path"""
+
+    def __init__(self, candidates, log_dir='shadow', batch_size=64, max_wait_seconds=0.5,
+                 max_queue=10000, overhead_budget_ms=0.25, decision_tables=None):
+        # candidates: {name: fitted model}; decision_tables: {name: decisions.DecisionTable} (calibration)
+        self.candidates = {
+            name: (candidate, feature_columns(spec_version_for_model(candidate)))
+            for name, candidate in candidates.items()
+        }
+        self.decision_tables = {name: (decision_tables or {}).get(name, decisions.MODEL_DECISIONS) for name in candidates}
+        self.log_columns = feature_columns(LOG_SPEC_VERSION)
+        self.log_dir = log_dir
+        self.batch_size = batch_size
+        self.max_wait_seconds = max_wait_seconds
+        self.overhead_budget_ms = overhead_budget_ms
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._overhead_ns = collections.deque(maxlen=4096)
+        self.counts = {'submitted': 0, 'dropped': 0, 'scored': 0, 'batches': 0, 'errors': 0}
+        self.last_error = None
+        self.flips = {name: 0 for name in self.candidates}
+        os.makedirs(log_dir, exist_ok=True)
+        threading.Thread(target=self._run, name='shadow-scorer', daemon=True).start()
+
+    def submit(self, features, primary_probability, primary_decision):
+        """Queue one scored request for the candidates; returns immediately"""
+        started = time.perf_counter_ns()
+        try:
+            self._queue.put_nowait((time.time(), features, primary_probability, primary_decision))
+            accepted = True
+        except queue.Full:
+            accepted = False
+        elapsed = time.perf_counter_ns() - started
+        with self._lock:
+            self.counts['submitted' if accepted else 'dropped'] += 1
+            self._overhead_ns.append(elapsed)
+        return accepted
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait_seconds
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                self._score(batch)
+            except Exception as e:
+                # A broken candidate must never surface on the request path
+                with self._lock:
+                    self.counts['errors'] += 1
+                    self.last_error = str(e)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _score(self, batch):
+        outputs = {}
+        for name, (candidate, columns) in self.candidates.items():
+            X = np.array([[features.get(col, 0) for col in columns] for _, features, _, _ in batch], dtype=float)
+            probabilities, bands, _, _ = self.decision_tables[name].apply(candidate.predict_proba(X)[:, 1])
+            outputs[name] = (probabilities, [decisions.DECISION_LABELS[b] for b in bands])
+
+        lines, flips = [], dict.fromkeys(self.candidates, 0)
+        for i, (ts, features, probability, decision) in enumerate(batch):
+            shadow = {}
+            for name, (probabilities, labels) in outputs.items():
+                shadow[name] = [round(float(probabilities[i]), 4), labels[i]]
+                flips[name] += labels[i] != decision
+            lines.append(json.dumps({
+                't': round(ts, 3),
+                'p': round(probability, 4),
+                'd': decision,
+                'x': [float(features.get(col, 0)) for col in self.log_columns],
+                'c': shadow,
+            }, separators=(',', ':')))
+
+        path = os.path.join(self.log_dir, f"shadow-{datetime.now():%Y%m%d}-{os.getpid()}.jsonl")
+        with open(path, 'a') as f:
+            f.write('\n'.join(lines) + '\n')
+        with self._lock:
+            self.counts['scored'] += len(batch)
+            self.counts['batches'] += 1
+            for name, n in flips.items():
+                self.flips[name] += n
+
+    def drain(self, timeout=5.0):
+        """Wait until queued requests are scored (worker shutdown); False on timeout"""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return not self._queue.unfinished_tasks
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self.counts)
+            flips = dict(self.flips)
+            overhead = np.array(self._overhead_ns, dtype=float) / 1e6
+        scored = counts['scored']
+        overhead_ms = {
+            'mean': round(float(overhead.mean()), 4) if len(overhead) else None,
+            'p99': round(float(np.percentile(overhead, 99)), 4) if len(overhead) else None,
+            'max': round(float(overhead.max()), 4) if len(overhead) else None,
+            'budget': self.overhead_budget_ms,
+        }
+        overhead_ms['within_budget'] = overhead_ms['p99'] is None or overhead_ms['p99'] <= self.overhead_budget_ms
+        return {
+            'candidates': {
+                name: {
+                    'model_type': type(candidate).__name__,
+                    'feature_spec': spec_version_for_model(candidate),
+                    'decision_flips': flips[name],
+                    'flip_rate': round(flips[name] / scored, 4) if scored else None,
+                }
+                for name, (candidate, _) in self.candidates.items()
+            },
+            **counts,
+            'last_error': self.last_error,
+            'queued': self._queue.qsize(),
+            'mean_batch_size': round(scored / counts['batches'], 1) if counts['batches'] else None,
+            'enqueue_overhead_ms': overhead_ms,
+        }
+
+
+def compare_logs(paths):
+    """Decision flip matrix and probability deltas per candidate over shadow log files"""
+    report = {}
+    for path in paths:
+        with open(path) as f:
+            for line in f:
+                record = json.loads(line)
+                for name, (probability, decision) in record['c'].items():
+                    entry = report.setdefault(name, {'requests': 0, 'flips': collections.Counter(), 'deltas': []})
+                    entry['requests'] += 1
+                    entry['deltas'].append(probability - record['p'])
+                    if decision != record['d']:
+                        entry['flips'][f"{record['d']} -> {decision}"] += 1
+    for entry in report.values():
+        deltas = np.abs(entry.pop('deltas'))
+        entry['flip_rate'] = round(sum(entry['flips'].values()) / entry['requests'], 4)
+        entry['flips'] = dict(entry['flips'].most_common())
+        entry['mean_abs_probability_delta'] = round(float(deltas.mean()), 4)
+        entry['p95_abs_probability_delta'] = round(float(np.percentile(deltas, 95)), 4)
+    return report
+
+
+if __name__ == '__main__':
+    paths = sys.argv[1:] or sorted(glob.glob(os.path.join(os.environ.get('SHADOW_DIR', 'shadow'), '*.jsonl')))
+    print(json.dumps(compare_logs(paths), indent=2))
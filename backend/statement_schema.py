@@ -0,0 +1,170 @@
+"""
+Typed ingestion schema for M-Pesa statements.
+
+pd.read_csv's defaults give object columns for every string field. Statements
+repeat a handful of descriptions ("Send Money", "Airtime Purchase", ...) and
+statuses thousands of times, so those are read as categoricals. The string
+data is then stored once per distinct value, and .str operations (the
+repayment regexes) run once per category instead of once per row.
+completion_time is parsed to datetime64 once at ingestion, instead of once
+per row in every downstream function.
+
+Partners that already hold structured data can skip the CSV text round-trip:
+Arrow IPC (stream or file/Feather v2) and Parquet are read with pyarrow,
+and newline-delimited JSON is read with pandas. pyarrow is optional; without
+it those two formats are rejected with UnsupportedStatementFormat. A payload
+its reader can't parse raises MalformedStatement (HTTP 400). Every format
+ends in coerce_statement_frame, so feature extraction sees the same schema.
+"""
+import io
+import os
+
+import pandas as pd
+
+from mpesa_features import parse_completion_time
+
+REQUIRED_COLUMNS = ['receipt_no.', 'completion_time', 'details', 'transaction_status', 'paid_in', 'withdrawn', 'balance']
+
+# Amounts keep pandas' inferred numeric dtype (float64, or int64 for whole-shilling
+# exports) so feature sums stay bit-identical to the untyped path.
+CSV_DTYPES = {
+    'details': 'category',
+    'transaction_status': 'category',
+}
+
+
+# format -> (file extensions, Content-Types of raw request bodies)
+STATEMENT_FORMATS = {
+    'csv': (('.csv',), ('text/csv',)),
+    'parquet': (('.parquet', '.pq'), ('application/vnd.apache.parquet', 'application/x-parquet')),
+    'arrow': (('.arrow', '.arrows', '.feather', '.ipc'),
+              ('application/vnd.apache.arrow.stream', 'application/vnd.apache.arrow.file')),
+    'ndjson': (('.ndjson', '.jsonl'), ('application/x-ndjson', 'application/ndjson', 'application/jsonl')),
+}
+PYARROW_FORMATS = ('parquet', 'arrow')
+ARROW_FILE_MAGIC = b'ARROW1'
+
+# Nullable extension dtypes (Int64, Float64, ...) from Arrow/Parquet become plain
+# floats so the numpy paths in feature extraction see NaN rather than pd.NA
+AMOUNT_COLUMNS = ['paid_in', 'withdrawn', 'balance']
+
+
+class UnsupportedStatementFormat(Exception):
+    """Statement format unknown, or its optional reader (pyarrow) is not installed"""
+
+
+class MalformedStatement(ValueError):
+    """Upload is not a readable statement in its declared format (reported as HTTP 400)"""
+
+
+def format_from_filename(filename):
+    """Format name for an upload's file extension, or None"""
+    extension = os.path.splitext(filename or '')[1].lower()
+    for fmt, (extensions, _) in STATEMENT_FORMATS.items():
+        if extension in extensions:
+            return fmt
+    return None
+
+
+def format_from_content_type(content_type):
+    """Format name for a raw request body's Content-Type (parameters ignored), or None"""
+    mimetype = (content_type or '').split(';')[0].strip().lower()
+    for fmt, (_, content_types) in STATEMENT_FORMATS.items():
+        if mimetype in content_types:
+            return fmt
+    return None
+
+
+def _pyarrow(fmt):
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise UnsupportedStatementFormat(f"{fmt} statements need pyarrow, which is not installed on this server")
+    return pyarrow
+
+
+def _malformed(fmt, error):
+    return MalformedStatement(f"Malformed {fmt} statement: {error}")
+
+
+def _arrow_table(raw_bytes, fmt):
+    """Arrow table over the upload's own buffer (no copy of the payload); MalformedStatement if unreadable"""
+    pa = _pyarrow(fmt)
+    buffer = pa.py_buffer(raw_bytes)
+    try:
+        if fmt == 'parquet':
+            return pa.parquet.read_table(pa.BufferReader(buffer))
+        if raw_bytes[:len(ARROW_FILE_MAGIC)] == ARROW_FILE_MAGIC:
+            return pa.ipc.open_file(buffer).read_all()
+        return pa.ipc.open_stream(buffer).read_all()
+    except (ValueError, pa.ArrowException) as e:
+        # ArrowInvalid is a ValueError; ArrowException also covers I/O and type errors
+        raise _malformed(fmt, e)
+
+
+def count_statement_rows(raw_bytes, fmt):
+    """Rows in a non-CSV payload without building a DataFrame (CSV: admission.count_rows)"""
+    if fmt == 'ndjson':
+        return sum(1 for line in raw_bytes.splitlines() if line.strip())
+    if fmt == 'parquet':
+        pa = _pyarrow(fmt)
+        try:
+            return pa.parquet.ParquetFile(pa.BufferReader(raw_bytes)).metadata.num_rows
+        except (ValueError, pa.ArrowException) as e:
+            raise _malformed(fmt, e)
+    if fmt == 'arrow':
+        return _arrow_table(raw_bytes, fmt).num_rows
+    raise UnsupportedStatementFormat(f"Unknown statement format '{fmt}'")
+
+
+def read_statement(raw_bytes, fmt='csv'):
+    """Read an uploaded statement in any supported format into the typed schema"""
+    if fmt == 'csv':
+        return read_statement_csv(io.BytesIO(raw_bytes))
+    if fmt == 'ndjson':
+        # Dates are left as text so parse_completion_time handles them like the CSV path
+        try:
+            df = pd.read_json(io.BytesIO(raw_bytes), lines=True, convert_dates=False, keep_default_dates=False)
+        except ValueError as e:
+            raise _malformed(fmt, e)
+        return coerce_statement_frame(df)
+    if fmt in PYARROW_FORMATS:
+        # split_blocks keeps single-chunk, null-free numeric columns as views of the Arrow
+        # buffers instead of consolidating (copying) them into 2-D pandas blocks
+        df = _arrow_table(raw_bytes, fmt).to_pandas(split_blocks=True, self_destruct=True)
+        return coerce_statement_frame(df)
+    raise UnsupportedStatementFormat(f"Unknown statement format '{fmt}'")
+
+
+def read_statement_csv(source):
+    """Read a statement CSV (path, buffer or file object) into a compactly typed DataFrame"""
+    df = pd.read_csv(source, dtype=CSV_DTYPES)
+    return coerce_statement_frame(df)
+
+
+def coerce_statement_frame(df):
+    """Apply the statement schema to an already-loaded frame (e.g. from a parsed PDF)"""
+    # Arrow/Parquet strings arrive as extension string dtypes whose missing value is pd.NA;
+    # object columns with NaN behave like the CSV path downstream ('nan', not '<NA>')
+    for col in df.columns:
+        dtype = df[col].dtype
+        if isinstance(dtype, pd.api.extensions.ExtensionDtype) and not isinstance(dtype, pd.CategoricalDtype) \
+                and pd.api.types.is_string_dtype(dtype):
+            values = df[col].astype(object)
+            df[col] = values.where(values.notna(), float('nan'))
+    for col, dtype in CSV_DTYPES.items():
+        if col in df.columns and df[col].dtype != dtype:
+            df[col] = df[col].astype(dtype)
+    for col in AMOUNT_COLUMNS:
+        if col in df.columns and isinstance(df[col].dtype, pd.api.extensions.ExtensionDtype):
+            df[col] = df[col].astype('float64')
+    if 'completion_time' in df.columns:
+        df['completion_time'] = parse_completion_time(df['completion_time'])
+    return df
+
+
+def missing_columns(df):
+    """Required statement columns absent from df"""
+    return [col for col in REQUIRED_COLUMNS if col not in df.columns]
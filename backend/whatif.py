@@ -0,0 +1,168 @@
+"""
+Batched what-if scoring for /api/whatif.
+
+Expands one feature vector and a perturbation grid into a single feature
+matrix, so a whole sensitivity surface costs one predict_proba call instead
+of one per variant. Perturbations map a feature to a list of additive deltas
+or to {"deltas": [...]}, {"values": [...]} or {"percent": [...]}:
+
+    {"net_cash_flow": [-5000, 0, 5000], "repayments": {"values": [0, 2, 4, 6]}}
+
+Derived features follow their inputs unless they are perturbed themselves:
+net_cash_flow = monthly_inflow - monthly_outflow, repayment_ratio =
+repayments / transaction_count, transactions_per_day = transaction_count /
+days_covered.
+"""
+import numpy as np
+
+from decisions import DECISION_LABELS, MODEL_DECISIONS, decision_bands
+from mpesa_features import feature_vector
+
+MAX_STEPS_PER_FEATURE = 200
+
+# derived feature -> (function of the matrix columns, features it is computed from)
+DERIVED_FEATURES = {
+    'net_cash_flow': (lambda c: c['monthly_inflow'] - c['monthly_outflow'], ('monthly_inflow', 'monthly_outflow')),
+    'repayment_ratio': (
+        lambda c: np.divide(c['repayments'], c['transaction_count'],
+                            out=np.zeros_like(c['repayments']), where=c['transaction_count'] > 0),
+        ('repayments', 'transaction_count')
+    ),
+    'transactions_per_day': (
+        lambda c: np.divide(c['transaction_count'], c['days_covered'],
+                            out=np.zeros_like(c['transaction_count']), where=c['days_covered'] > 0),
+        ('transaction_count', 'days_covered')
+    ),
+}
+
+
+class WhatIfError(ValueError):
+    """Invalid what-if request (reported to the client as HTTP 400)"""
+
+
+def _axis_values(feature, base_value, spec):
+    """Absolute values one perturbation axis takes"""
+    if isinstance(spec, list):
+        spec = {'deltas': spec}
+    if not isinstance(spec, dict) or len(spec) != 1 or next(iter(spec)) not in ('deltas', 'values', 'percent'):
+        raise WhatIfError(f"Perturbation for '{feature}' must be a list of deltas or one of "
+                          f"{{'deltas': [...]}}, {{'values': [...]}}, {{'percent': [...]}}")
+    kind, steps = next(iter(spec.items()))
+    try:
+        steps = np.asarray(steps, dtype=float)
+    except (TypeError, ValueError):
+        raise WhatIfError(f"Perturbation steps for '{feature}' must be numbers")
+    if steps.ndim != 1 or not 0 < len(steps) <= MAX_STEPS_PER_FEATURE:
+        raise WhatIfError(f"'{feature}' needs between 1 and {MAX_STEPS_PER_FEATURE} steps")
+    if kind == 'values':
+        return steps
+    if kind == 'percent':
+        return base_value * (1 + steps / 100)
+    return base_value + steps
+
+
+def base_vector(base_features, columns):
+    """Base feature values in column order as floats; WhatIfError names the first non-numeric one"""
+    if not isinstance(base_features, dict):
+        raise WhatIfError("'features' must be an object mapping feature names to numbers")
+    values = feature_vector(base_features, columns)
+    for col, value in zip(columns, values):
+        try:
+            float(value)
+        except (TypeError, ValueError):
+            raise WhatIfError(f"Base feature '{col}' must be a number, got {value!r}")
+    return np.asarray(values, dtype=float)
+
+
+def build_variants(base_features, perturbations, columns, max_variants):
+    """
+    Feature matrix for the cartesian product of all perturbation axes.
+
+    Returns (X, axes) where X has one row per variant in C order over the
+    axes and axes is a list of (feature, absolute values).
+    """
+    if not perturbations:
+        raise WhatIfError("No perturbations provided")
+    unknown = [f for f in perturbations if f not in columns]
+    if unknown:
+        raise WhatIfError(f"Unknown or unused features {unknown}; the model uses {columns}")
+
+    base = base_vector(base_features, columns)
+    axes = [(f, _axis_values(f, base[columns.index(f)], spec)) for f, spec in perturbations.items()]
+    shape = tuple(len(values) for _, values in axes)
+    n_variants = int(np.prod(shape))
+    if n_variants > max_variants:
+        raise WhatIfError(f"Grid has {n_variants} variants; the limit is {max_variants}")
+
+    X = np.tile(base, (n_variants, 1))
+    grids = np.meshgrid(*[values for _, values in axes], indexing='ij')
+    for (feature, _), grid in zip(axes, grids):
+        X[:, columns.index(feature)] = grid.ravel()
+
+    perturbed = {feature for feature, _ in axes}
+    matrix_columns = {col: X[:, i] for i, col in enumerate(columns)}
+    for derived, (compute, inputs) in DERIVED_FEATURES.items():
+        if derived in columns and derived not in perturbed and perturbed & set(inputs) \
+                and all(col in columns for col in inputs):
+            X[:, columns.index(derived)] = compute(matrix_columns)
+    return X, axes
+
+
+def analyse(model, base_features, perturbations, columns, max_variants, decision_table=MODEL_DECISIONS):
+    """
+    Score the grid in one batch; probability surface plus minimal decision flips.
+
+    The surface reports calibrated probabilities, as /api/predict does. Bands
+    and flips use the raw score the decision table's cut-offs apply to, so
+    they match the decisions /api/predict would make.
+
+    A flip's distance is the L1 norm of the per-feature changes, each divided
+    by the largest change on its axis, so axes in different units compare fairly.
+    """
+    X, axes = build_variants(base_features, perturbations, columns, max_variants)
+    base_row = base_vector(base_features, columns)[np.newaxis, :]
+
+    # Base and every variant in one predict_proba call
+    raw = model.predict_proba(np.vstack([base_row, X]))[:, 1]
+    probabilities = decision_table.calibrate(raw)
+    base_raw, raw = float(raw[0]), raw[1:]
+    base_probability, probabilities = float(probabilities[0]), probabilities[1:]
+
+    base = base_row[0]
+    deltas = np.column_stack([X[:, columns.index(f)] - base[columns.index(f)] for f, _ in axes])
+    spans = np.abs(deltas).max(axis=0)
+    distance = (np.abs(deltas) / np.where(spans > 0, spans, 1)).sum(axis=1)
+
+    flips = {}
+    thresholds = decision_table.thresholds
+    for threshold in thresholds:
+        above = base_raw >= threshold
+        crossing = np.flatnonzero((raw >= threshold) != above)
+        if len(crossing) == 0:
+            flips[str(threshold)] = None
+            continue
+        # Nearest variant first; among equals, the one furthest past the threshold
+        best = crossing[np.lexsort((-np.abs(raw[crossing] - threshold), distance[crossing]))[0]]
+        flips[str(threshold)] = {
+            'direction': 'down' if above else 'up',
+            'changes': {f: float(deltas[best, i]) for i, (f, _) in enumerate(axes) if deltas[best, i] != 0},
+            'features': {col: float(X[best, j]) for j, col in enumerate(columns)},
+            'approval_probability': round(float(probabilities[best]), 4),
+            'decision_status': DECISION_LABELS[decision_bands(raw[best], thresholds)],
+            'normalized_distance': round(float(distance[best]), 4),
+        }
+
+    shape = tuple(len(values) for _, values in axes)
+    bands = decision_bands(raw, thresholds)
+    return {
+        'base': {
+            'approval_probability': round(base_probability, 4),
+            'decision_status': DECISION_LABELS[decision_bands(base_raw, thresholds)],
+        },
+        'axes': [{'feature': f, 'values': values.tolist()} for f, values in axes],
+        'variants': len(probabilities),
+        'probability_surface': np.round(probabilities, 4).reshape(shape).tolist(),
+        'decision_counts': {label: int((bands == i).sum()) for i, label in enumerate(DECISION_LABELS)},
+        'thresholds': list(thresholds),
+        'minimal_flips': flips,
+    }
@@ -0,0 +1,13 @@
+"""
+WSGI entry point for production serving.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Importing app loads the model and runs the startup warm-up, so each worker
+is warm before it starts accepting connections.
+"""
+from app import app
+
+if __name__ == '__main__':
+    # Convenience for platforms without gunicorn (e.g. Windows dev boxes)
+    app.run(host='0.0.0.0', port=5000, threaded=True)
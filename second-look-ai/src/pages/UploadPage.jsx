@@ -4,6 +4,25 @@ import ResultsCard from '../components/ResultsCard';
 import LoadingSpinner from '../components/LoadingSpinner';
 import TransactionsViewer from '../components/TransactionsViewer';
 
+// gzip the statement in the browser when supported - CSVs shrink 5-10x, which matters on slow mobile links
+const compressStatement = async (file) => {
+  if (typeof CompressionStream === 'undefined') {
+    return { blob: file, name: file.name };
+  }
+  const compressed = file.stream().pipeThrough(new CompressionStream('gzip'));
+  return { blob: await new Response(compressed).blob(), name: `${file.name}.gz` };
+};
+
+// Large-statement jobs: poll at the server's Retry-After hint, and give up after this long
+const JOB_POLL_FALLBACK_MS = 2000;
+const JOB_MAX_WAIT_MS = 10 * 60 * 1000;
+
+// Delay before the next job poll, from the response's Retry-After (seconds), kept between 1s and 30s
+const jobPollDelay = (response) => {
+  const seconds = Number(response.headers.get('Retry-After'));
+  return seconds > 0 ? Math.min(Math.max(seconds * 1000, 1000), 30000) : JOB_POLL_FALLBACK_MS;
+};
+
 const UploadPage = () => {
   const [applicationResult, setApplicationResult] = useState(null);
   const [isLoading, setIsLoading] = useState(false);
@@ -30,8 +49,9 @@ const UploadPage = () => {
 
       // Add M-Pesa statement file
       if (formData.uploadedFiles && formData.uploadedFiles.length > 0) {
-        submissionFormData.append('mpesa_statement', formData.uploadedFiles[0]);
-        console.log('📁 File added:', formData.uploadedFiles[0].name);
+        const statement = await compressStatement(formData.uploadedFiles[0]);
+        submissionFormData.append('mpesa_statement', statement.blob, statement.name);
+        console.log('📁 File added:', statement.name, `(${statement.blob.size} bytes)`);
       } else {
         throw new Error('Please upload your M-Pesa statement');
       }
@@ -51,7 +71,32 @@ const UploadPage = () => {
         throw new Error(errorText || `Server error: ${response.status}`);
       }
 
-      const result = await response.json();
+      let result = await response.json();
+
+      // Large statements are scored in the background - poll until the result is ready
+      if (response.status === 202 && result.status_url) {
+        console.log('⏳ Large statement queued as job:', result.job_id);
+        const deadline = Date.now() + JOB_MAX_WAIT_MS;
+        let delay = jobPollDelay(response);
+        while (true) {
+          if (Date.now() + delay > deadline) {
+            throw new Error(
+              `Your statement is still being scored after ${JOB_MAX_WAIT_MS / 60000} minutes. Please try again later.`
+            );
+          }
+          await new Promise((resolve) => setTimeout(resolve, delay));
+          const jobResponse = await fetch(`http://localhost:5000${result.status_url}`);
+          if (jobResponse.status === 202) {
+            delay = jobPollDelay(jobResponse);
+            continue;
+          }
+          if (!jobResponse.ok) {
+            throw new Error((await jobResponse.text()) || `Server error: ${jobResponse.status}`);
+          }
+          result = await jobResponse.json();
+          break;
+        }
+      }
       console.log('✅ Full backend response:', result);
       
       // Map the response